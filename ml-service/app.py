@@ -1,426 +1,1119 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import cv2
-import numpy as np
-from pyzbar import pyzbar
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+import hashlib
+import json
 import os
-from werkzeug.utils import secure_filename
-import tempfile
 import re
-from urllib.parse import urlparse
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+from werkzeug.wsgi import get_input_stream
+from batching import MicroBatcher
+from bulk_scan import BulkScanner
+from domain_lists import DomainList
+from executors import BoundedExecutor, ExecutorBusy, JobTimeout
+from heuristic_rules import DEFAULT_RULES_FILE, RuleSet
+from payment_parser import is_emv_qr, parse_payment_qr
+import metrics
+from metrics import timed
+from qr_decode import decode_upload
+from singleflight import SingleFlight
+from verdict_cache import QRResultCache, VerdictCache, cacheable_scan, canonicalize_url
+from verdict_store import DAY, VerdictStore
 
 app = Flask(__name__)
 CORS(app)
 
 # Configuration
-UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
-# Load the Hugging Face model
-MODEL_NAME = "r3ddkahili/final-complete-malicious-url-model"
-print("Loading Hugging Face model...")
-try:
-    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
-    model.eval()
-    print("Model loaded successfully!")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    tokenizer = None
-    model = None
+# Batched inference: concurrent single-URL requests are coalesced into one forward pass
+MICRO_BATCHING = os.environ.get('MICRO_BATCHING', 'True').lower() == 'true'
+BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+MAX_URLS_PER_REQUEST = int(os.environ.get('MAX_URLS_PER_REQUEST', 256))
+# Streaming bulk scans: URLs per forward pass and how often a progress record is emitted
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 64))
+BULK_PROGRESS_EVERY = int(os.environ.get('BULK_PROGRESS_EVERY', 10000))
+# The streaming bulk scan reads its body incrementally, so it has its own cap instead of
+# MAX_CONTENT_LENGTH (0 = no limit)
+BULK_MAX_BYTES = int(os.environ.get('BULK_MAX_BYTES', 2 * 1024 ** 3))
+
+# Tiered decisions: allow/blocklist first, then heuristics; the model only runs for
+# heuristic scores in [TIER_SAFE_BELOW, TIER_MALICIOUS_AT). DECISION_MODE=always runs it for every URL
+DECISION_MODE = os.environ.get('DECISION_MODE', 'always').lower()
+TIER_SAFE_BELOW = int(os.environ.get('TIER_SAFE_BELOW', 10))
+TIER_MALICIOUS_AT = int(os.environ.get('TIER_MALICIOUS_AT', 60))
+url_allowlist = DomainList.from_file(os.environ.get('URL_ALLOWLIST_FILE'))
+url_blocklist = DomainList.from_file(os.environ.get('URL_BLOCKLIST_FILE'))
+
+# Verdict cache: repeated scans of the same (canonicalized) URL skip heuristics and the model
+verdict_cache = VerdictCache(
+    max_size=int(os.environ.get('VERDICT_CACHE_SIZE', 10000)),
+    ttl=float(os.environ.get('VERDICT_CACHE_TTL', 3600)),
+    db_path=os.environ.get('VERDICT_CACHE_DB') or None
+)
+
+# QR result cache: byte-identical re-uploads of the same image skip decoding and analysis
+qr_result_cache = QRResultCache(
+    max_size=int(os.environ.get('QR_CACHE_SIZE', 1000)),
+    ttl=float(os.environ.get('QR_CACHE_TTL', 3600))
+)
+
+# Persistent verdict store: past verdicts and per-domain reputation survive restarts.
+# URLs on a host from an imported blocklist are decided without analysis. A domain with at least
+# REPUTATION_MIN_SCANS recent scans, of which REPUTATION_MALICIOUS_RATIO were confirmed malicious,
+# adds REPUTATION_WEIGHT to the heuristic score; its URLs are still analyzed
+VERDICT_STORE_DB = os.environ.get('VERDICT_STORE_DB') or None
+verdict_store = VerdictStore(
+    VERDICT_STORE_DB,
+    max_age=float(os.environ.get('VERDICT_STORE_MAX_AGE_DAYS', 30)) * DAY,
+    half_life=float(os.environ.get('REPUTATION_HALF_LIFE_DAYS', 7)) * DAY
+) if VERDICT_STORE_DB else None
+REPUTATION_MIN_SCANS = int(os.environ.get('REPUTATION_MIN_SCANS', 5))
+REPUTATION_MALICIOUS_RATIO = float(os.environ.get('REPUTATION_MALICIOUS_RATIO', 0.9))
+REPUTATION_WEIGHT = int(os.environ.get('REPUTATION_WEIGHT', 30))
+
+# Request coalescing: concurrent requests for the same canonical URL, or the same QR image
+# bytes, wait on one in-flight computation and share its result (see singleflight.py)
+REQUEST_COALESCING = os.environ.get('REQUEST_COALESCING', 'True').lower() == 'true'
+url_flight = SingleFlight()
+qr_flight = SingleFlight()
+# Reported in /api/health and /api/metrics; the ASGI server adds its own flights
+request_flights = {"detect_link": url_flight, "detect_qr": qr_flight}
+
+# Execution layer: 'inline' decodes QR images and runs the model on the request thread;
+# 'pool' decodes in a process pool and runs the model on a separately sized thread pool,
+# each with a bounded queue (full -> 503) and a per-job timeout (-> 504)
+EXECUTION_MODE = os.environ.get('EXECUTION_MODE', 'inline').lower()
+qr_executor = BoundedExecutor(
+    'qr_decode',
+    max_workers=int(os.environ.get('QR_WORKERS', 2)),
+    queue_size=int(os.environ.get('QR_QUEUE_SIZE', 4)),
+    timeout=float(os.environ.get('QR_JOB_TIMEOUT', 10)),
+    processes=True
+)
+inference_executor = BoundedExecutor(
+    'inference',
+    max_workers=int(os.environ.get('INFERENCE_WORKERS', 8)),
+    queue_size=int(os.environ.get('INFERENCE_QUEUE_SIZE', 64)),
+    timeout=float(os.environ.get('INFERENCE_TIMEOUT', 30))
+)
+
+# Load the Hugging Face model through the configured inference backend (torch, torch-int8, onnx)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'torch')
+# eager: load at import (required for preloading in a forking server's master)
+# background: bind immediately and load in a thread; lazy: load on first use
+MODEL_LOAD_MODE = os.environ.get('MODEL_LOAD_MODE', 'eager').lower()
+# Warmup forward passes at these batch sizes run before the model is reported ready.
+# 'post_fork' leaves them to gunicorn's post_fork hook: torch's thread pools must not exist before forking
+MODEL_WARMUP = os.environ.get('MODEL_WARMUP', 'True').lower()
+MODEL_WARMUP_BATCHES = [int(size) for size in os.environ.get('MODEL_WARMUP_BATCHES', '1,8,32').split(',') if size.strip()]
+backend = None
+tokenizer = None
+model = None
+model_state = {"status": "not_started", "load_seconds": None, "warmup_seconds": None, "error": None}
+model_lock = threading.Lock()
+
+def load_model():
+    """
+    Load the model once; safe to call from several threads
+    """
+    global backend, tokenizer, model
+    with model_lock:
+        if model_state["status"] in ("ready", "failed"):
+            return
+        model_state["status"] = "loading"
+        print(f"Loading Hugging Face model ({INFERENCE_BACKEND} backend)...")
+        start = time.perf_counter()
+        try:
+            # Deferred so torch/transformers import cost is paid by the loader, not at bind time
+            from inference import MODEL_NAME, load_backend
+            loaded = load_backend(INFERENCE_BACKEND, MODEL_NAME)
+            if MODEL_WARMUP == 'true':
+                warmup_model(loaded)
+            backend, tokenizer, model = loaded, loaded.tokenizer, loaded.model
+            model_state["status"] = "ready"
+            print(f"Model loaded successfully in {time.perf_counter() - start:.1f}s!")
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            model_state["status"] = "failed"
+            model_state["error"] = str(e)
+        model_state["load_seconds"] = round(time.perf_counter() - start, 3)
+
+def warmup_model(target=None):
+    """
+    Run the warmup forward passes on target (default: the loaded backend); failures are logged, not fatal
+    """
+    target = target or backend
+    if target is None or not MODEL_WARMUP_BATCHES:
+        return
+    try:
+        seconds = target.warmup(MODEL_WARMUP_BATCHES)
+        model_state["warmup_seconds"] = round(seconds, 3)
+        print(f"Model warmed up in {seconds:.1f}s (batch sizes {MODEL_WARMUP_BATCHES})")
+    except Exception as e:
+        print(f"Model warmup failed: {e}")
+
+def model_unavailable():
+    """
+    Check the model is usable, loading it here on first use in lazy mode
+    Returns: None when ready, else (error_response, status_code)
+    """
+    if model_state["status"] == "not_started" and MODEL_LOAD_MODE == 'lazy':
+        load_model()
+    if model is not None and tokenizer is not None:
+        return None
+    if model_state["status"] in ("not_started", "loading"):
+        return {"error": "Model is still loading"}, 503
+    return {"error": "Model not loaded"}, 500
+
+if __name__ == '__mp_main__':
+    # Re-imported as the main module of a spawned QR pool process, which never needs the model
+    pass
+elif MODEL_LOAD_MODE == 'background':
+    threading.Thread(target=load_model, name="model-loader", daemon=True).start()
+elif MODEL_LOAD_MODE != 'lazy':
+    load_model()
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# Keyword lists, TLDs, shorteners, UPI providers and scoring weights live in a versioned rule
+# file, compiled once and hot-reloaded in the background when it changes (see heuristic_rules.py)
+RULES_FILE = os.environ.get('RULES_FILE') or DEFAULT_RULES_FILE
+RULES_RELOAD_INTERVAL = float(os.environ.get('RULES_RELOAD_INTERVAL', 5))
+
+def rules_reloaded(rules):
+    # Cached verdicts were scored with the previous rules; stored ones are skipped by their rules tag
+    verdict_cache.clear()
+    qr_result_cache.clear()
+
+heuristic_rules = RuleSet(RULES_FILE, RULES_RELOAD_INTERVAL, on_reload=rules_reloaded)
+
+IP_PATTERN = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}')
+
+def url_features(url, rules):
+    """
+    Raw inputs of the URL rules, before any weight or limit is applied (see feature_store.URL_COLUMNS)
+    Returns: (features, keywords, tld)
+    """
+    url_lower = url.lower()
+    # urlsplit gives the same scheme/netloc as urlparse without the params pass
+    parsed = urlsplit(url_lower)
+    domain = parsed.netloc
+    # Every listed TLD is a single label, so only the last one can match
+    tld = domain[domain.rindex('.'):] if '.' in domain else ''
+    keywords = rules.keyword_matcher.find_all(url_lower)
+    homoglyphs = rules.homoglyph_pattern
+    return {
+        "keywords": len(keywords),
+        "ip_address": IP_PATTERN.search(domain) is not None,
+        "subdomains": domain.count('.'),
+        "domain_length": len(domain),
+        "suspicious_tld": tld in rules.suspicious_tlds,
+        # Substring match, as shortener hosts can appear inside other hosts
+        "url_shortener": rules.shortener_matcher.search(domain),
+        "hyphens": domain.count('-'),
+        "no_https": parsed.scheme != 'https',
+        "at_symbol": '@' in url,
+        "homoglyph": homoglyphs is not None and homoglyphs.search(domain) is not None,
+        "nonstandard_port": ':' in domain and not domain.endswith(':443') and not domain.endswith(':80')
+    }, keywords, tld
+
+def score_url_features(features, keywords, tld, rules):
+    """
+    Apply the rule weights and limits to URL features
+    Returns: list of (rule, weight, reason) hits, in warning flag order
+    """
+    weights = rules.url_weights
+    limits = rules.url_limits
+    hits = [('keyword', weights['keyword'], f"Contains suspicious keyword: '{keyword}'") for keyword in keywords]
+    if features['ip_address']:
+        hits.append(('ip_address', weights['ip_address'], "Uses IP address instead of domain name"))
+    # e.g. paypal.secure.login.verify.com
+    if features['subdomains'] > limits['max_subdomains']:
+        hits.append(('excessive_subdomains', weights['excessive_subdomains'],
+                     f"Excessive subdomains ({features['subdomains']})"))
+    if features['domain_length'] > limits['max_domain_length']:
+        hits.append(('long_domain', weights['long_domain'],
+                     f"Unusually long domain ({features['domain_length']} characters)"))
+    if features['suspicious_tld']:
+        hits.append(('suspicious_tld', weights['suspicious_tld'], f"Suspicious TLD: {tld}"))
+    if features['url_shortener']:
+        hits.append(('url_shortener', weights['url_shortener'], "URL shortener detected"))
+    if features['hyphens'] > limits['max_hyphens']:
+        hits.append(('excessive_hyphens', weights['excessive_hyphens'],
+                     f"Excessive hyphens in domain ({features['hyphens']})"))
+    if features['no_https']:
+        hits.append(('no_https', weights['no_https'], "Not using HTTPS"))
+    if features['at_symbol']:
+        hits.append(('at_symbol', weights['at_symbol'], "Contains @ symbol (potential redirect trick)"))
+    if features['homoglyph']:
+        hits.append(('homoglyph', weights['homoglyph'], "Contains lookalike characters (possible homograph attack)"))
+    if features['nonstandard_port']:
+        hits.append(('nonstandard_port', weights['nonstandard_port'], "Uses non-standard port"))
+    return hits
+
+def url_rule_hits(url, rules):
+    """
+    Returns: (features, hits) for url under rules
+    """
+    features, keywords, tld = url_features(url, rules)
+    return features, score_url_features(features, keywords, tld, rules)
+
+def heuristics_from_hits(hits, threshold):
+    """
+    Returns: (flagged, risk_score, reasons)
+    """
+    risk_score = sum(weight for _, weight, _ in hits)
+    return risk_score >= threshold, risk_score, [reason for _, _, reason in hits]
+
+def rule_audit(rules, threshold, features, hits):
+    """
+    Structured per-rule breakdown returned in audit mode
+    """
+    return {
+        "rules_version": rules.version,
+        "threshold": threshold,
+        "features": features,
+        "rules": [{"rule": rule, "weight": weight, "reason": reason} for rule, weight, reason in hits]
+    }
+
 def check_url_heuristics(url):
     """
     Check URL using heuristic rules for common fraud patterns
     Returns: (is_suspicious, risk_score, reasons)
     """
-    risk_score = 0
-    reasons = []
-    
+    rules = heuristic_rules.get()
     try:
-        parsed = urlparse(url.lower())
-        domain = parsed.netloc
-        path = parsed.path
-        
-        # Suspicious keywords in domain or path (English and common international variants)
-        suspicious_keywords = [
-            'login', 'signin', 'account', 'verify', 'secure', 'update', 'confirm',
-            'banking', 'paypal', 'amazon', 'apple', 'microsoft', 'google',
-            'password', 'suspended', 'locked', 'unusual', 'activity',
-            'click', 'urgent', 'action', 'required', 'wallet', 'crypto',
-            'prize', 'winner', 'claim', 'free', 'gift', 'congratulations',
-            # Portuguese/Spanish variants common in phishing
-            'atualizacao', 'atualizar', 'dados', 'conta', 'verificar', 'seguro',
-            'urgente', 'bloqueado', 'suspenso', 'confirmar', 'senha',
-            # Other international variants
-            'validar', 'restablecer', 'recuperar', 'notification'
-        ]
-        
-        url_lower = url.lower()
-        for keyword in suspicious_keywords:
-            if keyword in url_lower:
-                risk_score += 15
-                reasons.append(f"Contains suspicious keyword: '{keyword}'")
-        
-        # IP address instead of domain name
-        ip_pattern = r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
-        if re.search(ip_pattern, domain):
-            risk_score += 30
-            reasons.append("Uses IP address instead of domain name")
-        
-        # Excessive subdomains (e.g., paypal.secure.login.verify.com)
-        subdomain_count = domain.count('.')
-        if subdomain_count > 3:
-            risk_score += 25
-            reasons.append(f"Excessive subdomains ({subdomain_count})")
-        
-        # Very long domain names (often used in phishing)
-        if len(domain) > 40:
-            risk_score += 20
-            reasons.append(f"Unusually long domain ({len(domain)} characters)")
-        
-        # Suspicious TLDs (free/cheap domains commonly used in phishing)
-        suspicious_tlds = [
-            '.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.club', 
-            '.work', '.bid', '.online', '.site', '.website', '.space', 
-            '.info', '.pw', '.cc'
-        ]
-        for tld in suspicious_tlds:
-            if domain.endswith(tld):
-                risk_score += 25
-                reasons.append(f"Suspicious TLD: {tld}")
-        
-        # URL shorteners (can hide malicious links)
-        url_shorteners = ['bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 'is.gd', 'buff.ly']
-        if any(shortener in domain for shortener in url_shorteners):
-            risk_score += 20
-            reasons.append("URL shortener detected")
-        
-        # Excessive hyphens in domain
-        if domain.count('-') > 3:
-            risk_score += 15
-            reasons.append(f"Excessive hyphens in domain ({domain.count('-')})")
-        
-        # Non-HTTPS (less secure)
-        if parsed.scheme != 'https':
-            risk_score += 10
-            reasons.append("Not using HTTPS")
-        
-        # @ symbol in URL (can be used to trick users)
-        if '@' in url:
-            risk_score += 30
-            reasons.append("Contains @ symbol (potential redirect trick)")
-        
-        # Homograph/lookalike characters
-        suspicious_chars = ['а', 'е', 'о', 'р', 'с', 'у', 'х']  # Cyrillic lookalikes
-        for char in suspicious_chars:
-            if char in domain:
-                risk_score += 35
-                reasons.append("Contains lookalike characters (possible homograph attack)")
-                break
-        
-        # Port numbers (unusual for legitimate sites)
-        if ':' in domain and not domain.endswith(':443') and not domain.endswith(':80'):
-            risk_score += 20
-            reasons.append("Uses non-standard port")
-        
-        # Determine if suspicious based on risk score
-        is_suspicious = risk_score >= 30
-        
-        return is_suspicious, risk_score, reasons
-        
+        _, hits = url_rule_hits(url, rules)
     except Exception as e:
         return False, 0, [f"Error analyzing URL: {str(e)}"]
+    return heuristics_from_hits(hits, rules.suspicious_at)
 
-def predict_url(url):
+def explain_url_heuristics(url):
     """
-    Predict if a URL is malicious or safe using the Hugging Face model + heuristics
+    check_url_heuristics with the per-rule breakdown behind its score
+    Returns: (heuristics, audit)
     """
-    if not model or not tokenizer:
-        return {"error": "Model not loaded"}, 500
-    
+    rules = heuristic_rules.get()
     try:
-        # First, check heuristics
-        is_suspicious_heuristic, risk_score, heuristic_reasons = check_url_heuristics(url)
-        
-        # Tokenize the URL for ML model
-        inputs = tokenizer(url, return_tensors="pt", truncation=True, padding=True, max_length=128)
-        
-        # Get ML model prediction
-        with torch.no_grad():
-            outputs = model(**inputs)
-            logits = outputs.logits
-            probabilities = torch.softmax(logits, dim=1)
-            prediction = torch.argmax(probabilities, dim=1).item()
-            ml_confidence = probabilities[0][prediction].item()
-        
-        # Mapping prediction to labels
-        # 0: Benign, 1: Defacement, 2: Phishing, 3: Malware
-        label_map = {0: "Benign", 1: "Defacement", 2: "Phishing", 3: "Malware"}
-        ml_prediction_label = label_map.get(prediction, "Unknown")
-        
-        # Determine if malicious (anything other than Benign is considered malicious)
-        ml_is_malicious = prediction != 0
-        
-        # Combine ML prediction with heuristics
-        # If either heuristics OR ML model says it's malicious, mark as malicious
-        is_fraudulent = ml_is_malicious or is_suspicious_heuristic
-        
-        # Calculate combined confidence
-        if is_fraudulent:
-            # If both agree it's malicious, high confidence
-            if ml_is_malicious and is_suspicious_heuristic:
-                combined_confidence = max(ml_confidence, risk_score / 100)
-            # If only heuristics say malicious
-            elif is_suspicious_heuristic:
-                combined_confidence = risk_score / 100
-            # If only ML says malicious
-            else:
-                combined_confidence = ml_confidence
+        features, hits = url_rule_hits(url, rules)
+    except Exception as e:
+        return (False, 0, [f"Error analyzing URL: {str(e)}"]), {"rules_version": rules.version, "error": str(e)}
+    return heuristics_from_hits(hits, rules.suspicious_at), rule_audit(rules, rules.suspicious_at, features, hits)
+
+# Mapping prediction to labels
+# 0: Benign, 1: Defacement, 2: Phishing, 3: Malware
+LABEL_MAP = {0: "Benign", 1: "Defacement", 2: "Phishing", 3: "Malware"}
+
+def run_model(urls):
+    """
+    Run the URL model on a list of URLs in a single padded forward pass
+    Returns: list of (prediction, ml_confidence) tuples in input order
+    """
+    return backend.predict(urls)
+
+def classify_urls(urls, batch_size=BATCH_MAX_SIZE):
+    """
+    Classify URLs with the ML model, at most batch_size per forward pass
+    Returns: list of (prediction, ml_confidence) tuples in input order
+    """
+    results = []
+    for start in range(0, len(urls), batch_size):
+        results.extend(run_model(urls[start:start + batch_size]))
+    return results
+
+def run_model_logits(urls):
+    """
+    run_model that also returns the raw logits, for audits
+    Returns: (list of (prediction, ml_confidence) tuples, logits array) in input order
+    """
+    return backend.predict_with_logits(urls)
+
+def run_model_batch(urls):
+    """
+    run_model on the micro-batcher thread
+    Returns: list of ((prediction, ml_confidence), stage timings) tuples; every caller gets the batch's timings
+    """
+    results, timings = metrics.collect_timings(run_model, urls)
+    return [(result, timings) for result in results]
+
+# Single-URL requests go through the micro-batcher so concurrent callers share a forward pass
+url_batcher = MicroBatcher(run_model_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+def classify_url(url):
+    """
+    Classify one URL with the ML model
+    Returns: (prediction, ml_confidence)
+    """
+    # Includes time queued in the micro-batcher
+    with timed('model_wait'):
+        if MICRO_BATCHING:
+            # tokenize and model_forward ran on the batcher thread
+            result, batch_timings = url_batcher.submit(url).result()
+            metrics.add_timings(batch_timings)
+            return result
+        return run_model([url])[0]
+
+def run_inference(func, *args):
+    """
+    Run a model call on the inference executor in pool mode, inline otherwise
+    Raises: ExecutorBusy, JobTimeout (pool mode only)
+    """
+    if EXECUTION_MODE == 'pool':
+        # Stage timings from the executor thread go back to the waiting request
+        result, timings = inference_executor.run(metrics.collect_timings, func, *args)
+        metrics.add_timings(timings)
+        return result
+    return func(*args)
+
+def build_url_result(url, heuristics, prediction, ml_confidence):
+    """
+    Combine heuristic and ML model outputs into the detection response
+    """
+    is_suspicious_heuristic, risk_score, heuristic_reasons = heuristics
+    ml_prediction_label = LABEL_MAP.get(prediction, "Unknown")
+    
+    # Determine if malicious (anything other than Benign is considered malicious)
+    ml_is_malicious = prediction != 0
+    
+    # Combine ML prediction with heuristics
+    # If either heuristics OR ML model says it's malicious, mark as malicious
+    is_fraudulent = ml_is_malicious or is_suspicious_heuristic
+    
+    # Calculate combined confidence
+    if is_fraudulent:
+        # If both agree it's malicious, high confidence
+        if ml_is_malicious and is_suspicious_heuristic:
+            combined_confidence = max(ml_confidence, risk_score / 100)
+        # If only heuristics say malicious
+        elif is_suspicious_heuristic:
+            combined_confidence = risk_score / 100
+        # If only ML says malicious
         else:
-            # Both say safe
             combined_confidence = ml_confidence
-        
-        # Overall label
-        if is_fraudulent:
-            if ml_is_malicious:
-                label = "malicious"
-                threat_type = ml_prediction_label
-            else:
-                label = "malicious"
-                threat_type = "Suspicious"
+    else:
+        # Both say safe
+        combined_confidence = ml_confidence
+    
+    # Overall label
+    if is_fraudulent:
+        if ml_is_malicious:
+            label = "malicious"
+            threat_type = ml_prediction_label
         else:
-            label = "safe"
-            threat_type = "Benign"
-        
-        result = {
+            label = "malicious"
+            threat_type = "Suspicious"
+    else:
+        label = "safe"
+        threat_type = "Benign"
+    
+    return {
+        "url": url,
+        "prediction": label,
+        "confidence": float(combined_confidence),
+        "is_fraudulent": is_fraudulent,
+        "threat_type": threat_type,
+        "risk_score": risk_score,
+        "ml_prediction": ml_prediction_label,
+        "ml_confidence": float(ml_confidence),
+        "heuristic_check": "suspicious" if is_suspicious_heuristic else "clean",
+        "warning_flags": heuristic_reasons if heuristic_reasons else [],
+        "decided_by": "model"
+    }
+
+def url_host(url):
+    try:
+        return urlsplit(url.strip().lower()).hostname
+    except ValueError:
+        return None
+
+def tiered_verdict(url, safe_below=None, malicious_at=None, reputation=None):
+    """
+    Decide a URL without the model when the domain lists or heuristics are conclusive
+    reputation: the domain's stored reputation, weighed in with the heuristics (see add_reputation)
+    Returns: (result, heuristics) - result is None when the score falls in the uncertainty band
+    """
+    safe_below = TIER_SAFE_BELOW if safe_below is None else safe_below
+    malicious_at = TIER_MALICIOUS_AT if malicious_at is None else malicious_at
+    
+    host = url_host(url)
+    if host in url_blocklist:
+        return {
+            "url": url,
+            "prediction": "malicious",
+            "confidence": 1.0,
+            "is_fraudulent": True,
+            "threat_type": "Blocklisted",
+            "risk_score": 100,
+            "ml_prediction": "Not evaluated",
+            "ml_confidence": None,
+            "heuristic_check": "skipped",
+            "warning_flags": ["Domain is on the blocklist"],
+            "decided_by": "blocklist"
+        }, None
+    if host in url_allowlist:
+        return {
             "url": url,
-            "prediction": label,
-            "confidence": float(combined_confidence),
-            "is_fraudulent": is_fraudulent,
-            "threat_type": threat_type,
-            "risk_score": risk_score,
-            "ml_prediction": ml_prediction_label,
-            "ml_confidence": float(ml_confidence),
-            "heuristic_check": "suspicious" if is_suspicious_heuristic else "clean",
-            "warning_flags": heuristic_reasons if heuristic_reasons else []
+            "prediction": "safe",
+            "confidence": 1.0,
+            "is_fraudulent": False,
+            "threat_type": "Benign",
+            "risk_score": 0,
+            "ml_prediction": "Not evaluated",
+            "ml_confidence": None,
+            "heuristic_check": "skipped",
+            "warning_flags": [],
+            "decided_by": "allowlist"
+        }, None
+    
+    heuristics = add_reputation(check_url_heuristics(url), reputation)
+    is_suspicious_heuristic, risk_score, heuristic_reasons = heuristics
+    if safe_below <= risk_score < malicious_at:
+        return None, heuristics
+    
+    is_fraudulent = risk_score >= malicious_at
+    return {
+        "url": url,
+        "prediction": "malicious" if is_fraudulent else "safe",
+        "confidence": float(risk_score / 100 if is_fraudulent else 1 - risk_score / 100),
+        "is_fraudulent": is_fraudulent,
+        "threat_type": "Suspicious" if is_fraudulent else "Benign",
+        "risk_score": risk_score,
+        "ml_prediction": "Not evaluated",
+        "ml_confidence": None,
+        "heuristic_check": "suspicious" if is_suspicious_heuristic else "clean",
+        "warning_flags": heuristic_reasons,
+        "decided_by": "heuristics"
+    }, heuristics
+
+def screen_url(url, reputation=None):
+    """
+    Run the tiers that come before the model
+    reputation: the domain's stored reputation from lookup_verdict, if any
+    Returns: (result, heuristics) - result is None when the model must decide
+    """
+    with timed('url_heuristics'):
+        if DECISION_MODE == 'tiered':
+            return tiered_verdict(url, reputation=reputation)
+        return None, add_reputation(check_url_heuristics(url), reputation)
+
+def reputation_verdict(url, reputation):
+    """
+    Decide a URL whose host is covered by an imported blocklist
+    Returns: result dict, or None when the host is not listed
+    """
+    if reputation is None or not reputation["listed"]:
+        return None
+    
+    return {
+        "url": url,
+        "prediction": "malicious",
+        "confidence": 1.0,
+        "is_fraudulent": True,
+        "threat_type": "Blocklisted",
+        "risk_score": 100,
+        "ml_prediction": "Not evaluated",
+        "ml_confidence": None,
+        "heuristic_check": "skipped",
+        "warning_flags": [f"Domain is on the {reputation['listed']} blocklist"],
+        "decided_by": "reputation",
+        "domain_reputation": reputation
+    }
+
+def add_reputation(heuristics, reputation):
+    """
+    Count a domain's bad stored reputation as one more heuristic rule worth REPUTATION_WEIGHT
+    The URL is still analyzed, so its verdict keeps updating the domain's reputation
+    Returns: (is_suspicious, risk_score, reasons)
+    """
+    if (reputation is None or reputation["scans"] < REPUTATION_MIN_SCANS
+            or reputation["malicious_ratio"] < REPUTATION_MALICIOUS_RATIO):
+        return heuristics
+    
+    _, risk_score, reasons = heuristics
+    risk_score += REPUTATION_WEIGHT
+    reason = f"Domain had {reputation['malicious']:g} confirmed malicious verdicts in {reputation['scans']:g} recent scans"
+    return risk_score >= heuristic_rules.get().suspicious_at, risk_score, reasons + [reason]
+
+def lookup_verdict(url):
+    """
+    Verdict cache, then the verdict store (the URL's own verdict, then its domain's blocklist status)
+    Returns: (result, reputation) - result is None when the URL must be analyzed, in which case
+    reputation is the domain's stored reputation (or None) for screen_url
+    """
+    cached = verdict_cache.get(url)
+    if cached is not None:
+        return dict(cached, url=url), None
+    if verdict_store is None:
+        return None, None
+    
+    try:
+        with timed('verdict_store'):
+            # Verdicts scored under other rules are recomputed, so a rules reload takes effect
+            result = verdict_store.lookup(url, rules=heuristic_rules.get().tag)
+            reputation = verdict_store.reputation(url) if result is None else None
+    except sqlite3.Error:
+        verdict_store.note_error()
+        return None, None
+    result = result or reputation_verdict(url, reputation)
+    if result is None:
+        return None, reputation
+    verdict_cache.set(url, dict(result))
+    return dict(result, url=url), None
+
+def remember_verdicts(verdicts):
+    """
+    Cache (url, result) pairs and persist them to the verdict store
+    """
+    for url, result in verdicts:
+        verdict_cache.set(url, dict(result))
+    if verdict_store is None:
+        return
+    
+    # Blocklist hits from the store are not counted again; the list already decides them
+    verdicts = [(url, result) for url, result in verdicts if result.get("decided_by") != "reputation"]
+    try:
+        verdict_store.record_many(verdicts, rules=heuristic_rules.get().tag)
+    except sqlite3.Error:
+        verdict_store.note_error()
+
+def predict_url(url, explain=False):
+    """
+    Predict if a URL is malicious or safe using the Hugging Face model + heuristics
+    explain: return the verdict with an "audit" block instead (see audit_url)
+    """
+    unavailable = model_unavailable()
+    if unavailable:
+        return unavailable
+    if explain:
+        return audit_url(url)
+    if not REQUEST_COALESCING:
+        return compute_url_verdict(url)
+    
+    result, status_code = url_flight.do(canonicalize_url(url), compute_url_verdict, url)
+    return shared_url_result(result, url), status_code
+
+def shared_url_result(result, url):
+    """
+    Copy of a coalesced result for one caller (callers add fields), under the URL that caller sent
+    """
+    return dict(result, url=url) if 'url' in result else dict(result)
+
+def compute_url_verdict(url):
+    """
+    predict_url without coalescing: verdict cache and store, then the tiers and the model
+    Returns: (result, status_code)
+    """
+    known, reputation = lookup_verdict(url)
+    if known is not None:
+        return known, 200
+    
+    try:
+        # First, check domain lists and heuristics; the model only runs if they are inconclusive
+        result, heuristics = screen_url(url, reputation)
+        if result is None:
+            prediction, ml_confidence = run_inference(classify_url, url)
+            result = build_url_result(url, heuristics, prediction, ml_confidence)
+        remember_verdicts([(url, result)])
+        return result, 200
+    except ExecutorBusy as e:
+        return {"error": str(e)}, 503
+    except JobTimeout as e:
+        return {"error": str(e)}, 504
+    except Exception as e:
+        return {"error": f"Prediction failed: {str(e)}"}, 500
+
+def audit_url(url):
+    """
+    Audit mode for predict_url: per-rule hits with their weights and the raw model logits
+    Bypasses the verdict cache and store, and runs the model even when a tier decides
+    without it, so the audit is always complete. Audited verdicts are not stored.
+    Returns: (result, status_code)
+    """
+    try:
+        heuristics, audit = explain_url_heuristics(url)
+        [(prediction, ml_confidence)], logits = run_inference(run_model_logits, [url])
+        audit["model"] = {
+            "labels": [LABEL_MAP.get(i, "Unknown") for i in range(len(logits[0]))],
+            "logits": [float(value) for value in logits[0]],
+            "prediction": LABEL_MAP.get(prediction, "Unknown"),
+            "confidence": float(ml_confidence)
         }
-        
+        result = tiered_verdict(url)[0] if DECISION_MODE == 'tiered' else None
+        if result is None:
+            result = build_url_result(url, heuristics, prediction, ml_confidence)
+        result["audit"] = audit
         return result, 200
+    except ExecutorBusy as e:
+        return {"error": str(e)}, 503
+    except JobTimeout as e:
+        return {"error": str(e)}, 504
     except Exception as e:
         return {"error": f"Prediction failed: {str(e)}"}, 500
 
+def predict_urls(urls, batch_size=BATCH_MAX_SIZE):
+    """
+    Batched predict_url: one forward pass per batch_size URLs
+    Returns: list of (result, status_code) tuples in input order
+    """
+    unavailable = model_unavailable()
+    if unavailable:
+        return [unavailable for _ in urls]
+    
+    results = [None] * len(urls)
+    pending = []
+    screened = []
+    for i, url in enumerate(urls):
+        known, reputation = lookup_verdict(url)
+        if known is not None:
+            results[i] = (known, 200)
+            continue
+        result, heuristics = screen_url(url, reputation)
+        if result is not None:
+            screened.append((url, result))
+            results[i] = (result, 200)
+        else:
+            pending.append((i, heuristics))
+    
+    remember_verdicts(screened)
+    if not pending:
+        return results
+    
+    try:
+        predictions = run_inference(classify_urls, [urls[i] for i, _ in pending], batch_size)
+    except Exception as e:
+        if isinstance(e, (ExecutorBusy, JobTimeout)):
+            failure = ({"error": str(e)}, 503 if isinstance(e, ExecutorBusy) else 504)
+        else:
+            failure = ({"error": f"Prediction failed: {str(e)}"}, 500)
+        for i, _ in pending:
+            results[i] = failure
+        return results
+    
+    predicted = []
+    for (i, heuristics), (prediction, ml_confidence) in zip(pending, predictions):
+        result = build_url_result(urls[i], heuristics, prediction, ml_confidence)
+        predicted.append((urls[i], result))
+        results[i] = (result, 200)
+    remember_verdicts(predicted)
+    
+    return results
+
+PHONE_VPA_PATTERN = re.compile(r'\d{10}@')
+
 def is_payment_qr(qr_data):
     """
-    Check if QR code contains payment information
+    Check if QR code contains payment information (UPI link or EMVCo/Bharat QR)
+    """
+    return heuristic_rules.get().payment_pattern_matcher.search(qr_data.lower()) or is_emv_qr(qr_data)
+
+def amount_tier(amount, rules=None):
+    """
+    Returns: (score, label) for the highest tier the amount exceeds, or None
+    """
+    return (rules or heuristic_rules.get()).amount_tier(amount)
+
+def payment_features(qr_data, rules):
+    """
+    Raw inputs of the payment rules, before any weight or tier is applied (see feature_store.PAYMENT_COLUMNS)
+    Returns: (features, keywords, payment_info); amount is None when absent or unparsable
     """
     qr_lower = qr_data.lower()
     
-    # Common UPI/payment patterns
-    payment_patterns = [
-        'upi://', 'paytm', 'phonepe', 'googlepay', 'gpay',
-        'bhim', 'amazonpay', 'mobikwik', 'freecharge',
-        'pa=', 'pn=', 'mc=', 'tid=', 'tr=', 'tn=', 'am=', 'cu='
-    ]
+    # Parse UPI parameters or EMV fields in one pass
+    payment_format, payment_info = parse_payment_qr(qr_data)
+    
+    # Suspicious keywords in payee name or anywhere in the payload
+    # Keywords have no spaces, so the decoded name only adds matches when it was percent-encoded
+    keyword_text = qr_lower
+    if '%' in qr_data:
+        keyword_text += '\n' + payment_info.get('payee_name', '').lower()
+    keywords = rules.payment_keyword_matcher.find_all(keyword_text)
     
-    for pattern in payment_patterns:
-        if pattern in qr_lower:
-            return True
+    amount = None
+    if payment_info.get('amount', ''):
+        try:
+            amount = float(payment_info['amount'])
+        except ValueError:
+            pass
     
-    return False
+    payee_address = payment_info.get('payee_address', '').lower()
+    return {
+        "keywords": len(keywords),
+        # Personal account instead of merchant
+        "personal_provider": '@' in payee_address and
+                             rules.personal_provider_matcher.search(payee_address.rsplit('@', 1)[-1]),
+        # Random-looking UPI ID
+        "phone_vpa": PHONE_VPA_PATTERN.search(payee_address) is not None,
+        "amount": amount,
+        "urgent_note": rules.urgent_word_matcher.search(payment_info.get('note', '').lower()),
+        # Legitimate merchants usually have a category code
+        "missing_merchant_code": 'merchant_code' not in payment_info and 'amount' in payment_info,
+        "payment_apps": len(rules.payment_app_matcher.find_all(qr_lower)),
+        # EMV payloads carry a checksum; a mismatch means the QR was edited after issue
+        "checksum_mismatch": payment_format == 'emv' and not payment_info['crc_valid']
+    }, keywords, payment_info
+
+def score_payment_features(features, keywords, rules):
+    """
+    Apply the rule weights and amount tiers to payment features
+    Returns: list of (rule, weight, reason) hits, in warning flag order
+    """
+    weights = rules.payment_weights
+    hits = [('keyword', weights['keyword'], f"Suspicious keyword in payment: '{keyword}'") for keyword in keywords]
+    if features['personal_provider']:
+        hits.append(('personal_provider', weights['personal_provider'], "Payment to personal account instead of merchant"))
+    if features['phone_vpa']:
+        hits.append(('phone_vpa', weights['phone_vpa'], "Payment to phone number-based UPI ID"))
+    tier = rules.amount_tier(features['amount']) if features['amount'] is not None else None
+    if tier:
+        hits.append(('amount', tier[0], f"{tier[1]}: ₹{features['amount']}"))
+    if features['urgent_note']:
+        hits.append(('urgent_note', weights['urgent_note'], "Urgent/pressure language in transaction note"))
+    if features['missing_merchant_code']:
+        hits.append(('missing_merchant_code', weights['missing_merchant_code'],
+                     "Missing merchant category code (unusual for businesses)"))
+    if features['payment_apps'] > 1:
+        hits.append(('multiple_apps', weights['multiple_apps'], "Multiple payment apps in single QR (unusual)"))
+    if features['checksum_mismatch']:
+        hits.append(('checksum_mismatch', weights['checksum_mismatch'], "Payment QR checksum mismatch (possibly tampered)"))
+    return hits
+
+def payment_rule_hits(qr_data, rules):
+    """
+    Returns: (features, hits, payment_info) for qr_data under rules
+    """
+    features, keywords, payment_info = payment_features(qr_data, rules)
+    return features, score_payment_features(features, keywords, rules), payment_info
 
 def check_payment_qr_heuristics(qr_data):
     """
     Analyze payment QR code for fraudulent patterns
     Returns: (is_fraudulent, risk_score, reasons, payment_info)
     """
-    risk_score = 0
-    reasons = []
-    payment_info = {}
-    
+    rules = heuristic_rules.get()
     try:
-        qr_lower = qr_data.lower()
-        
-        # Extract UPI parameters if present
-        if 'pa=' in qr_data:
-            pa_match = re.search(r'pa=([^&\s]+)', qr_data, re.IGNORECASE)
-            if pa_match:
-                payment_info['payee_address'] = pa_match.group(1)
-        
-        if 'pn=' in qr_data:
-            pn_match = re.search(r'pn=([^&\s]+)', qr_data, re.IGNORECASE)
-            if pn_match:
-                payment_info['payee_name'] = pn_match.group(1).replace('+', ' ')
-        
-        if 'am=' in qr_data:
-            am_match = re.search(r'am=([^&\s]+)', qr_data, re.IGNORECASE)
-            if am_match:
-                payment_info['amount'] = am_match.group(1)
-        
-        # Check for suspicious patterns in payment QR
-        
-        # 1. Suspicious keywords in payee name
-        suspicious_keywords = [
-            'police', 'officer', 'cyber', 'crime', 'investigation',
-            'arrest', 'warrant', 'court', 'legal', 'fine',
-            'penalty', 'seized', 'frozen', 'blocked',
-            'prize', 'lottery', 'winner', 'claim', 'reward',
-            'refund', 'cashback', 'bonus', 'voucher',
-            'verify', 'update', 'confirm', 'security'
-        ]
-        
-        payee_name = payment_info.get('payee_name', '').lower()
-        for keyword in suspicious_keywords:
-            if keyword in payee_name or keyword in qr_lower:
-                risk_score += 25
-                reasons.append(f"Suspicious keyword in payment: '{keyword}'")
-        
-        # 2. Generic/suspicious UPI IDs
-        payee_address = payment_info.get('payee_address', '').lower()
-        if payee_address:
-            # Personal account instead of merchant
-            if '@' in payee_address:
-                provider = payee_address.split('@')[-1]
-                # Check if it's a personal account provider (not merchant)
-                personal_providers = ['okaxis', 'okicici', 'okhdfcbank', 'oksbi', 'paytm']
-                if any(p in provider for p in personal_providers):
-                    risk_score += 15
-                    reasons.append("Payment to personal account instead of merchant")
-            
-            # Random-looking UPI ID
-            if re.search(r'\d{10}@', payee_address):
-                risk_score += 10
-                reasons.append("Payment to phone number-based UPI ID")
-        
-        # 3. Unusually high amount
-        amount = payment_info.get('amount', '')
-        if amount:
-            try:
-                amount_float = float(amount)
-                if amount_float > 10000:
-                    risk_score += 20
-                    reasons.append(f"High payment amount: ₹{amount_float}")
-                elif amount_float > 50000:
-                    risk_score += 35
-                    reasons.append(f"Very high payment amount: ₹{amount_float}")
-            except ValueError:
-                pass
-        
-        # 4. Urgent/threatening transaction notes
-        if 'tn=' in qr_data:
-            tn_match = re.search(r'tn=([^&\s]+)', qr_data, re.IGNORECASE)
-            if tn_match:
-                transaction_note = tn_match.group(1).lower()
-                urgent_words = ['urgent', 'immediately', 'asap', 'now', 'quickly', 'hurry']
-                for word in urgent_words:
-                    if word in transaction_note:
-                        risk_score += 15
-                        reasons.append("Urgent/pressure language in transaction note")
-                        break
-        
-        # 5. Missing merchant code (legitimate merchants usually have it)
-        if 'mc=' not in qr_data and 'am=' in qr_data:
-            risk_score += 10
-            reasons.append("Missing merchant category code (unusual for businesses)")
-        
-        # 6. Multiple payment apps in same QR (unusual)
-        payment_app_count = sum([1 for app in ['paytm', 'phonepe', 'gpay', 'amazonpay'] if app in qr_lower])
-        if payment_app_count > 1:
-            risk_score += 20
-            reasons.append("Multiple payment apps in single QR (unusual)")
-        
-        is_fraudulent = risk_score >= 30
-        
-        return is_fraudulent, risk_score, reasons, payment_info
-        
+        _, hits, payment_info = payment_rule_hits(qr_data, rules)
     except Exception as e:
         return False, 0, [f"Error analyzing payment QR: {str(e)}"], {}
+    return (*heuristics_from_hits(hits, rules.fraudulent_at), payment_info)
 
-def extract_and_analyze_qr(image_path):
+def explain_payment_heuristics(qr_data):
     """
-    Extract data from QR code and determine if it's URL or payment type
-    Returns: (qr_data, qr_type, error)
-    qr_type: 'url' or 'payment' or 'other'
+    check_payment_qr_heuristics with the per-rule breakdown behind its score
+    Returns: (heuristics, audit)
     """
+    rules = heuristic_rules.get()
     try:
-        # Read the image
-        image = cv2.imread(image_path)
-        if image is None:
-            return None, None, "Failed to read image"
-        
-        # Decode QR codes
-        decoded_objects = pyzbar.decode(image)
-        
-        if not decoded_objects:
-            return None, None, "No QR code found in image"
+        features, hits, payment_info = payment_rule_hits(qr_data, rules)
+    except Exception as e:
+        return (False, 0, [f"Error analyzing payment QR: {str(e)}"], {}), {"rules_version": rules.version, "error": str(e)}
+    heuristics = (*heuristics_from_hits(hits, rules.fraudulent_at), payment_info)
+    return heuristics, rule_audit(rules, rules.fraudulent_at, features, hits)
+
+def classify_qr_payload(qr_data):
+    """
+    Determine if decoded QR text is a URL or payment, normalizing URLs
+    Returns: (qr_data, qr_type)
+    qr_type: 'url' or 'payment' or 'other'
+    """
+    qr_data = qr_data.strip()
+    
+    # Try to extract URL if it's embedded in other data (e.g., "316254    http://example.com")
+    url_match = re.search(r'(https?://[^\s]+|www\.[^\s]+)', qr_data)
+    if url_match:
+        extracted_url = url_match.group(1)
+        print(f"Extracted URL from QR data: {extracted_url}")
+        qr_data = extracted_url
+    
+    # Determine QR type
+    # Check for URL patterns (more flexible matching)
+    if (qr_data.startswith('http://') or 
+        qr_data.startswith('https://') or
+        qr_data.startswith('www.') or
+        re.match(r'^[a-zA-Z0-9-]+\.[a-zA-Z]{2,}', qr_data)):
         
-        # Extract the first QR code data
-        for obj in decoded_objects:
-            qr_data = obj.data.decode('utf-8').strip()
-            
-            # Try to extract URL if it's embedded in other data (e.g., "316254    http://example.com")
-            url_match = re.search(r'(https?://[^\s]+|www\.[^\s]+)', qr_data)
-            if url_match:
-                extracted_url = url_match.group(1)
-                print(f"Extracted URL from QR data: {extracted_url}")
-                qr_data = extracted_url
-            
-            # Determine QR type
-            # Check for URL patterns (more flexible matching)
-            if (qr_data.startswith('http://') or 
-                qr_data.startswith('https://') or
-                qr_data.startswith('www.') or
-                re.match(r'^[a-zA-Z0-9-]+\.[a-zA-Z]{2,}', qr_data)):
-                
-                # Normalize URL if it doesn't have http/https
-                if not qr_data.startswith('http'):
-                    if qr_data.startswith('www.'):
-                        qr_data = 'http://' + qr_data
-                    else:
-                        # Check if it looks like a domain
-                        if '.' in qr_data and not ' ' in qr_data:
-                            qr_data = 'http://' + qr_data
-                
-                return qr_data, 'url', None
-            elif is_payment_qr(qr_data):
-                return qr_data, 'payment', None
+        # Normalize URL if it doesn't have http/https
+        if not qr_data.startswith('http'):
+            if qr_data.startswith('www.'):
+                qr_data = 'http://' + qr_data
             else:
-                # Check if it might be a URL without protocol
-                # Look for common domain patterns
-                if re.search(r'\w+\.\w{2,}(/|$)', qr_data) and not is_payment_qr(qr_data):
-                    # Likely a URL without protocol
-                    if not qr_data.startswith('http'):
-                        qr_data = 'http://' + qr_data
-                    return qr_data, 'url', None
-                
-                return qr_data, 'other', None
+                # Check if it looks like a domain
+                if '.' in qr_data and not ' ' in qr_data:
+                    qr_data = 'http://' + qr_data
         
-        return None, None, "No data found in QR code"
+        return qr_data, 'url'
+    elif is_payment_qr(qr_data):
+        return qr_data, 'payment'
+    else:
+        # Check if it might be a URL without protocol
+        # Look for common domain patterns
+        if re.search(r'\w+\.\w{2,}(/|$)', qr_data) and not is_payment_qr(qr_data):
+            # Likely a URL without protocol
+            if not qr_data.startswith('http'):
+                qr_data = 'http://' + qr_data
+            return qr_data, 'url'
+        
+        return qr_data, 'other'
+
+def first_qr_payload(symbols):
+    """
+    Classify the first decoded symbol
+    Returns: (qr_data, qr_type, error)
+    """
+    if not symbols:
+        return None, None, "No QR code found in image"
+    try:
+        qr_data, qr_type = classify_qr_payload(symbols[0].data.decode('utf-8'))
+        return qr_data, qr_type, None
     except Exception as e:
         return None, None, f"QR extraction failed: {str(e)}"
 
+def upload_digest(data):
+    """
+    Returns: content hash of upload bytes, identical for byte-identical re-uploads
+    """
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def decode_upload_symbols(data):
+    """
+    Decode upload bytes and their QR codes, in the QR process pool in pool mode
+    Returns: (symbols, decode_info, error)
+    Raises: ExecutorBusy, JobTimeout (pool mode only)
+    """
+    if EXECUTION_MODE == 'pool':
+        # Stage timings inside the pool process are not exported; this times the whole job
+        with timed('qr_decode_job'):
+            return qr_executor.run(decode_upload, data)
+    return decode_upload(data)
+
+def build_payment_result(qr_data, explain=False):
+    """
+    Run payment QR heuristics and build the detection response
+    explain: add an "audit" block with the per-rule hits and their weights
+    """
+    audit = None
+    with timed('payment_heuristics'):
+        if explain:
+            (is_fraudulent, risk_score, reasons, payment_info), audit = explain_payment_heuristics(qr_data)
+        else:
+            is_fraudulent, risk_score, reasons, payment_info = check_payment_qr_heuristics(qr_data)
+    
+    result = {
+        "qr_data": qr_data,
+        "qr_type": "payment",
+        "prediction": "malicious" if is_fraudulent else "safe",
+        "is_fraudulent": is_fraudulent,
+        "confidence": risk_score / 100,
+        "risk_score": risk_score,
+        "threat_type": "Fraudulent Payment" if is_fraudulent else "Legitimate Payment",
+        "warning_flags": reasons,
+        "payment_info": payment_info,
+        "extracted_from_qr": True
+    }
+    if audit is not None:
+        result["audit"] = audit
+    return result
+
+def build_other_result(qr_data):
+    """
+    Response for QR data that is neither a URL nor a payment
+    """
+    return {
+        "qr_data": qr_data,
+        "qr_type": "other",
+        "prediction": "unknown",
+        "is_fraudulent": False,
+        "confidence": 0,
+        "message": "QR code contains non-URL and non-payment data. Data: " + qr_data[:100],
+        "extracted_from_qr": True
+    }
+
+# Worst-case ordering for aggregating several QR verdicts
+PREDICTION_SEVERITY = {"malicious": 2, "unknown": 1, "safe": 0}
+
+def analyze_qr_symbols(symbols, predict_many=None):
+    """
+    Classify every decoded QR symbol, with all URL payloads in one batched model call
+    predict_many: replaces predict_urls (see qr_response)
+    Returns: (results, worst_index) where each result carries its bounding box
+    """
+    results = [None] * len(symbols)
+    url_indices = []
+    url_payloads = []
+    
+    for i, symbol in enumerate(symbols):
+        qr_data, qr_type = classify_qr_payload(symbol.data.decode('utf-8', errors='replace'))
+        if qr_type == 'payment':
+            results[i] = build_payment_result(qr_data)
+        elif qr_type == 'url' or qr_data:
+            # Non-standard data is analyzed as a potential URL, same as single-code mode
+            url_indices.append(i)
+            url_payloads.append((qr_data, qr_type))
+        else:
+            results[i] = build_other_result(qr_data)
+    
+    url_results = (predict_many or predict_urls)([qr_data for qr_data, _ in url_payloads])
+    for i, (qr_data, qr_type), (result, status_code) in zip(url_indices, url_payloads, url_results):
+        if status_code != 200:
+            result = dict(result, qr_data=qr_data, prediction="unknown", is_fraudulent=False, confidence=0)
+        result['extracted_from_qr'] = True
+        result['qr_type'] = 'url'
+        if qr_type != 'url':
+            result['note'] = 'Analyzed as potential URL (format not standard)'
+        results[i] = result
+    
+    for result, symbol in zip(results, symbols):
+        left, top, width, height = symbol.rect
+        result['bounding_box'] = {"left": left, "top": top, "width": width, "height": height}
+    
+    worst_index = max(
+        range(len(results)),
+        key=lambda i: (PREDICTION_SEVERITY.get(results[i]['prediction'], 1), results[i].get('confidence', 0))
+    )
+    return results, worst_index
+
+# Per-request stage timings are returned in a "timings" block when this header is set
+TIMINGS_HEADER = 'X-Debug-Timings'
+
+@app.before_request
+def start_request_metrics():
+    request.environ['securescan.start'] = time.perf_counter()
+    if request.headers.get(TIMINGS_HEADER):
+        metrics.start_request_timings()
+
+@app.after_request
+def record_request_metrics(response):
+    timings = metrics.finish_request_timings()
+    elapsed = time.perf_counter() - request.environ.get('securescan.start', time.perf_counter())
+    if metrics.METRICS_ENABLED:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.registry.observe('request_seconds', elapsed, endpoint=endpoint)
+        metrics.registry.inc('requests_total', endpoint=endpoint, status=str(response.status_code))
+    if timings is not None and response.is_json and not response.is_streamed:
+        body = response.get_json()
+        if isinstance(body, dict):
+            body['timings'] = dict(timings, total=round(elapsed * 1000, 3))
+            response.set_data(json.dumps(body))
+    return response
+
+@app.after_request
+def add_retry_after(response):
+    # 503s here are transient (model loading, executor queue full)
+    if response.status_code == 503 and 'Retry-After' not in response.headers:
+        response.headers['Retry-After'] = '1'
+    return response
+
+def cache_samples(prefix, description, stats):
+    """
+    Returns: metric tuples for an LRUCache's stats under prefix (see verdict_cache.py)
+    """
+    return [
+        (f'{prefix}_{name}_total', 'counter', f'{description} {name}', {(): stats[name]})
+        for name in ('hits', 'misses', 'evictions', 'expirations')
+    ] + [(f'{prefix}_entries', 'gauge', f'{description} entries', {(): stats['size']})]
+
+def collect_cache_metrics():
+    return (cache_samples('verdict_cache', 'Verdict cache', verdict_cache.stats())
+            + cache_samples('qr_cache', 'QR result cache', qr_result_cache.stats()))
+
+metrics.registry.add_collector(collect_cache_metrics)
+
+def collect_store_metrics():
+    if verdict_store is None:
+        return []
+    stats = verdict_store.stats()
+    return [
+        (f'verdict_store_{name}_total', 'counter', f'Verdict store {name.replace("_", " ")}', {(): stats[name]})
+        for name in ('url_hits', 'domain_lookups', 'misses', 'writes', 'errors')
+    ]
+
+metrics.registry.add_collector(collect_store_metrics)
+
+def collect_rule_metrics():
+    stats = heuristic_rules.stats()
+    return [
+        ('heuristic_rules_info', 'gauge', 'Active heuristic rule version', {(('version', stats['version']),): 1}),
+        ('heuristic_rules_compile_ms', 'gauge', 'Compile time of the active rule file', {(): stats['compile_ms']}),
+        ('heuristic_rules_reloads_total', 'counter', 'Rule file reloads', {(): stats['reloads']}),
+        ('heuristic_rules_errors_total', 'counter', 'Rule file reloads rejected as invalid', {(): stats['errors']}),
+    ]
+
+metrics.registry.add_collector(collect_rule_metrics)
+
+def collect_coalescing_metrics():
+    flights = {name: flight.stats() for name, flight in request_flights.items()}
+    samples = lambda name: {(('flight', flight),): stats[name] for flight, stats in flights.items()}
+    return [
+        ('coalesced_requests_total', 'counter', 'Requests that shared an identical in-flight computation',
+         samples('coalesced')),
+        ('coalescing_leaders_total', 'counter', 'Computations run on behalf of coalesced requests', samples('leaders')),
+        ('coalescing_in_flight', 'gauge', 'Computations currently in flight', samples('in_flight')),
+    ]
+
+metrics.registry.add_collector(collect_coalescing_metrics)
+
+def collect_executor_metrics():
+    if EXECUTION_MODE != 'pool':
+        return []
+    executors = {'qr_decode': qr_executor.stats(), 'inference': inference_executor.stats()}
+    samples = lambda name: {(('executor', executor),): stats[name] for executor, stats in executors.items()}
+    return [
+        ('executor_pending', 'gauge', 'Jobs queued or running', samples('pending')),
+        ('executor_rejected_total', 'counter', 'Jobs rejected with 503 because the queue was full', samples('rejected')),
+        ('executor_timeouts_total', 'counter', 'Jobs that exceeded the executor timeout', samples('timeouts')),
+        ('executor_recycled_total', 'counter', 'Pools replaced after a crashed or hung job', samples('recycled')),
+    ]
+
+metrics.registry.add_collector(collect_executor_metrics)
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text-format metrics for this worker process"""
+    if not metrics.METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; ?ready=1 returns 503 until the model is loaded (readiness probe)"""
     model_status = "loaded" if model and tokenizer else "not loaded"
+    status_code = 503 if request.args.get('ready') and model_status != "loaded" else 200
     return jsonify({
         "status": "running",
         "model_status": model_status,
-        "service": "ML Fraud Detection Service"
-    }), 200
+        "model_state": model_state["status"],
+        "model_load_seconds": model_state["load_seconds"],
+        "model_warmup_seconds": model_state["warmup_seconds"],
+        "inference_threads": backend.threads if backend is not None else None,
+        "model_error": model_state["error"],
+        "model_load_mode": MODEL_LOAD_MODE,
+        "inference_backend": INFERENCE_BACKEND,
+        "service": "ML Fraud Detection Service",
+        "verdict_cache": verdict_cache.stats(),
+        "qr_cache": qr_result_cache.stats(),
+        "verdict_store": verdict_store.stats() if verdict_store is not None else None,
+        "rules": heuristic_rules.stats(),
+        "request_coalescing": {name: flight.stats() for name, flight in request_flights.items()}
+                              if REQUEST_COALESCING else None,
+        "execution_mode": EXECUTION_MODE,
+        "executors": {
+            "qr_decode": qr_executor.stats(),
+            "inference": inference_executor.stats()
+        } if EXECUTION_MODE == 'pool' else None
+    }), status_code
 
 @app.route('/api/detect_link', methods=['POST'])
 def detect_link():
     """
     Endpoint to detect if a link is malicious
     Expected input: { "url": "https://example.com" }
+    Query params: explain=1 (audit mode: per-rule hits, weights and raw model logits; bypasses the verdict cache)
     """
     try:
         data = request.get_json()
@@ -434,103 +1127,244 @@ def detect_link():
             return jsonify({"error": "URL cannot be empty"}), 400
         
         # Predict if URL is malicious
-        result, status_code = predict_url(url)
+        result, status_code = predict_url(url, request.args.get('explain') == '1')
         return jsonify(result), status_code
         
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
-@app.route('/api/detect_qr', methods=['POST'])
-def detect_qr():
+@app.route('/api/detect_links', methods=['POST'])
+def detect_links():
     """
-    Endpoint to extract and analyze QR code (payment or URL)
-    Expected input: multipart/form-data with 'image' file
+    Endpoint to detect malicious links in bulk
+    Expected input: { "urls": ["https://example.com", ...] }
     """
     try:
-        # Check if image is in request
-        if 'image' not in request.files:
-            return jsonify({"error": "No image file provided"}), 400
+        data = request.get_json()
         
-        file = request.files['image']
+        if not data or 'urls' not in data:
+            return jsonify({"error": "URLs are required"}), 400
         
-        if file.filename == '':
-            return jsonify({"error": "No file selected"}), 400
+        urls = data['urls']
         
-        if not allowed_file(file.filename):
-            return jsonify({"error": "Invalid file type. Allowed: png, jpg, jpeg, gif"}), 400
+        if not isinstance(urls, list) or not urls:
+            return jsonify({"error": "URLs must be a non-empty list"}), 400
         
-        # Save the file temporarily
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        if len(urls) > MAX_URLS_PER_REQUEST:
+            return jsonify({"error": f"At most {MAX_URLS_PER_REQUEST} URLs per request"}), 400
         
-        try:
-            # Extract and determine QR type
-            qr_data, qr_type, error = extract_and_analyze_qr(filepath)
-            
-            if error:
-                return jsonify({"error": error}), 400
-            
-            # Log for debugging
-            print(f"QR Detection - Data: {qr_data[:100]}, Type: {qr_type}")
-            
-            # Handle based on QR type
-            if qr_type == 'url':
-                # Use URL fraud detection model
-                result, status_code = predict_url(qr_data)
+        if not all(isinstance(url, str) and url for url in urls):
+            return jsonify({"error": "Each URL must be a non-empty string"}), 400
+        
+        # Predict all URLs in batched forward passes
+        predictions = predict_urls(urls)
+        results = [result for result, _ in predictions]
+        status_code = 200
+        if all('error' in result for result in results):
+            # e.g. 503 while the model is loading or the inference queue is full
+            status_code = max(status for _, status in predictions)
+        return jsonify({"results": results}), status_code
+        
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/detect_links/stream', methods=['POST'])
+def detect_links_stream():
+    """
+    Streaming bulk scan
+    Expected input: NDJSON ({"url": ..., "id": ...} per line) or one URL per line
+    Query params: offset (skip input lines before it, to resume), progress=1 (interleave progress records)
+    Output: NDJSON, one verdict per input line with its "offset", then a final {"summary": ...} record
+    """
+    unavailable = model_unavailable()
+    if unavailable:
+        return jsonify(unavailable[0]), unavailable[1]
+    
+    try:
+        start_offset = int(request.args.get('offset', 0))
+        batch_size = min(int(request.args.get('batch_size', BULK_BATCH_SIZE)), MAX_URLS_PER_REQUEST)
+    except ValueError:
+        return jsonify({"error": "offset and batch_size must be integers"}), 400
+    
+    with_progress = request.args.get('progress') == '1'
+    # Bulk rescans bypass the verdict cache so they don't evict live traffic
+    scanner = BulkScanner(screen_url, classify_urls, build_url_result, batch_size)
+    # request.stream would apply the 16MB MAX_CONTENT_LENGTH meant for uploads
+    stream = get_input_stream(request.environ, max_content_length=BULK_MAX_BYTES or None)
+    
+    def generate():
+        for record in scanner.scan(stream, start_offset):
+            yield json.dumps(record) + '\n'
+            if with_progress and scanner.processed % BULK_PROGRESS_EVERY == 0:
+                yield json.dumps({"progress": scanner.progress()}) + '\n'
+        yield json.dumps({"summary": scanner.progress()}) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def upload_error(files):
+    """
+    Validate the multipart files of a QR upload
+    Returns: error message, or None if files['image'] is usable
+    """
+    if 'image' not in files:
+        return "No image file provided"
+    
+    file = files['image']
+    
+    if file.filename == '':
+        return "No file selected"
+    
+    if not allowed_file(file.filename):
+        return "Invalid file type. Allowed: png, jpg, jpeg, gif"
+    
+    return None
+
+def qr_response(symbols, decode_info, analyze_all=False, explain=False, predict_many=None):
+    """
+    Build the /api/detect_qr response from decoded symbols
+    analyze_all: classify every code in the image instead of only the first (mode=all)
+    explain: audit mode for the first code (ignored with analyze_all)
+    predict_many: classifies URL payloads instead of predict_url/predict_urls, e.g. through
+    the ASGI server's bounded queue; list of URLs -> list of (result, status_code)
+    Returns: (response_dict, status_code)
+    """
+    if analyze_all:
+        return multi_qr_response(symbols, decode_info, predict_many)
+    
+    def predict(qr_data):
+        if predict_many is None:
+            return predict_url(qr_data, explain)
+        return predict_many([qr_data])[0]
+    
+    # Extract and determine QR type
+    qr_data, qr_type, error = first_qr_payload(symbols)
+    
+    if error:
+        return {"error": error, "qr_decode": decode_info}, 400
+    
+    # Log for debugging
+    print(f"QR Detection - Data: {qr_data[:100]}, Type: {qr_type}")
+    
+    # Handle based on QR type
+    if qr_type == 'url':
+        # Use URL fraud detection model
+        result, status_code = predict(qr_data)
+        result['extracted_from_qr'] = True
+        result['qr_type'] = 'url'
+        result['qr_decode'] = decode_info
+        return result, status_code
+        
+    elif qr_type == 'payment':
+        # Use payment QR heuristics
+        result = build_payment_result(qr_data, explain)
+        result['qr_decode'] = decode_info
+        return result, 200
+        
+    else:
+        # Unknown QR type - try to analyze as URL anyway if it looks like it could be a link
+        # This is a fallback for edge cases
+        if len(qr_data) > 0 and not is_payment_qr(qr_data):
+            # Try treating it as a potential URL
+            try:
+                result, status_code = predict(qr_data)
                 result['extracted_from_qr'] = True
                 result['qr_type'] = 'url'
-                return jsonify(result), status_code
-                
-            elif qr_type == 'payment':
-                # Use payment QR heuristics
-                is_fraudulent, risk_score, reasons, payment_info = check_payment_qr_heuristics(qr_data)
-                
-                result = {
-                    "qr_data": qr_data,
-                    "qr_type": "payment",
-                    "prediction": "malicious" if is_fraudulent else "safe",
-                    "is_fraudulent": is_fraudulent,
-                    "confidence": risk_score / 100,
-                    "risk_score": risk_score,
-                    "threat_type": "Fraudulent Payment" if is_fraudulent else "Legitimate Payment",
-                    "warning_flags": reasons,
-                    "payment_info": payment_info,
-                    "extracted_from_qr": True
-                }
-                
-                return jsonify(result), 200
-                
-            else:
-                # Unknown QR type - try to analyze as URL anyway if it looks like it could be a link
-                # This is a fallback for edge cases
-                if len(qr_data) > 0 and not is_payment_qr(qr_data):
-                    # Try treating it as a potential URL
-                    try:
-                        result, status_code = predict_url(qr_data)
-                        result['extracted_from_qr'] = True
-                        result['qr_type'] = 'url'
-                        result['note'] = 'Analyzed as potential URL (format not standard)'
-                        return jsonify(result), status_code
-                    except:
-                        pass
-                
-                # Truly unknown data
-                return jsonify({
-                    "qr_data": qr_data,
-                    "qr_type": "other",
-                    "prediction": "unknown",
-                    "is_fraudulent": False,
-                    "confidence": 0,
-                    "message": "QR code contains non-URL and non-payment data. Data: " + qr_data[:100],
-                    "extracted_from_qr": True
-                }), 200
-            
-        finally:
-            # Clean up the temporary file
-            if os.path.exists(filepath):
-                os.remove(filepath)
+                result['note'] = 'Analyzed as potential URL (format not standard)'
+                result['qr_decode'] = decode_info
+                return result, status_code
+            except:
+                pass
         
+        # Truly unknown data
+        result = build_other_result(qr_data)
+        result['qr_decode'] = decode_info
+        return result, 200
+
+def multi_qr_response(symbols, decode_info, predict_many=None):
+    """
+    Analyze every QR code in the image (mode=all on /api/detect_qr)
+    Returns one verdict per symbol plus the worst-case verdict as the top-level result
+    """
+    if not symbols:
+        return {"error": "No QR code found in image", "qr_decode": decode_info}, 400
+    
+    results, worst_index = analyze_qr_symbols(symbols, predict_many)
+    worst = results[worst_index]
+    print(f"QR Detection - {len(results)} codes, worst: {worst['prediction']}")
+    
+    return {
+        "qr_type": "multi",
+        "prediction": worst['prediction'],
+        "is_fraudulent": any(result['is_fraudulent'] for result in results),
+        "confidence": worst.get('confidence', 0),
+        "threat_type": worst.get('threat_type', 'Unknown'),
+        "risk_score": max(result.get('risk_score', 0) for result in results),
+        "worst_index": worst_index,
+        "symbol_count": len(results),
+        "symbols": results,
+        "extracted_from_qr": True,
+        "qr_decode": decode_info
+    }, 200
+
+def scan_upload(data, analyze_all=False, explain=False):
+    """
+    Decode upload bytes and analyze their QR codes
+    Returns: (response_dict, status_code)
+    Raises: ExecutorBusy, JobTimeout (pool mode only)
+    """
+    symbols, decode_info, error = decode_upload_symbols(data)
+    if error:
+        return {"error": error}, 400
+    return qr_response(symbols, decode_info, analyze_all, explain)
+
+def scan_upload_cached(key, data, analyze_all=False):
+    """
+    scan_upload() behind the QR result cache
+    key: (upload_digest(data), analyze_all)
+    Returns: (response_dict, status_code), shared with other requests for the same key
+    """
+    cached = qr_result_cache.get(key)
+    if cached is not None:
+        return cached
+    result = scan_upload(data, analyze_all)
+    if cacheable_scan(*result):
+        qr_result_cache.set(key, result)
+    return result
+
+@app.route('/api/detect_qr', methods=['POST'])
+def detect_qr():
+    """
+    Endpoint to extract and analyze QR code (payment or URL)
+    Expected input: multipart/form-data with 'image' file, optional 'mode=all' for every code in the image
+    Query params: explain=1 (audit mode: per-rule hits, weights and model logits for the first code)
+    """
+    try:
+        error = upload_error(request.files)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        # Decode straight from the upload bytes; nothing touches the filesystem
+        with timed('upload_read'):
+            data = request.files['image'].read()
+        analyze_all = request.values.get('mode') == 'all'
+        explain = request.args.get('explain') == '1'
+        
+        if explain:
+            result, status_code = scan_upload(data, analyze_all, explain)
+        elif REQUEST_COALESCING:
+            # The same image uploaded by many clients at once is decoded and analyzed once
+            key = (upload_digest(data), analyze_all)
+            result, status_code = qr_flight.do(key, scan_upload_cached, key, data, analyze_all)
+        elif qr_result_cache.enabled:
+            result, status_code = scan_upload_cached((upload_digest(data), analyze_all), data, analyze_all)
+        else:
+            result, status_code = scan_upload(data, analyze_all)
+        return jsonify(result), status_code
+
+    except ExecutorBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except JobTimeout as e:
+        return jsonify({"error": str(e)}), 504
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
@@ -542,7 +1376,10 @@ def test():
         "endpoints": {
             "/api/health": "GET - Health check",
             "/api/detect_link": "POST - Detect malicious link",
-            "/api/detect_qr": "POST - Extract and detect QR code"
+            "/api/detect_links": "POST - Detect malicious links in bulk",
+            "/api/detect_links/stream": "POST - Stream NDJSON URLs in, NDJSON verdicts out",
+            "/api/detect_qr": "POST - Extract and detect QR code",
+            "/api/metrics": "GET - Prometheus metrics"
         }
     }), 200
 
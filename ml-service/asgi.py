@@ -0,0 +1,343 @@
+"""
+ASGI entry point: uvicorn asgi:application --host 0.0.0.0 --port 5001
+
+/api/detect_link and /api/detect_qr are served natively with asyncio, so a
+request waiting on the model is a suspended coroutine instead of a blocked
+thread. URLs go through an AsyncMicroBatcher whose batches run on the
+inference executor, and QR uploads are decoded in the QR process pool. Both
+are bounded and answer 503 when full, the same as EXECUTION_MODE=pool.
+Every other route (/api/health, /api/detect_links, /api/metrics, ...) and
+audit requests (?explain=1) run the Flask app in a worker thread, so the
+contracts are identical.
+"""
+import asyncio
+import contextvars
+import io
+import json
+import os
+import time
+from urllib.parse import parse_qs
+
+from werkzeug.formparser import parse_form_data
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+import app as service
+import metrics
+from batching import AsyncMicroBatcher
+from executors import ExecutorBusy, JobTimeout
+from qr_decode import decode_upload
+from singleflight import AsyncSingleFlight
+from verdict_cache import canonicalize_url
+
+# URLs allowed to wait for a model batch before /api/detect_link answers 503
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 4096))
+MAX_BODY = service.app.config['MAX_CONTENT_LENGTH']
+# Routes that read their body as a stream under their own limit (BULK_MAX_BYTES), instead of MAX_BODY
+STREAMING_ROUTES = {('POST', '/api/detect_links/stream')}
+
+
+async def run_model_batch(urls):
+    return await service.inference_executor.run_async(service.run_model, urls)
+
+
+url_batcher = AsyncMicroBatcher(
+    run_model_batch,
+    max_batch_size=service.BATCH_MAX_SIZE if service.MICRO_BATCHING else 1,
+    max_wait_ms=service.BATCH_MAX_WAIT_MS,
+    max_pending=ASGI_MAX_PENDING,
+    full_error=ExecutorBusy
+)
+
+
+# Coalescing for the native routes; the flights run on the event loop, so they are separate
+# from the Flask routes' thread-based ones and reported next to them
+url_flight = AsyncSingleFlight()
+qr_flight = AsyncSingleFlight()
+service.request_flights.update(detect_link_asgi=url_flight, detect_qr_asgi=qr_flight)
+
+# The verdict store and the shared verdict cache tier are SQLite files: a read or write transaction
+# can wait up to the busy timeout on another process's lock, which must not stall the event loop
+STORE_ON_DISK = service.verdict_store is not None or service.verdict_cache.backing is not None
+
+
+async def off_loop(func, *args):
+    """
+    Run a verdict cache/store call in a worker thread when it may touch SQLite, else inline
+    """
+    if STORE_ON_DISK:
+        return await asyncio.to_thread(func, *args)
+    return func(*args)
+
+
+async def model_unavailable():
+    if service.model_state["status"] == "not_started" and service.MODEL_LOAD_MODE == 'lazy':
+        # Loading takes seconds; keep it off the event loop
+        await asyncio.to_thread(service.load_model)
+    return service.model_unavailable()
+
+
+async def predict_url(url):
+    """
+    Async predict_url: same cache, tiers and result shape as app.predict_url
+    """
+    unavailable = await model_unavailable()
+    if unavailable:
+        return unavailable
+    if not service.REQUEST_COALESCING:
+        return await compute_url_verdict(url)
+
+    result, status = await url_flight.do(canonicalize_url(url), compute_url_verdict, url)
+    return service.shared_url_result(result, url), status
+
+
+async def compute_url_verdict(url):
+    known, reputation = await off_loop(service.lookup_verdict, url)
+    if known is not None:
+        return known, 200
+
+    try:
+        result, heuristics = service.screen_url(url, reputation)
+        if result is None:
+            prediction, ml_confidence = await url_batcher.submit(url)
+            result = service.build_url_result(url, heuristics, prediction, ml_confidence)
+        await off_loop(service.remember_verdicts, [(url, result)])
+        return result, 200
+    except ExecutorBusy as e:
+        return {"error": str(e)}, 503
+    except JobTimeout as e:
+        return {"error": str(e)}, 504
+    except Exception as e:
+        return {"error": f"Prediction failed: {str(e)}"}, 500
+
+
+async def detect_link(scope, body):
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or 'url' not in data:
+        return {"error": "URL is required"}, 400
+    url = data['url']
+    if not url:
+        return {"error": "URL cannot be empty"}, 400
+    return await predict_url(url)
+
+
+def parse_upload(scope, body):
+    environ = EnvironBuilder(method='POST', headers=request_headers(scope), data=body).get_environ()
+    _, form, files = parse_form_data(environ)
+    return form, files
+
+
+async def predict_urls(urls):
+    """
+    Async predict_urls: every URL takes the predict_url path, so QR payloads share the batcher's
+    ASGI_MAX_PENDING bound and the inference executor with /api/detect_link
+    """
+    return await asyncio.gather(*(predict_url(url) for url in urls))
+
+
+async def scan_upload(data, analyze_all):
+    symbols, decode_info, error = await service.qr_executor.run_async(decode_upload, data)
+    if error:
+        return {"error": error}, 400
+    loop = asyncio.get_running_loop()
+
+    def predict_many(urls):
+        # Called from the worker thread building the response
+        return asyncio.run_coroutine_threadsafe(predict_urls(urls), loop).result()
+
+    # Payment heuristics and response building run in a worker thread; URLs come back to the loop
+    return await asyncio.to_thread(service.qr_response, symbols, decode_info, analyze_all, False, predict_many)
+
+
+async def scan_upload_cached(key, data, analyze_all):
+    # Same QR result cache as the Flask route (see service.scan_upload_cached)
+    cached = service.qr_result_cache.get(key)
+    if cached is not None:
+        return cached
+    result = await scan_upload(data, analyze_all)
+    if service.cacheable_scan(*result):
+        service.qr_result_cache.set(key, result)
+    return result
+
+
+async def detect_qr(scope, body):
+    try:
+        # Multipart parsing of a multi-megabyte upload is CPU work too
+        form, files = await asyncio.to_thread(parse_upload, scope, body)
+        error = service.upload_error(files)
+        if error:
+            return {"error": error}, 400
+
+        data = files['image'].read()
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        analyze_all = query.get('mode', [form.get('mode')])[0] == 'all'
+        if not (service.REQUEST_COALESCING or service.qr_result_cache.enabled):
+            return await scan_upload(data, analyze_all)
+        key = (await asyncio.to_thread(service.upload_digest, data), analyze_all)
+        if not service.REQUEST_COALESCING:
+            return await scan_upload_cached(key, data, analyze_all)
+        return await qr_flight.do(key, scan_upload_cached, key, data, analyze_all)
+    except ExecutorBusy as e:
+        return {"error": str(e)}, 503
+    except JobTimeout as e:
+        return {"error": str(e)}, 504
+    except Exception as e:
+        return {"error": f"Server error: {str(e)}"}, 500
+
+
+ROUTES = {
+    ('POST', '/api/detect_link'): detect_link,
+    ('POST', '/api/detect_qr'): detect_qr,
+}
+
+
+def request_headers(scope):
+    return [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+
+
+# read_body's result when the client went away before sending the whole body
+DISCONNECTED = object()
+
+
+async def read_body(receive):
+    """
+    Returns: request body, None if it exceeds MAX_BODY, or DISCONNECTED
+    """
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return DISCONNECTED
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+class ReceiveStream(io.RawIOBase):
+    """
+    Blocking file-like view of an ASGI request body, read from a worker thread
+    Each read waits for the next body message on the event loop; a disconnect ends the stream.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._pending = b''
+        self._done = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending and not self._done:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                self._done = True
+                break
+            self._pending = message.get('body', b'')
+            self._done = not message.get('more_body')
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+async def send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode()),
+               (b'access-control-allow-origin', b'*')]
+    if status == 503:
+        headers.append((b'retry-after', b'1'))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def call_flask(scope, body, send, receive=None):
+    """
+    Serve a request with the Flask app in a worker thread, streaming its response
+    receive: stream the request body from the client instead of passing a buffered body
+    """
+    builder = EnvironBuilder(
+        path=scope['path'], method=scope['method'], headers=request_headers(scope),
+        query_string=scope.get('query_string', b'').decode('latin-1'), data=body
+    )
+    environ = builder.get_environ()
+    if receive is not None:
+        environ['wsgi.input'] = io.BufferedReader(ReceiveStream(receive, asyncio.get_running_loop()))
+        # The stream ends with the body, so Werkzeug reads it whether or not Content-Length is set
+        environ['wsgi.input_terminated'] = True
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    # One context for every call: stream_with_context pushes Flask's request context on the first
+    # chunk and pops it after the last, and each to_thread call would otherwise get a fresh copy
+    context = contextvars.copy_context()
+    app_iter, status, headers = await asyncio.to_thread(context.run, run_wsgi_app, service.app.wsgi_app, environ)
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers.items()]
+    })
+    iterator = iter(app_iter)
+    try:
+        while True:
+            # NDJSON streams produce chunks as they are computed; pull each one off the loop
+            chunk = await asyncio.to_thread(context.run, next, iterator, None)
+            if chunk is None:
+                break
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(app_iter, 'close'):
+            await asyncio.to_thread(context.run, app_iter.close)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+def explain_requested(scope):
+    query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+    return query.get('explain', [None])[0] == '1'
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    if (scope['method'], scope['path']) in STREAMING_ROUTES:
+        return await call_flask(scope, None, send, receive)
+
+    start = time.perf_counter()
+    body = await read_body(receive)
+    if body is DISCONNECTED:
+        # Nobody is left to answer
+        return
+    if body is None:
+        return await send_json(send, 413, {"error": "Request body too large"})
+
+    handler = ROUTES.get((scope['method'], scope['path']))
+    # Audit requests (?explain=1) are rare; the Flask route already implements them
+    if handler is None or explain_requested(scope):
+        return await call_flask(scope, body, send)
+
+    payload, status = await handler(scope, body)
+    await send_json(send, status, payload)
+    if metrics.METRICS_ENABLED:
+        # Flask's after_request hooks only see delegated routes
+        metrics.registry.observe('request_seconds', time.perf_counter() - start, endpoint=scope['path'])
+        metrics.registry.inc('requests_total', endpoint=scope['path'], status=str(status))
@@ -0,0 +1,147 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-item requests into batches for one model call.
+
+    Callers submit one item at a time and get back a Future. A background
+    worker collects up to `max_batch_size` items, waiting at most
+    `max_wait_ms` after the first one arrives, and hands them to
+    `process_batch` in a single call. `process_batch` must return one
+    result per input item, in the same order.
+    """
+
+    def __init__(self, process_batch, max_batch_size=32, max_wait_ms=5):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, item):
+        """
+        Queue a single item for batched processing
+        Returns: concurrent.futures.Future resolving to the item's result
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        # Start lazily so forked server workers each get their own thread
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker.start()
+
+    def _collect(self):
+        # Block for the first item, then fill the batch until full or the wait expires
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.process_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class AsyncMicroBatcher:
+    """
+    asyncio counterpart of MicroBatcher for the ASGI server.
+
+    Waiting callers are coroutines rather than threads, so thousands of
+    in-flight requests cost little. The collector task runs each batch with
+    `run_batch(items)`, a coroutine function that should offload the model
+    call (e.g. to an executor); while a batch runs, new items queue up and
+    form the next batch. At most `max_pending` items may wait; beyond that
+    submit() raises `full_error()`.
+    """
+
+    def __init__(self, run_batch, max_batch_size=32, max_wait_ms=5, max_pending=1024, full_error=RuntimeError):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, float(max_wait_ms)) / 1000.0
+        self.max_pending = max(1, int(max_pending))
+        self.full_error = full_error
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, item):
+        """
+        Returns: the item's result once its batch has run
+        """
+        if self._worker is None or self._worker.done():
+            # Bound to the running event loop on first use
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        if self._queue.qsize() >= self.max_pending:
+            raise self.full_error("Server busy (inference queue full), retry shortly")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            # Callers that gave up (timeout, disconnect) don't need a model slot
+            batch = [(item, future) for item, future in await self._collect() if not future.done()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = await self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
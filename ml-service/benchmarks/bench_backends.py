@@ -0,0 +1,139 @@
+"""
+Compare inference backends against the fp32 torch model.
+
+Each backend runs in its own subprocess so peak RSS is measured in isolation.
+Reports agreement with fp32 predictions, accuracy on the labeled set,
+per-URL p50/p99 latency at batch size 1, batched throughput and peak RSS.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_backends
+    python -m benchmarks.bench_backends --labels labeled_urls.csv --backends torch torch-int8 onnx
+
+The labels file is a CSV with `url,label` columns; label is one of
+Benign/Defacement/Phishing/Malware or 0-3.
+"""
+import argparse
+import csv
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+LABELS = {"benign": 0, "defacement": 1, "phishing": 2, "malware": 3}
+
+# Small built-in labeled sample, used when --labels is not given
+SAMPLE_LABELED_URLS = [
+    ("https://www.google.com", 0),
+    ("https://github.com/pallets/flask", 0),
+    ("https://en.wikipedia.org/wiki/Phishing", 0),
+    ("https://docs.python.org/3/library/urllib.parse.html", 0),
+    ("https://stackoverflow.com/questions/tagged/python", 0),
+    ("https://www.amazon.in/dp/B08N5WRWNW", 0),
+    ("http://paypal-secure-login.verify-account.tk/signin", 2),
+    ("http://apple.id-confirm.xyz/account/verify", 2),
+    ("http://192.168.4.20/banking/update.php", 2),
+    ("http://free-gift-winner-claim-now.online/claim", 2),
+    ("http://atualizacao-dados-conta.site/senha", 2),
+    ("http://secure.update.banking.account.info/login", 2),
+    ("http://www.example-school.edu/index.php?option=com_content&view=article&id=70", 1),
+    ("http://mitsui-jyuku.mixh.jp/uploads/bin.exe", 3),
+    ("http://download.cracked-software.top/setup.exe", 3),
+    ("http://update-flashplayer.club/flash_update.apk", 3),
+]
+
+
+def load_labeled_urls(path):
+    if not path:
+        return SAMPLE_LABELED_URLS
+    rows = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            label = row['label'].strip().lower()
+            rows.append((row['url'], int(label) if label.isdigit() else LABELS[label]))
+    return rows
+
+
+def run_worker(backend_name, urls, batch_size, latency_samples):
+    # Imported here so the parent process never loads a model
+    from inference import MODEL_NAME, load_backend
+
+    start = time.perf_counter()
+    backend = load_backend(backend_name, MODEL_NAME)
+    load_seconds = time.perf_counter() - start
+
+    backend.predict(urls[:batch_size])  # warmup
+
+    latencies = []
+    for url in urls[:latency_samples]:
+        start = time.perf_counter()
+        backend.predict([url])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    predictions = []
+    start = time.perf_counter()
+    for i in range(0, len(urls), batch_size):
+        predictions.extend(prediction for prediction, _ in backend.predict(urls[i:i + batch_size]))
+    batched_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend_name,
+        "load_seconds": round(load_seconds, 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "throughput_urls_per_s": round(len(urls) / batched_seconds, 1),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "predictions": predictions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", help="CSV file with url,label columns")
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-samples", type=int, default=200)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    labeled = load_labeled_urls(args.labels)
+    urls = [url for url, _ in labeled]
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, urls, args.batch_size, args.latency_samples)))
+        return
+
+    # fp32 torch is the reference for agreement, so always run it first
+    backends = ["torch"] + [name for name in args.backends if name != "torch"]
+    results = {}
+    for name in backends:
+        command = [sys.executable, "-m", "benchmarks.bench_backends", "--worker", name,
+                   "--batch-size", str(args.batch_size), "--latency-samples", str(args.latency_samples)]
+        if args.labels:
+            command += ["--labels", args.labels]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{name}: failed\n{completed.stderr.strip().splitlines()[-1] if completed.stderr else ''}")
+            continue
+        results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    if "torch" not in results:
+        raise SystemExit("fp32 torch backend failed; nothing to compare against")
+
+    reference = results["torch"]["predictions"]
+    labels = [label for _, label in labeled]
+    print(f"{len(urls)} labeled URLs, batch size {args.batch_size}\n")
+    print(f"{'backend':<12}{'agree':>8}{'accuracy':>10}{'p50 ms':>9}{'p99 ms':>9}{'urls/s':>10}{'RSS MB':>9}")
+    for name, result in results.items():
+        predictions = result["predictions"]
+        agreement = sum(a == b for a, b in zip(predictions, reference)) / len(reference)
+        accuracy = sum(a == b for a, b in zip(predictions, labels)) / len(labels)
+        print(f"{name:<12}{agreement:>8.2%}{accuracy:>10.2%}{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{result['throughput_urls_per_s']:>10.1f}{result['peak_rss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Throughput of batched URL classification at several batch sizes.
+
+Checks that batched verdicts match per-URL predict_url output, then reports
+URLs/second for each batch size.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_batching --count 1024 --batch-sizes 1 8 32 128
+"""
+import argparse
+import math
+import time
+
+import app
+
+SAMPLE_URLS = [
+    "https://www.google.com",
+    "https://github.com/login",
+    "http://paypal-secure-login.verify-account.tk/signin",
+    "http://192.168.0.10/banking/update.php",
+    "https://bit.ly/3xYzAbC",
+    "https://en.wikipedia.org/wiki/Phishing",
+    "http://free-gift-winner.xyz/claim?id=42",
+    "https://accounts.microsoft.com@evil.example.com/",
+    "http://atualizacao-dados-conta.online/senha",
+    "https://docs.python.org/3/library/urllib.parse.html",
+]
+
+
+def make_corpus(count):
+    # Vary the path so every URL is distinct but lengths stay realistic
+    return [f"{SAMPLE_URLS[i % len(SAMPLE_URLS)]}?ref={i}" for i in range(count)]
+
+
+def same_verdict(a, b, tolerance=1e-5):
+    if set(a) != set(b):
+        return False
+    for key in a:
+        if isinstance(a[key], float):
+            if not math.isclose(a[key], b[key], abs_tol=tolerance):
+                return False
+        elif a[key] != b[key]:
+            return False
+    return True
+
+
+def check_agreement(urls, batch_size):
+    # Bypass the micro-batcher so the reference is a true batch-size-1 forward pass
+    reference = [app.build_url_result(url, app.check_url_heuristics(url), *app.run_model([url])[0]) for url in urls]
+    batched = [result for result, _ in app.predict_urls(urls, batch_size=batch_size)]
+    mismatches = sum(1 for a, b in zip(reference, batched) if not same_verdict(a, b))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1024, help="URLs per measurement")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--check", type=int, default=64, help="URLs to compare against per-URL output")
+    args = parser.parse_args()
+
+    if app.model_unavailable():
+        raise SystemExit("Model not loaded")
+
+    # Measure the model, not the verdict cache
+    app.verdict_cache.max_size = 0
+    urls = make_corpus(args.count)
+
+    for batch_size in args.batch_sizes:
+        mismatches = check_agreement(urls[:args.check], batch_size)
+        app.predict_urls(urls[:batch_size], batch_size=batch_size)  # warmup
+        start = time.perf_counter()
+        app.predict_urls(urls, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"batch_size={batch_size:4d}  {args.count / elapsed:8.1f} urls/s  "
+              f"{elapsed * 1000 / args.count:6.2f} ms/url  mismatches={mismatches}/{args.check}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Load test: bursts of identical requests, with and without request coalescing.
+
+Reproduces a scam link going viral: for each burst, --clients threads wait on
+a barrier and then POST the same, never-seen URL to /api/detect_link at once
+(so the verdict cache cannot help), then the same for a QR image on
+/api/detect_qr. The service runs as `python app.py` with REQUEST_COALESCING
+on and off. For each setting it reports request latency, how often the
+heuristics, the model and the QR decoder actually ran (stage counts from
+/api/metrics; QR codes holding URLs run the heuristics and the model too),
+and the coalescing counters from /api/health.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_coalescing --clients 100 --bursts 10 --qr-bursts 5
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from benchmarks.bench_isolation import make_upload, multipart, percentiles, post
+from benchmarks.bench_startup import free_port, wait_for
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ('url_heuristics', 'model_forward', 'image_decode')
+
+
+def stage_counts(base):
+    with urllib.request.urlopen(f'{base}/api/metrics', timeout=30) as response:
+        text = response.read().decode()
+    counts = dict.fromkeys(STAGES, 0)
+    for stage, count in re.findall(r'stage_seconds_count\{stage="(\w+)"\} (\d+)', text):
+        if stage in counts:
+            counts[stage] = int(count)
+    return counts
+
+
+def burst(clients, send):
+    """
+    Returns: per-request latencies (ms) and status codes of one burst of identical requests
+    """
+    barrier = threading.Barrier(clients)
+    latencies = []
+    statuses = []
+
+    def client():
+        barrier.wait()
+        start = time.perf_counter()
+        statuses.append(send())
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses
+
+
+def run_setting(coalescing, args, uploads):
+    port = free_port()
+    # No QR result cache: an upload that arrives after its burst's decode finished would hit it
+    env = dict(os.environ, PORT=str(port), DEBUG='False', REQUEST_COALESCING=str(coalescing), QR_CACHE_SIZE='0')
+    base = f'http://127.0.0.1:{port}'
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f'{base}/api/health?ready=1')
+        results = {}
+        run_id = time.time_ns()
+        for kind, bursts in (('link', args.bursts), ('qr', len(uploads))):
+            before = stage_counts(base)
+            latencies = []
+            statuses = {}
+            for i in range(bursts):
+                if kind == 'link':
+                    body = json.dumps({"url": f"http://viral-offer-{run_id}-{i}.example-claim.tk/login"}).encode()
+                    send = lambda: post(f'{base}/api/detect_link', body, 'application/json')
+                else:
+                    body, content_type = multipart('poster.png', uploads[i])
+                    send = lambda: post(f'{base}/api/detect_qr', body, content_type)
+                burst_latencies, burst_statuses = burst(args.clients, send)
+                latencies += burst_latencies
+                for status in burst_statuses:
+                    statuses[status] = statuses.get(status, 0) + 1
+            after = stage_counts(base)
+            results[kind] = (latencies, statuses, {stage: after[stage] - before[stage] for stage in STAGES})
+        with urllib.request.urlopen(f'{base}/api/health', timeout=30) as response:
+            flights = json.loads(response.read()).get('request_coalescing') or {}
+        return results, flights
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100, help="identical requests per burst")
+    parser.add_argument("--bursts", type=int, default=10, help="/api/detect_link bursts (one new URL each)")
+    parser.add_argument("--qr-bursts", type=int, default=5, help="/api/detect_qr bursts (one new image each)")
+    parser.add_argument("--image-size", type=int, default=1500, help="side of the uploaded QR photo in pixels")
+    args = parser.parse_args()
+
+    # A different image per burst, so no burst is served from a cache warmed by the previous one
+    uploads = [make_upload(args.image_size, seed=seed) for seed in range(args.qr_bursts)]
+    print(f"{args.clients} clients per burst; {args.bursts} link bursts, {args.qr_bursts} QR bursts\n")
+    print(f"{'coalescing':<12}{'endpoint':<13}{'requests':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+          f"{'heuristics':>12}{'forwards':>10}{'decodes':>9}{'coalesced':>11}")
+    for coalescing in (False, True):
+        results, flights = run_setting(coalescing, args, uploads)
+        for kind, endpoint in (('link', 'detect_link'), ('qr', 'detect_qr')):
+            latencies, statuses, runs = results[kind]
+            p50, _, p99 = percentiles(latencies)
+            errors = sum(count for status, count in statuses.items() if status != 200)
+            coalesced = flights.get(endpoint, {}).get('coalesced', 0)
+            print(f"{'on' if coalescing else 'off':<12}{endpoint:<13}{len(latencies):>9}{p50:>9.1f}{p99:>9.1f}"
+                  f"{errors:>8}{runs['url_heuristics']:>12}{runs['model_forward']:>10}{runs['image_decode']:>9}"
+                  f"{coalesced:>11}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
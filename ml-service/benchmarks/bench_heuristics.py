@@ -0,0 +1,178 @@
+"""
+Microbenchmark for check_url_heuristics against the original per-call implementation.
+
+Verifies that score, reasons and reason order are identical on every URL of a
+synthetic corpus, then reports the speedup.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_heuristics --count 100000
+"""
+import argparse
+import random
+import re
+import time
+from urllib.parse import urlparse
+
+import app
+
+
+def legacy_check_url_heuristics(url):
+    """
+    check_url_heuristics as it was before the precompiled matchers (reference only)
+    Returns: (is_suspicious, risk_score, reasons)
+    """
+    risk_score = 0
+    reasons = []
+
+    try:
+        parsed = urlparse(url.lower())
+        domain = parsed.netloc
+        path = parsed.path
+
+        # Suspicious keywords in domain or path (English and common international variants)
+        suspicious_keywords = [
+            'login', 'signin', 'account', 'verify', 'secure', 'update', 'confirm',
+            'banking', 'paypal', 'amazon', 'apple', 'microsoft', 'google',
+            'password', 'suspended', 'locked', 'unusual', 'activity',
+            'click', 'urgent', 'action', 'required', 'wallet', 'crypto',
+            'prize', 'winner', 'claim', 'free', 'gift', 'congratulations',
+            # Portuguese/Spanish variants common in phishing
+            'atualizacao', 'atualizar', 'dados', 'conta', 'verificar', 'seguro',
+            'urgente', 'bloqueado', 'suspenso', 'confirmar', 'senha',
+            # Other international variants
+            'validar', 'restablecer', 'recuperar', 'notification'
+        ]
+
+        url_lower = url.lower()
+        for keyword in suspicious_keywords:
+            if keyword in url_lower:
+                risk_score += 15
+                reasons.append(f"Contains suspicious keyword: '{keyword}'")
+
+        # IP address instead of domain name
+        ip_pattern = r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}'
+        if re.search(ip_pattern, domain):
+            risk_score += 30
+            reasons.append("Uses IP address instead of domain name")
+
+        # Excessive subdomains (e.g., paypal.secure.login.verify.com)
+        subdomain_count = domain.count('.')
+        if subdomain_count > 3:
+            risk_score += 25
+            reasons.append(f"Excessive subdomains ({subdomain_count})")
+
+        # Very long domain names (often used in phishing)
+        if len(domain) > 40:
+            risk_score += 20
+            reasons.append(f"Unusually long domain ({len(domain)} characters)")
+
+        # Suspicious TLDs (free/cheap domains commonly used in phishing)
+        suspicious_tlds = [
+            '.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.club',
+            '.work', '.bid', '.online', '.site', '.website', '.space',
+            '.info', '.pw', '.cc'
+        ]
+        for tld in suspicious_tlds:
+            if domain.endswith(tld):
+                risk_score += 25
+                reasons.append(f"Suspicious TLD: {tld}")
+
+        # URL shorteners (can hide malicious links)
+        url_shorteners = ['bit.ly', 'tinyurl.com', 't.co', 'goo.gl', 'ow.ly', 'is.gd', 'buff.ly']
+        if any(shortener in domain for shortener in url_shorteners):
+            risk_score += 20
+            reasons.append("URL shortener detected")
+
+        # Excessive hyphens in domain
+        if domain.count('-') > 3:
+            risk_score += 15
+            reasons.append(f"Excessive hyphens in domain ({domain.count('-')})")
+
+        # Non-HTTPS (less secure)
+        if parsed.scheme != 'https':
+            risk_score += 10
+            reasons.append("Not using HTTPS")
+
+        # @ symbol in URL (can be used to trick users)
+        if '@' in url:
+            risk_score += 30
+            reasons.append("Contains @ symbol (potential redirect trick)")
+
+        # Homograph/lookalike characters
+        suspicious_chars = ['а', 'е', 'о', 'р', 'с', 'у', 'х']  # Cyrillic lookalikes
+        for char in suspicious_chars:
+            if char in domain:
+                risk_score += 35
+                reasons.append("Contains lookalike characters (possible homograph attack)")
+                break
+
+        # Port numbers (unusual for legitimate sites)
+        if ':' in domain and not domain.endswith(':443') and not domain.endswith(':80'):
+            risk_score += 20
+            reasons.append("Uses non-standard port")
+
+        # Determine if suspicious based on risk score
+        is_suspicious = risk_score >= 30
+
+        return is_suspicious, risk_score, reasons
+
+    except Exception as e:
+        return False, 0, [f"Error analyzing URL: {str(e)}"]
+
+
+BENIGN_HOSTS = ['www.google.com', 'github.com', 'en.wikipedia.org', 'news.ycombinator.com',
+                'docs.python.org', 'www.amazon.in', 'stackoverflow.com', 'mail.example.org']
+PHISHING_HOSTS = ['paypal-secure-login.verify-account.tk', 'apple.id-confirm.xyz', '192.168.4.20',
+                  'bit.ly', 'secure.update.banking.account.info', 'free-gift-winner-claim-now.online',
+                  'atualizacao-dados-conta.site', 'tinyurl.com', 'micr\u043esoft-login.com',
+                  'g\u043e\u043egle.com:8080', 'paypalogin.co', 'x.y.z.w.v.cc']
+BENIGN_PATHS = ['', '/', '/index.html', '/wiki/Phishing', '/search?q=python+docs', '/repos/issues/42',
+                '/3/library/re.html', '/dp/B08N5WRWNW', '/questions/tagged/flask']
+PHISHING_PATHS = ['/signin', '/account/verify', '/wallet/connect?next=/claim', '/user@host',
+                  '/senha/recuperar', '/notification/urgent-action-required', '/confirmar-urgente',
+                  '/Suspenso?ref=SignIn', '/']
+
+
+def make_corpus(count, seed=1234):
+    # Mostly benign traffic; a unique query keeps urlsplit's internal cache from flattering either side
+    rng = random.Random(seed)
+    urls = []
+    for i in range(count):
+        if rng.random() < 0.3:
+            host, path = rng.choice(PHISHING_HOSTS), rng.choice(PHISHING_PATHS)
+        else:
+            host, path = rng.choice(BENIGN_HOSTS), rng.choice(BENIGN_PATHS)
+        scheme = rng.choice(['https', 'https', 'http'])
+        separator = '&' if '?' in path else '?'
+        urls.append(f"{scheme}://{host}{path}{separator}r={i}")
+    return urls
+
+
+def timed(func, urls):
+    start = time.perf_counter()
+    results = [func(url) for url in urls]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="URLs in the corpus")
+    args = parser.parse_args()
+
+    urls = make_corpus(args.count)
+    expected, legacy_time = timed(legacy_check_url_heuristics, urls)
+    actual, current_time = timed(app.check_url_heuristics, urls)
+
+    mismatches = [url for url, a, b in zip(urls, expected, actual) if a != b]
+    print(f"legacy:   {legacy_time:.3f}s  ({args.count / legacy_time:,.0f} urls/s)")
+    print(f"current:  {current_time:.3f}s  ({args.count / current_time:,.0f} urls/s)")
+    print(f"speedup:  {legacy_time / current_time:.2f}x")
+    print(f"mismatches: {len(mismatches)}")
+    for url in mismatches[:10]:
+        print(f"  {url}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Load test: /api/detect_link latency while large QR uploads hammer the server.
+
+For each EXECUTION_MODE it starts `python app.py`, measures detect_link
+latency on an idle server, then again while --qr-clients threads upload large
+noisy QR photos in a loop. In inline mode the QR decoding shares the request
+process (and GIL) with link checks; in pool mode it runs in the QR process
+pool, so link latency should stay close to idle. Uploads rejected with 503
+(QR queue full) are counted separately.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_isolation --qr-clients 8 --link-requests 200
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_startup import free_port, wait_for
+from benchmarks.corpus import make_urls, render_qr
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_upload(size=3000, seed=5):
+    # A small code on a large noisy "photo": the downscaled stage misses, so every stage runs
+    rng = np.random.default_rng(seed)
+    canvas = rng.integers(80, 200, size=(size, size), dtype=np.uint8)
+    qr = render_qr("https://example.com/isolation", 120)
+    canvas[size // 2:size // 2 + qr.shape[0], size // 2:size // 2 + qr.shape[1]] = qr
+    ok, encoded = cv2.imencode('.png', canvas)
+    return encoded.tobytes()
+
+
+def post(url, body, content_type):
+    req = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def multipart(filename, data):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="image"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+
+def link_latencies(base, urls):
+    latencies = []
+    for url in urls:
+        start = time.perf_counter()
+        post(f'{base}/api/detect_link', json.dumps({"url": url}).encode(), 'application/json')
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def percentiles(latencies):
+    ordered = sorted(latencies)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return statistics.median(ordered), pick(0.95), pick(0.99)
+
+
+def qr_load(base, upload, stop, counts):
+    body, content_type = multipart('photo.png', upload)
+    while not stop.is_set():
+        status = post(f'{base}/api/detect_qr', body, content_type)
+        counts[status] = counts.get(status, 0) + 1
+
+
+def run_mode(mode, args, upload, urls):
+    port = free_port()
+    # Every upload is the same image: keep the caches and coalescing out of the way so each one is decoded
+    env = dict(os.environ, PORT=str(port), EXECUTION_MODE=mode, DEBUG='False', VERDICT_CACHE_SIZE='0',
+               QR_CACHE_SIZE='0', REQUEST_COALESCING='False')
+    base = f'http://127.0.0.1:{port}'
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f'{base}/api/health')
+        link_latencies(base, urls[:20])  # warmup
+        idle = percentiles(link_latencies(base, urls))
+
+        stop = threading.Event()
+        counts = {}
+        clients = [threading.Thread(target=qr_load, args=(base, upload, stop, counts), daemon=True)
+                   for _ in range(args.qr_clients)]
+        started = time.perf_counter()
+        for client in clients:
+            client.start()
+        time.sleep(1)  # let the uploads pile up
+        loaded = percentiles(link_latencies(base, urls))
+        stop.set()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - started
+        return idle, loaded, counts, elapsed
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qr-clients", type=int, default=8, help="concurrent QR upload loops")
+    parser.add_argument("--link-requests", type=int, default=200, help="detect_link requests per measurement")
+    parser.add_argument("--image-size", type=int, default=3000, help="side of the uploaded QR photo in pixels")
+    parser.add_argument("--modes", nargs="+", default=["inline", "pool"])
+    args = parser.parse_args()
+
+    upload = make_upload(args.image_size)
+    urls = [url for _, url in make_urls(args.link_requests)]
+
+    print(f"{args.qr_clients} QR clients uploading {args.image_size}x{args.image_size} photos "
+          f"({len(upload) / 1e6:.1f} MB)\n")
+    print(f"{'mode':<8}{'idle p50/p95/p99 ms':>24}{'loaded p50/p95/p99 ms':>26}{'QR ok/s':>9}{'QR 503':>8}")
+    for mode in args.modes:
+        idle, loaded, counts, elapsed = run_mode(mode, args, upload, urls)
+        ok = sum(count for status, count in counts.items() if status != 503)
+        print(f"{mode:<8}{'/'.join(f'{v:.1f}' for v in idle):>24}{'/'.join(f'{v:.1f}' for v in loaded):>26}"
+              f"{ok / elapsed:>9.1f}{counts.get(503, 0):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Peak memory and latency of decode_upload on large camera photos.
+
+Generates 12/24/48 MP JPEG photos with one QR code each (benchmarks.corpus),
+then scans them in a fresh process per mode, so peak RSS is not polluted by
+the other mode:
+
+  legacy   full-size color decode, then the staged QR pipeline (the previous
+           decode_upload)
+  current  decode_upload: grayscale decode at reduced resolution, with a
+           native-resolution retry on a miss
+
+Reports the decode rate (payload found), and p50/max latency and peak RSS
+growth per scan (VmHWM, reset before each scan). Linux only (uses /proc).
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_large_uploads --count 12
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ('legacy', 'current')
+
+
+def status_mb(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM to the current RSS
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def run_worker(mode, corpus_dir):
+    from qr_decode import decode_image, decode_qr_symbols, decode_upload
+
+    def legacy_decode_upload(data):
+        image, error = decode_image(data)
+        if error:
+            return [], None, error
+        symbols, decode_info = decode_qr_symbols(image)
+        return symbols, decode_info, None
+
+    scan = legacy_decode_upload if mode == 'legacy' else decode_upload
+    with open(os.path.join(corpus_dir, 'payloads.json'), encoding='utf-8') as f:
+        payloads = json.load(f)
+
+    latencies = []
+    peaks = []
+    decoded = 0
+    for i, payload in enumerate(payloads):
+        with open(os.path.join(corpus_dir, f'{i}.jpg'), 'rb') as f:
+            data = f.read()
+        baseline = status_mb('VmRSS')
+        reset_peak_rss()
+        start = time.perf_counter()
+        symbols, _, _ = scan(data)
+        latencies.append((time.perf_counter() - start) * 1000)
+        peaks.append(status_mb('VmHWM') - baseline)
+        decoded += any(symbol.data.decode('utf-8', errors='replace') == payload for symbol in symbols)
+        del data, symbols
+    print(json.dumps({"decoded": decoded, "latencies": latencies, "peaks": peaks}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=12, help="photos (cycling through 12, 24 and 48 MP)")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--corpus", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.corpus)
+        return
+
+    from benchmarks.corpus import make_large_photos
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        photos = make_large_photos(args.count)
+        for i, (_, data) in enumerate(photos):
+            with open(os.path.join(corpus_dir, f'{i}.jpg'), 'wb') as f:
+                f.write(data)
+        with open(os.path.join(corpus_dir, 'payloads.json'), 'w', encoding='utf-8') as f:
+            json.dump([payload for payload, _ in photos], f)
+        del photos
+
+        print(f"{'mode':<9}{'decoded':>9}{'p50 ms':>10}{'max ms':>10}{'p50 peak MB':>13}{'max peak MB':>13}")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_large_uploads', '--worker', mode, '--corpus', corpus_dir],
+                cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            latencies, peaks = result["latencies"], result["peaks"]
+            print(f"{mode:<9}{result['decoded']:>5}/{len(latencies):<3}{statistics.median(latencies):>10.1f}"
+                  f"{max(latencies):>10.1f}{statistics.median(peaks):>13.0f}{max(peaks):>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+check_payment_qr_heuristics against the original regex implementation.
+
+Verifies that verdicts on a synthetic UPI corpus, plus EDGE_PAYLOADS with
+empty and repeated keys, match the original implementation. Intended
+differences, none of which the parity corpus contains except the first:
+
+- amounts above 50,000 score the "very high" tier; the original never
+  reached that branch
+- query keys match case-insensitively; the original ignored PA=/AM=/TN=
+  and flagged MC= as a missing merchant code
+- values are percent-decoded and run to the next '&'; the original stopped
+  at the first whitespace, so a raw "tn=pay now" only saw "pay"
+- keys are matched as whole query keys; the original also found "am=" or
+  "mc=" inside other keys and values
+
+Then it reports throughput for both implementations and for EMVCo/Bharat QR
+payloads. The parser and amount tier cases live in test_qr_detection.py.
+
+On UPI payloads the two implementations run at about the same speed (0.9x
+to 1.2x across runs): the parser and matchers beat the old per-field
+regexes, and the separate feature and scoring steps spend that gain again.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_payment --count 100000
+"""
+import argparse
+import re
+import time
+
+import app
+from benchmarks.corpus import make_emv_payloads, make_upi_payloads
+
+
+def legacy_check_payment_qr_heuristics(qr_data):
+    """
+    check_payment_qr_heuristics as it was before the single-pass parser (reference only)
+    Returns: (is_fraudulent, risk_score, reasons, payment_info)
+    """
+    risk_score = 0
+    reasons = []
+    payment_info = {}
+
+    try:
+        qr_lower = qr_data.lower()
+
+        if 'pa=' in qr_data:
+            pa_match = re.search(r'pa=([^&\s]+)', qr_data, re.IGNORECASE)
+            if pa_match:
+                payment_info['payee_address'] = pa_match.group(1)
+
+        if 'pn=' in qr_data:
+            pn_match = re.search(r'pn=([^&\s]+)', qr_data, re.IGNORECASE)
+            if pn_match:
+                payment_info['payee_name'] = pn_match.group(1).replace('+', ' ')
+
+        if 'am=' in qr_data:
+            am_match = re.search(r'am=([^&\s]+)', qr_data, re.IGNORECASE)
+            if am_match:
+                payment_info['amount'] = am_match.group(1)
+
+        suspicious_keywords = [
+            'police', 'officer', 'cyber', 'crime', 'investigation',
+            'arrest', 'warrant', 'court', 'legal', 'fine',
+            'penalty', 'seized', 'frozen', 'blocked',
+            'prize', 'lottery', 'winner', 'claim', 'reward',
+            'refund', 'cashback', 'bonus', 'voucher',
+            'verify', 'update', 'confirm', 'security'
+        ]
+
+        payee_name = payment_info.get('payee_name', '').lower()
+        for keyword in suspicious_keywords:
+            if keyword in payee_name or keyword in qr_lower:
+                risk_score += 25
+                reasons.append(f"Suspicious keyword in payment: '{keyword}'")
+
+        payee_address = payment_info.get('payee_address', '').lower()
+        if payee_address:
+            if '@' in payee_address:
+                provider = payee_address.split('@')[-1]
+                personal_providers = ['okaxis', 'okicici', 'okhdfcbank', 'oksbi', 'paytm']
+                if any(p in provider for p in personal_providers):
+                    risk_score += 15
+                    reasons.append("Payment to personal account instead of merchant")
+
+            if re.search(r'\d{10}@', payee_address):
+                risk_score += 10
+                reasons.append("Payment to phone number-based UPI ID")
+
+        amount = payment_info.get('amount', '')
+        if amount:
+            try:
+                amount_float = float(amount)
+                if amount_float > 10000:
+                    risk_score += 20
+                    reasons.append(f"High payment amount: ₹{amount_float}")
+                elif amount_float > 50000:
+                    risk_score += 35
+                    reasons.append(f"Very high payment amount: ₹{amount_float}")
+            except ValueError:
+                pass
+
+        if 'tn=' in qr_data:
+            tn_match = re.search(r'tn=([^&\s]+)', qr_data, re.IGNORECASE)
+            if tn_match:
+                transaction_note = tn_match.group(1).lower()
+                urgent_words = ['urgent', 'immediately', 'asap', 'now', 'quickly', 'hurry']
+                for word in urgent_words:
+                    if word in transaction_note:
+                        risk_score += 15
+                        reasons.append("Urgent/pressure language in transaction note")
+                        break
+
+        if 'mc=' not in qr_data and 'am=' in qr_data:
+            risk_score += 10
+            reasons.append("Missing merchant category code (unusual for businesses)")
+
+        payment_app_count = sum([1 for app in ['paytm', 'phonepe', 'gpay', 'amazonpay'] if app in qr_lower])
+        if payment_app_count > 1:
+            risk_score += 20
+            reasons.append("Multiple payment apps in single QR (unusual)")
+
+        is_fraudulent = risk_score >= 30
+
+        return is_fraudulent, risk_score, reasons, payment_info
+
+    except Exception as e:
+        return False, 0, [f"Error analyzing payment QR: {str(e)}"], {}
+
+
+# Present-but-empty and repeated keys, where verdicts must still match the original
+EDGE_PAYLOADS = [
+    "upi://pay?am=&pa=9876543210@okaxis",
+    "upi://pay?pa=9876543210@okaxis&am=500&mc=",
+    "upi://pay?pa=shop@ybl&am=&am=15000",
+    "upi://pay?pa=shop@ybl&pn=&am=10",
+    "upi://pay?pa=shop@ybl&tn=&am=10&mc=5411",
+    "pa=shop@paytm&am=99&mc=5411&tn=hurry%20up",
+]
+
+
+def expected_verdict(legacy, amount):
+    # The only intended change: amounts above 50,000 move from the 20-point to the 35-point tier
+    is_fraudulent, risk_score, reasons, _ = legacy
+    if amount is None or float(amount) <= 50000:
+        return is_fraudulent, risk_score, reasons
+    risk_score += 15
+    reasons = [reason.replace("High payment amount", "Very high payment amount") for reason in reasons]
+    return risk_score >= 30, risk_score, reasons
+
+
+def timed(funcs, payloads, rounds=5):
+    # Best of several rounds, alternating implementations so both see the same machine load
+    results, best = [None] * len(funcs), [None] * len(funcs)
+    for _ in range(rounds):
+        for i, func in enumerate(funcs):
+            start = time.perf_counter()
+            results[i] = [func(payload) for payload in payloads]
+            elapsed = time.perf_counter() - start
+            best[i] = elapsed if best[i] is None else min(best[i], elapsed)
+    return results, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100000, help="payloads in each corpus")
+    args = parser.parse_args()
+
+    payloads = [payload for _, payload in make_upi_payloads(args.count)] + EDGE_PAYLOADS
+    (legacy, current), (legacy_time, current_time) = timed(
+        [legacy_check_payment_qr_heuristics, app.check_payment_qr_heuristics], payloads)
+    mismatches = [payload for payload, old, new in zip(payloads, legacy, current)
+                  if expected_verdict(old, old[3].get('amount')) != new[:3]]
+
+    emv_payloads = [payload for _, payload in make_emv_payloads(args.count)]
+    _, (emv_time,) = timed([app.check_payment_qr_heuristics], emv_payloads)
+
+    print(f"legacy:   {legacy_time:.3f}s  ({len(payloads) / legacy_time:,.0f} payloads/s)")
+    print(f"current:  {current_time:.3f}s  ({len(payloads) / current_time:,.0f} payloads/s)")
+    print(f"speedup:  {legacy_time / current_time:.2f}x")
+    print(f"EMV:      {emv_time:.3f}s  ({args.count / emv_time:,.0f} payloads/s)")
+    print(f"mismatches: {len(mismatches)}")
+    for payload in mismatches[:10]:
+        print(f"  {payload}")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
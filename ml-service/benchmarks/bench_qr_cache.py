@@ -0,0 +1,81 @@
+"""
+/api/detect_qr with and without the QR result cache on repeated uploads.
+
+Replays a stream of --uploads poster photos through the Flask test client.
+The photos are drawn from --posters camera-sized photos of QR codes, with
+Zipf-like popularity: a few posters account for most uploads, like printed
+scam posters photographed and forwarded over and over. The stream runs once
+with the cache disabled and once with --cache-size entries. Reports latency,
+throughput, cache hit rate and how many uploads were actually decoded, and
+checks that every cached response equals the uncached one (apart from decode
+timings).
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_qr_cache --posters 12 --uploads 300
+"""
+import argparse
+import io
+import random
+import time
+
+import app
+from benchmarks.bench_isolation import percentiles
+from benchmarks.corpus import make_large_photos
+from verdict_cache import QRResultCache
+
+
+def without_timings(body):
+    # Decode timings differ between any two decodes; a cached response repeats those of its decode
+    qr_decode = {key: value for key, value in (body.get('qr_decode') or {}).items() if key != 'timings_ms'}
+    return dict(body, qr_decode=qr_decode)
+
+
+def replay(client, photos, stream):
+    latencies = []
+    responses = []
+    start = time.perf_counter()
+    for index in stream:
+        request_start = time.perf_counter()
+        response = client.post('/api/detect_qr', data={'image': (io.BytesIO(photos[index]), 'poster.jpg')},
+                               content_type='multipart/form-data')
+        latencies.append((time.perf_counter() - request_start) * 1000)
+        responses.append((response.status_code, without_timings(response.get_json())))
+    return latencies, responses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posters", type=int, default=12, help="distinct poster photos")
+    parser.add_argument("--uploads", type=int, default=300, help="uploads in the replayed stream")
+    parser.add_argument("--cache-size", type=int, default=1000, help="QR result cache entries")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    photos = [photo for _, photo in make_large_photos(args.posters)]
+    rng = random.Random(args.seed)
+    stream = rng.choices(range(len(photos)), weights=[1 / (rank + 1) for rank in range(len(photos))], k=args.uploads)
+    client = app.app.test_client()
+    # Coalescing only matters for concurrent uploads; keep this a pure cache comparison
+    app.REQUEST_COALESCING = False
+
+    print(f"{args.uploads} uploads of {len(set(stream))} distinct posters\n")
+    print(f"{'cache':<8}{'p50 ms':>9}{'p99 ms':>10}{'uploads/s':>11}{'decoded':>9}{'hit rate':>10}{'mismatches':>12}")
+    baseline = None
+    for cache_size in (0, args.cache_size):
+        app.qr_result_cache = QRResultCache(max_size=cache_size, ttl=app.qr_result_cache.ttl)
+        app.verdict_cache.clear()
+        latencies, responses, seconds = replay(client, photos, stream)
+        stats = app.qr_result_cache.stats()
+        decoded = stats['misses'] if stats['enabled'] else len(stream)
+        if baseline is None:
+            baseline = responses
+        mismatches = sum(response != expected for response, expected in zip(responses, baseline))
+        p50, _, p99 = percentiles(latencies)
+        print(f"{'on' if stats['enabled'] else 'off':<8}{p50:>9.1f}{p99:>10.1f}{len(stream) / seconds:>11.1f}"
+              f"{decoded:>9}{stats['hit_rate']:>10.2%}{mismatches:>12}", flush=True)
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+QR upload decode throughput: temp-file round trip vs in-memory decode.
+
+Renders a deterministic corpus of QR images, then measures scans/second for
+the old path (save upload to the temp dir, cv2.imread, pyzbar) and the current
+path (decode_image from bytes, pyzbar), plus end-to-end /api/detect_qr
+requests through the Flask test client.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_qr_decode --count 1000
+"""
+import argparse
+import io
+import os
+import random
+import tempfile
+import time
+
+import cv2
+from pyzbar import pyzbar
+
+import app
+from qr_decode import decode_image
+
+PAYLOADS = [
+    "https://example.com/login?ref={i}",
+    "upi://pay?pa=merchant{i}@okaxis&pn=Shop%20{i}&am={i}.00&cu=INR",
+    "http://verify-account-{i}.tk/signin",
+    "WIFI:S:cafe-{i};T:WPA;P:password{i};;",
+]
+
+
+def make_corpus(count, seed=42):
+    rng = random.Random(seed)
+    encoder = cv2.QRCodeEncoder.create()
+    corpus = []
+    for i in range(count):
+        qr = encoder.encode(PAYLOADS[i % len(PAYLOADS)].format(i=i))
+        size = rng.choice([200, 400, 800, 1200])
+        image = cv2.resize(qr, (size, size), interpolation=cv2.INTER_NEAREST)
+        image = cv2.copyMakeBorder(image, 40, 40, 40, 40, cv2.BORDER_CONSTANT, value=255)
+        ext = rng.choice(['.png', '.jpg'])
+        ok, encoded = cv2.imencode(ext, image)
+        corpus.append((f"qr{ext}", encoded.tobytes()))
+    return corpus
+
+
+def legacy_scan(filename, data):
+    # What detect_qr did before: save under the upload name, re-read from disk
+    filepath = os.path.join(tempfile.gettempdir(), filename)
+    with open(filepath, 'wb') as f:
+        f.write(data)
+    try:
+        image = cv2.imread(filepath)
+        return pyzbar.decode(image)
+    finally:
+        os.remove(filepath)
+
+
+def in_memory_scan(filename, data):
+    image, _ = decode_image(data)
+    return pyzbar.decode(image)
+
+
+def rate(func, corpus):
+    start = time.perf_counter()
+    decoded = sum(1 for filename, data in corpus if func(filename, data))
+    return len(corpus) / (time.perf_counter() - start), decoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000, help="QR images in the corpus")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.count)
+    legacy_rate, legacy_decoded = rate(legacy_scan, corpus)
+    memory_rate, memory_decoded = rate(in_memory_scan, corpus)
+
+    client = app.app.test_client()
+    start = time.perf_counter()
+    for filename, data in corpus:
+        client.post('/api/detect_qr', data={'image': (io.BytesIO(data), filename)},
+                    content_type='multipart/form-data')
+    endpoint_rate = len(corpus) / (time.perf_counter() - start)
+
+    print(f"temp file + imread:  {legacy_rate:8.1f} scans/s  decoded {legacy_decoded}/{len(corpus)}")
+    print(f"in-memory imdecode:  {memory_rate:8.1f} scans/s  decoded {memory_decoded}/{len(corpus)}")
+    print(f"speedup:             {memory_rate / legacy_rate:8.2f}x")
+    print(f"/api/detect_qr:      {endpoint_rate:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Success rate and latency of each stage of the staged QR decode pipeline.
+
+Renders a deterministic set of QR images in several hard categories (tiny,
+large photo, blurred, low contrast, rotated) and runs decode_qr_symbols on
+each. Reports, per category, how often the pipeline decoded the code and
+which stage succeeded, and per stage its mean latency. The single-pass
+baseline (pyzbar.decode on the raw BGR image) is shown for comparison.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_qr_stages --per-category 50
+"""
+import argparse
+import random
+import time
+from collections import Counter, defaultdict
+
+import cv2
+import numpy as np
+from pyzbar import pyzbar
+
+import app
+from benchmarks.corpus import render_qr
+
+
+def on_canvas(qr, width, height, rng):
+    # Paste the code onto a noisy "photo" background
+    canvas = rng_noise(rng, height, width)
+    y = rng.randint(0, height - qr.shape[0])
+    x = rng.randint(0, width - qr.shape[1])
+    canvas[y:y + qr.shape[0], x:x + qr.shape[1]] = qr
+    return canvas
+
+
+def rng_noise(rng, height, width):
+    seed = rng.randint(0, 2 ** 31)
+    return np.random.default_rng(seed).integers(90, 200, size=(height, width), dtype=np.uint8)
+
+
+CATEGORIES = {
+    "clean": lambda qr, rng: qr,
+    "tiny": lambda qr, rng: cv2.resize(qr, (90, 90), interpolation=cv2.INTER_AREA),
+    "large_photo": lambda qr, rng: on_canvas(qr, 4000, 3000, rng),
+    "blurred": lambda qr, rng: cv2.GaussianBlur(qr, (0, 0), 2.5),
+    "low_contrast": lambda qr, rng: (qr.astype(np.float32) * 0.25 + 150 +
+                                     np.linspace(-60, 60, qr.shape[1], dtype=np.float32)).clip(0, 255).astype(np.uint8),
+    "rotated": lambda qr, rng: cv2.warpAffine(
+        qr, cv2.getRotationMatrix2D((qr.shape[1] / 2, qr.shape[0] / 2), rng.uniform(10, 40), 1.0),
+        (qr.shape[1], qr.shape[0]), borderValue=255),
+}
+
+
+def make_image_set(per_category, seed=7):
+    rng = random.Random(seed)
+    images = []
+    for category, transform in CATEGORIES.items():
+        for i in range(per_category):
+            text = f"https://example.com/{category}/{i}"
+            gray = transform(render_qr(text, rng.choice([240, 320, 480])), rng)
+            images.append((category, cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)))
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-category", type=int, default=50, help="images per category")
+    args = parser.parse_args()
+
+    images = make_image_set(args.per_category)
+    baseline = Counter()
+    decoded = Counter()
+    winners = defaultdict(Counter)
+    stage_times = defaultdict(list)
+    baseline_ms = []
+    pipeline_ms = []
+
+    for category, image in images:
+        start = time.perf_counter()
+        if pyzbar.decode(image):
+            baseline[category] += 1
+        baseline_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        symbols, info = app.decode_qr_symbols(image)
+        pipeline_ms.append((time.perf_counter() - start) * 1000)
+        if symbols:
+            decoded[category] += 1
+        winners[category][info["stage"] or "none"] += 1
+        for stage, ms in info["timings_ms"].items():
+            stage_times[stage].append(ms)
+
+    print(f"{'category':<14}{'baseline':>10}{'staged':>10}  winning stages")
+    for category in CATEGORIES:
+        stages = ", ".join(f"{stage}={count}" for stage, count in winners[category].most_common())
+        print(f"{category:<14}{baseline[category] / args.per_category:>10.0%}"
+              f"{decoded[category] / args.per_category:>10.0%}  {stages}")
+
+    print(f"\n{'stage':<20}{'runs':>6}{'mean ms':>10}")
+    for stage, times in stage_times.items():
+        print(f"{stage:<20}{len(times):>6}{sum(times) / len(times):>10.2f}")
+    print(f"\nmean per image: baseline {np.mean(baseline_ms):.2f} ms, staged {np.mean(pipeline_ms):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Re-scoring a feature file against re-running the heuristics.
+
+Extracts URL and payment features for a synthetic corpus once (without the
+model), then for several rule variants (changed weights, limits, amount tiers
+and thresholds) compares:
+
+  rerun    app.url_rule_hits / app.payment_rule_hits on every record, i.e.
+           re-parsing each URL or payload under the variant rules
+  rescore  feature_store.rescore over the stored columns
+
+and checks that both give the same risk score and verdict for every record.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_rescore --count 200000
+"""
+import argparse
+import copy
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import app
+from benchmarks.corpus import make_emv_payloads, make_upi_payloads, make_urls
+from feature_store import FeatureTable, extract, rescore
+from heuristic_rules import CompiledRules
+
+
+def variants(spec):
+    """
+    Returns: list of (name, CompiledRules) rule variants derived from spec
+    """
+    doubled = copy.deepcopy(spec)
+    for section in ('url', 'payment'):
+        doubled[section]['weights'] = {rule: weight * 2 for rule, weight in spec[section]['weights'].items()}
+    doubled['url']['suspicious_at'] = doubled['payment']['fraudulent_at'] = 50
+
+    strict = copy.deepcopy(spec)
+    strict['url']['limits'] = {'max_subdomains': 2, 'max_domain_length': 25, 'max_hyphens': 1}
+    strict['url']['suspicious_at'] = 20
+    strict['payment']['amount_tiers'] = [[20000, 40, "Very high payment amount"], [1000, 15, "High payment amount"]]
+
+    relaxed = copy.deepcopy(spec)
+    relaxed['url']['weights'].update(keyword=5, no_https=0)
+    relaxed['payment']['weights'].update(keyword=10, missing_merchant_code=0)
+    relaxed['payment']['fraudulent_at'] = 40
+
+    return [(name, CompiledRules(dict(rules, version=name)))
+            for name, rules in (('current', spec), ('doubled', doubled), ('strict', strict), ('relaxed', relaxed))]
+
+
+def rerun(keys, rules, kind):
+    scores = []
+    flags = []
+    for key in keys:
+        if kind == 'url':
+            hits = app.url_rule_hits(key, rules)[1]
+            threshold = rules.suspicious_at
+        else:
+            hits = app.payment_rule_hits(key, rules)[1]
+            threshold = rules.fraudulent_at
+        _, score, _ = app.heuristics_from_hits(hits, threshold)
+        scores.append(score)
+        flags.append(score >= threshold)
+    return np.array(scores), np.array(flags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200000, help="records of each kind")
+    args = parser.parse_args()
+
+    with open(app.RULES_FILE, encoding='utf-8') as f:
+        spec = json.load(f)
+    corpora = {
+        'url': [url for _, url in make_urls(args.count)],
+        'payment': [payload for _, payload in make_upi_payloads(args.count // 2)]
+                   + [payload for _, payload in make_emv_payloads(args.count - args.count // 2)],
+    }
+
+    failed = False
+    print(f"{'kind':<9}{'rules':<9}{'records':>10}{'rerun s':>9}{'rescore s':>11}{'speedup':>9}{'flagged':>9}{'mismatches':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, keys in corpora.items():
+            path = os.path.join(directory, f'{kind}.npz')
+            extract(keys, path, kind, with_model=False)
+            table = FeatureTable(path)
+            for name, rules in variants(spec):
+                start = time.perf_counter()
+                scores, flags = rerun(keys, rules, kind)
+                rerun_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                verdicts = rescore(table, rules)
+                rescore_seconds = time.perf_counter() - start
+                mismatches = int(((verdicts["risk_score"] != scores) | (verdicts["flagged"] != flags)).sum())
+                failed |= mismatches > 0
+                print(f"{kind:<9}{name:<9}{len(table):>10,}{rerun_seconds:>9.2f}{rescore_seconds:>11.4f}"
+                      f"{rerun_seconds / rescore_seconds:>8.0f}x{int(flags.sum()):>9,}{mismatches:>12}", flush=True)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
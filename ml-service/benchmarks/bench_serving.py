@@ -0,0 +1,144 @@
+"""
+Load test: /api/detect_link under gunicorn (WSGI threads) vs uvicorn (asgi.py).
+
+For each server and each --concurrency level, that many clients each hold a
+keep-alive connection and post detect_link requests back to back for
+--duration seconds. It reports throughput, p50/p99 latency, 503s (queue
+full) and errors (refused/reset connections, timeouts, other statuses).
+With gunicorn every in-flight request occupies one of WEB_CONCURRENCY x
+GUNICORN_THREADS threads and the rest wait in the listen backlog; the ASGI
+server holds each one as a coroutine.
+
+The verdict cache is disabled so every request reaches the model. Servers
+whose module is not installed are skipped. Usage (from ml-service/):
+    python -m benchmarks.bench_serving --concurrency 100 1000 2000 --duration 10
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_isolation import percentiles
+from benchmarks.bench_startup import free_port, wait_for
+from benchmarks.corpus import make_urls
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'gunicorn': lambda port, workers: [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                       '--workers', str(workers), '--bind', f'127.0.0.1:{port}', 'app:app'],
+    'uvicorn': lambda port, workers: [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+                                      '--port', str(port), '--workers', str(workers), '--no-access-log',
+                                      '--backlog', '4096'],
+}
+
+
+def raise_fd_limit(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() == 'close'
+
+
+async def client(port, bodies, offset, deadline, latencies, counts):
+    reader = writer = None
+    i = offset
+    while time.perf_counter() < deadline:
+        body = bodies[i % len(bodies)]
+        i += 1
+        request = (f'POST /api/detect_link HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+                   f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            status, close = await asyncio.wait_for(read_response(reader), 30)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            counts['error'] += 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+            continue
+        if status == 200:
+            counts['ok'] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+        elif status == 503:
+            counts['503'] += 1
+        else:
+            counts['error'] += 1
+        if close:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, concurrency, duration, bodies):
+    latencies = []
+    counts = {'ok': 0, '503': 0, 'error': 0}
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*[client(port, bodies, n, deadline, latencies, counts) for n in range(concurrency)])
+    return latencies, counts
+
+
+def run_server(name, args, bodies):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), DEBUG='False', VERDICT_CACHE_SIZE='0', REQUEST_COALESCING='False',
+               PRELOAD_MODEL='False', MODEL_LOAD_MODE='eager')
+    process = subprocess.Popen(SERVERS[name](port, args.workers), cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    rows = []
+    try:
+        wait_for(f'http://127.0.0.1:{port}/api/health?ready=1')
+        asyncio.run(load(port, 8, 1, bodies))  # warmup
+        for concurrency in args.concurrency:
+            latencies, counts = asyncio.run(load(port, concurrency, args.duration, bodies))
+            rows.append((concurrency, latencies, counts))
+    finally:
+        process.terminate()
+        process.wait()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[100, 1000, 2000])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per concurrency level")
+    parser.add_argument("--workers", type=int, default=1, help="server worker processes")
+    parser.add_argument("--servers", nargs="+", default=list(SERVERS), choices=list(SERVERS))
+    args = parser.parse_args()
+
+    raise_fd_limit(max(args.concurrency) * 2 + 256)
+    bodies = [json.dumps({"url": url}).encode() for _, url in make_urls(5000, seed=21)]
+
+    print(f"{'server':<10}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'503':>8}{'errors':>8}")
+    for name in args.servers:
+        if importlib.util.find_spec(name) is None:
+            print(f"{name:<10}  skipped ({name} is not installed)")
+            continue
+        for concurrency, latencies, counts in run_server(name, args, bodies):
+            p50, _, p99 = percentiles(latencies) if latencies else (float('nan'),) * 3
+            print(f"{name:<10}{concurrency:>8}{counts['ok'] / args.duration:>10.1f}{p50:>10.1f}{p99:>10.1f}"
+                  f"{counts['503']:>8}{counts['error']:>8}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
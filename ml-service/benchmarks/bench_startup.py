@@ -0,0 +1,138 @@
+"""
+Cold-start time and per-worker memory for the model load modes.
+
+For each MODEL_LOAD_MODE it starts `python app.py` and measures the time until
+/api/health answers (port bound) and until the model is ready. It then starts
+gunicorn with and without preloading and reports RSS and PSS for each worker.
+PSS splits shared pages between processes, so it shows copy-on-write sharing
+that RSS hides.
+
+Linux only (reads /proc). Usage (from ml-service/):
+    python -m benchmarks.bench_startup --workers 4
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def request(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError):
+        return None
+
+
+def wait_for(url, expected=200, timeout=600, payload=None):
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if request(url, payload) == expected:
+            return time.perf_counter() - start
+        time.sleep(0.05)
+    raise TimeoutError(url)
+
+
+def memory_kb(pid):
+    # (rss, pss) in KiB from smaps_rollup
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values['Rss'], values['Pss']
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def start(command, env):
+    return subprocess.Popen(command, cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def bench_load_mode(mode):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), MODEL_LOAD_MODE=mode, DEBUG='False')
+    base = f'http://127.0.0.1:{port}'
+    launched = time.perf_counter()
+    process = start([sys.executable, 'app.py'], env)
+    try:
+        bind_seconds = wait_for(f'{base}/api/health')
+        if mode == 'lazy':
+            # Lazy mode only loads on first use
+            wait_for(f'{base}/api/detect_link', payload={"url": "https://example.com"})
+        wait_for(f'{base}/api/health?ready=1')
+        ready_seconds = time.perf_counter() - launched
+        rss, _ = memory_kb(process.pid)
+        return bind_seconds, ready_seconds, rss
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def bench_gunicorn(workers, preload):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers),
+               PRELOAD_MODEL=str(preload), MODEL_LOAD_MODE='eager')
+    process = start([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'], env)
+    try:
+        launched = time.perf_counter()
+        wait_for(f'http://127.0.0.1:{port}/api/health?ready=1')
+        # Give every worker time to finish booting before sampling memory
+        while len(children(process.pid)) < workers:
+            time.sleep(0.1)
+        time.sleep(2)
+        ready_seconds = time.perf_counter() - launched
+        samples = [memory_kb(pid) for pid in children(process.pid)]
+        return ready_seconds, samples, memory_kb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--skip-gunicorn", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{'load mode':<12}{'bind s':>9}{'ready s':>9}{'RSS MB':>9}")
+    for mode in ('eager', 'background', 'lazy'):
+        bind_seconds, ready_seconds, rss = bench_load_mode(mode)
+        print(f"{mode:<12}{bind_seconds:>9.2f}{ready_seconds:>9.2f}{rss / 1024:>9.1f}")
+
+    if args.skip_gunicorn:
+        return
+
+    print(f"\ngunicorn, {args.workers} workers")
+    print(f"{'preload':<10}{'ready s':>9}{'worker RSS MB':>15}{'worker PSS MB':>15}{'total PSS MB':>14}")
+    for preload in (False, True):
+        ready_seconds, samples, master = bench_gunicorn(args.workers, preload)
+        mean_rss = sum(rss for rss, _ in samples) / len(samples) / 1024
+        mean_pss = sum(pss for _, pss in samples) / len(samples) / 1024
+        total_pss = (sum(pss for _, pss in samples) + master[1]) / 1024
+        print(f"{str(preload):<10}{ready_seconds:>9.2f}{mean_rss:>15.1f}{mean_pss:>15.1f}{total_pss:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
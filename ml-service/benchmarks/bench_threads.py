@@ -0,0 +1,103 @@
+"""
+Sweep server workers x torch intra-op threads and report total throughput.
+
+For each combination it starts that many worker processes, each with
+TORCH_THREADS set, as gunicorn would fork them. Every worker loads the
+backend and warms up, and once all are ready they run forward passes at
+--batch-size together for --duration seconds. Throughput is summed across
+workers; p50/p99 are per forward pass. Combinations that oversubscribe the
+CPUs (workers x threads > CPUs) are marked with '*'.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_threads --workers 1 2 4 --threads 1 2 4 auto --batch-size 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_isolation import percentiles
+from benchmarks.corpus import make_urls
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_worker(backend_name, batch_size, duration):
+    from inference import MODEL_NAME, load_backend
+
+    backend = load_backend(backend_name, MODEL_NAME)
+    urls = [url for _, url in make_urls(4096, seed=os.getpid())]
+    backend.warmup((batch_size,))
+    print(json.dumps({"ready": True, "threads": backend.threads}), flush=True)
+    sys.stdin.readline()  # start signal
+
+    latencies = []
+    processed = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        batch = [urls[(processed + i) % len(urls)] for i in range(batch_size)]
+        call_start = time.perf_counter()
+        backend.predict(batch)
+        latencies.append((time.perf_counter() - call_start) * 1000)
+        processed += batch_size
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"processed": processed, "elapsed": elapsed, "latencies": latencies}), flush=True)
+
+
+def run_combination(workers, threads, args):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), TORCH_THREADS=str(threads), MODEL_CONCURRENCY='1')
+    command = [sys.executable, '-m', 'benchmarks.bench_threads', '--worker', '--backend', args.backend,
+               '--batch-size', str(args.batch_size), '--duration', str(args.duration)]
+    processes = [subprocess.Popen(command, cwd=SERVICE_DIR, env=env, text=True,
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+                 for _ in range(workers)]
+    try:
+        settings = [json.loads(process.stdout.readline())["threads"] for process in processes]
+        for process in processes:
+            process.stdin.write("go\n")
+            process.stdin.flush()
+        results = [json.loads(process.stdout.readline()) for process in processes]
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+    latencies = [latency for result in results for latency in result["latencies"]]
+    throughput = sum(result["processed"] / result["elapsed"] for result in results)
+    return settings[0], throughput, percentiles(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", nargs="+", default=["1", "2", "4", "auto"], help="TORCH_THREADS values")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10, help="seconds of measurement per combination")
+    parser.add_argument("--backend", default=os.environ.get('INFERENCE_BACKEND', 'torch'))
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.backend, args.batch_size, args.duration)
+        return
+
+    from inference import available_cpus
+
+    cpus = available_cpus()
+    print(f"{cpus} CPUs available, backend {args.backend}, batch size {args.batch_size}\n")
+    print(f"{'workers':>8}{'threads':>9}{'intra-op':>10}{'URLs/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    best = None
+    for workers in args.workers:
+        for threads in args.threads:
+            settings, throughput, (p50, _, p99) = run_combination(workers, threads, args)
+            oversubscribed = '*' if workers * settings["intra_op"] > cpus else ' '
+            print(f"{workers:>8}{threads:>9}{settings['intra_op']:>9}{oversubscribed}{throughput:>10.1f}"
+                  f"{p50:>9.1f}{p99:>9.1f}", flush=True)
+            if best is None or throughput > best[0]:
+                best = (throughput, workers, settings["intra_op"])
+    print(f"\nbest: WEB_CONCURRENCY={best[1]} TORCH_THREADS={best[2]} ({best[0]:.1f} URLs/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Verdict store read throughput as the store grows.
+
+Fills a fresh store in steps up to each --sizes value with synthetic verdicts
+(one registered domain per --urls-per-domain URLs), then times random
+lookup() hits, lookup() misses and reputation() lookups at that size. The
+rates should stay roughly flat: each lookup is one primary-key probe.
+Filling tens of millions of rows takes a few minutes and several GB of disk.
+
+Usage (from ml-service/):
+    python -m benchmarks.bench_verdict_store --sizes 10000 100000 1000000 10000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from verdict_store import VerdictStore
+
+RESULT = {"prediction": "safe", "confidence": 0.97, "is_fraudulent": False, "threat_type": "Benign",
+          "risk_score": 0, "ml_prediction": "Benign", "ml_confidence": 0.97, "heuristic_check": "clean",
+          "warning_flags": [], "decided_by": "model"}
+
+
+def synthetic_url(i, urls_per_domain):
+    return f"https://www.site{i // urls_per_domain}.example-{i % 7}.com/path/{i}?ref={i * 31 % 997}"
+
+
+def fill(store, start, end, urls_per_domain, chunk=20000):
+    for offset in range(start, end, chunk):
+        items = []
+        for i in range(offset, min(end, offset + chunk)):
+            items.append((synthetic_url(i, urls_per_domain), dict(RESULT, is_fraudulent=i % 10 == 0)))
+        store.record_many(items)
+
+
+def rate(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return len(keys) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--lookups", type=int, default=20000, help="timed lookups of each kind per size")
+    parser.add_argument("--urls-per-domain", type=int, default=50)
+    parser.add_argument("--db", help="store file (default: a temporary file, removed afterwards)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), 'verdicts.db')
+    store = VerdictStore(path)
+    rng = random.Random(0)
+    filled = 0
+
+    print(f"{'verdicts':>12}{'fill s':>9}{'hits/s':>11}{'misses/s':>11}{'reputation/s':>14}{'file MB':>9}")
+    try:
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            fill(store, filled, size, args.urls_per_domain)
+            fill_seconds = time.perf_counter() - start
+            filled = size
+
+            hits = [synthetic_url(rng.randrange(size), args.urls_per_domain) for _ in range(args.lookups)]
+            misses = [f"https://unknown{rng.randrange(10 ** 9)}.example.org/x" for _ in range(args.lookups)]
+            hit_rate = rate(store.lookup, hits)
+            miss_rate = rate(store.lookup, misses)
+            reputation_rate = rate(store.reputation, hits)
+            megabytes = sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix)) / 1e6
+            print(f"{size:>12,}{fill_seconds:>9.1f}{hit_rate:>11,.0f}{miss_rate:>11,.0f}{reputation_rate:>14,.0f}"
+                  f"{megabytes:>9.0f}", flush=True)
+    finally:
+        if not args.db:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Deterministic synthetic corpora shared by the benchmarks.
+
+Every generator takes a count and a seed and returns the same data on every
+run and machine, so benchmark results are comparable across commits.
+"""
+import binascii
+import random
+
+import cv2
+import numpy as np
+
+BENIGN_HOSTS = ['www.google.com', 'github.com', 'en.wikipedia.org', 'news.ycombinator.com',
+                'docs.python.org', 'www.amazon.in', 'stackoverflow.com', 'mail.example.org',
+                'www.irctc.co.in', 'accounts.zoho.com']
+PHISHING_HOSTS = ['paypal-secure-login.verify-account.tk', 'apple.id-confirm.xyz', '192.168.4.20',
+                  'bit.ly', 'secure.update.banking.account.info', 'free-gift-winner-claim-now.online',
+                  'atualizacao-dados-conta.site', 'tinyurl.com', 'paypalogin.co', 'x.y.z.w.v.cc',
+                  'sbi-kyc-update.top', 'netflix-billing.support:8443']
+# Cyrillic lookalikes substituted into well-known brands
+HOMOGLYPH_HOSTS = ['micrоsoft-login.com', 'gооgle.com', 'аpple.com', 'pаypal.com',
+                   'amazоn.in', 'facеbook.com', 'whatsаpp.net', 'сhase.com']
+BENIGN_PATHS = ['', '/', '/index.html', '/wiki/Phishing', '/search?q=python+docs', '/repos/issues/42',
+                '/3/library/re.html', '/dp/B08N5WRWNW', '/questions/tagged/flask']
+PHISHING_PATHS = ['/signin', '/account/verify', '/wallet/connect?next=/claim', '/user@host',
+                  '/senha/recuperar', '/notification/urgent-action-required', '/confirmar-urgente',
+                  '/Suspenso?ref=SignIn', '/']
+
+# Mostly benign traffic, like a real scan queue
+URL_MIX = (('benign', 0.65), ('phishing', 0.25), ('homoglyph', 0.10))
+
+
+def make_urls(count, seed=1234):
+    """
+    Returns: list of (category, url); a unique query keeps caches from flattering any case
+    """
+    rng = random.Random(seed)
+    categories = [name for name, _ in URL_MIX]
+    weights = [weight for _, weight in URL_MIX]
+    urls = []
+    for i in range(count):
+        category = rng.choices(categories, weights)[0]
+        if category == 'benign':
+            host, path = rng.choice(BENIGN_HOSTS), rng.choice(BENIGN_PATHS)
+        elif category == 'phishing':
+            host, path = rng.choice(PHISHING_HOSTS), rng.choice(PHISHING_PATHS)
+        else:
+            host, path = rng.choice(HOMOGLYPH_HOSTS), rng.choice(BENIGN_PATHS + PHISHING_PATHS)
+        scheme = rng.choice(['https', 'https', 'http'])
+        separator = '&' if '?' in path else '?'
+        urls.append((category, f"{scheme}://{host}{path}{separator}r={i}"))
+    return urls
+
+
+MERCHANT_PAYEES = [('bigbasket@icici', 'BigBasket'), ('swiggy.stores@axisbank', 'Swiggy'),
+                   ('irctc.ticketing@sbi', 'IRCTC'), ('chai.point@ybl', 'Chai+Point')]
+SCAM_PAYEES = [('9876543210@okaxis', 'Cyber+Crime+Cell'), ('refund.desk@oksbi', 'Refund+Department'),
+               ('lottery.winner@paytm', 'KBC+Lottery+Prize'), ('kyc.verify@okhdfcbank', 'KYC+Security+Update')]
+NOTES = ['', 'Order+4411', 'Monthly+rent', 'Pay+urgent+fine+now', 'Claim+reward+immediately']
+AMOUNTS = ['', '49.00', '350', '1299.50', '12000', '75000']
+
+
+def make_upi_payloads(count, seed=4321):
+    """
+    Returns: list of (category, payload) UPI deep links, merchant or scam-shaped
+    """
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(count):
+        category = 'scam' if rng.random() < 0.4 else 'merchant'
+        address, name = rng.choice(SCAM_PAYEES if category == 'scam' else MERCHANT_PAYEES)
+        params = [f"pa={address}", f"pn={name}"]
+        amount = rng.choice(AMOUNTS)
+        if amount:
+            params.append(f"am={amount}")
+        note = rng.choice(NOTES)
+        if note:
+            params.append(f"tn={note}")
+        params += [f"tr=TXN{i:08d}", "cu=INR"]
+        payloads.append((category, "upi://pay?" + "&".join(params)))
+    return payloads
+
+
+def emv_field(tag, value):
+    return f"{tag}{len(value):02d}{value}"
+
+
+def emv_payload(fields, valid_crc=True):
+    """
+    Returns: EMVCo merchant-presented QR string for [(tag, value)] with a CRC-16/CCITT-FALSE trailer
+    """
+    body = emv_field('00', '01') + ''.join(emv_field(tag, value) for tag, value in fields) + '6304'
+    crc = binascii.crc_hqx(body.encode('utf-8'), 0xFFFF)
+    return body + f"{crc if valid_crc else crc ^ 0x1:04X}"
+
+
+def make_emv_payloads(count, seed=2468):
+    """
+    Returns: list of (category, payload) Bharat QR strings; some scam payloads carry a broken checksum
+    """
+    rng = random.Random(seed)
+    payloads = []
+    for i in range(count):
+        category = 'scam' if rng.random() < 0.4 else 'merchant'
+        address, name = rng.choice(SCAM_PAYEES if category == 'scam' else MERCHANT_PAYEES)
+        fields = [('26', emv_field('00', 'A000000524') + emv_field('01', address)),
+                  ('52', rng.choice(['5411', '5812', '4111'])), ('53', '356')]
+        amount = rng.choice(AMOUNTS)
+        if amount:
+            fields.append(('54', amount))
+        fields += [('58', 'IN'), ('59', name.replace('+', ' ')), ('60', 'Mumbai')]
+        note = rng.choice(NOTES)
+        additional = emv_field('05', f"TXN{i:08d}") + (emv_field('08', note.replace('+', ' ')) if note else '')
+        fields.append(('62', additional))
+        payloads.append((category, emv_payload(fields, valid_crc=category == 'merchant' or rng.random() < 0.5)))
+    return payloads
+
+
+def render_qr(text, size):
+    """
+    Returns: grayscale QR image scaled to size x size pixels, plus a white quiet zone
+    """
+    qr = cv2.QRCodeEncoder.create().encode(text)
+    qr = cv2.resize(qr, (size, size), interpolation=cv2.INTER_NEAREST)
+    return cv2.copyMakeBorder(qr, size // 8, size // 8, size // 8, size // 8, cv2.BORDER_CONSTANT, value=255)
+
+
+QR_SIZES = (160, 320, 640, 1280)
+
+
+def make_qr_images(count, seed=99, noise=12.0):
+    """
+    Returns: list of (payload, encoded PNG/JPEG bytes) for URL and UPI payloads at several sizes,
+    with Gaussian pixel noise of standard deviation `noise`
+    """
+    rng = random.Random(seed)
+    noise_rng = np.random.default_rng(seed)
+    urls = make_urls(count, seed)
+    upis = make_upi_payloads(count, seed)
+    images = []
+    for i in range(count):
+        # Alternate URL and UPI payloads
+        payload = (urls if i % 2 == 0 else upis)[i][1]
+        gray = render_qr(payload, rng.choice(QR_SIZES)).astype(np.float32)
+        gray += noise_rng.normal(0, noise, gray.shape).astype(np.float32)
+        image = cv2.cvtColor(gray.clip(0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+        ext = rng.choice(['.png', '.jpg'])
+        ok, encoded = cv2.imencode(ext, image)
+        images.append((payload, encoded.tobytes()))
+    return images
+
+
+# Phone camera resolutions: 12, 24 and 48 MP
+PHOTO_SIZES = ((4000, 3000), (6000, 4000), (8000, 6000))
+# QR code side as a fraction of the photo's shorter side
+PHOTO_QR_FRACTIONS = (0.06, 0.12, 0.25)
+
+
+def make_large_photos(count, seed=77, noise=6.0):
+    """
+    Returns: list of (payload, JPEG bytes) for camera-sized photos with one QR code on a
+    noisy gradient background, cycling through PHOTO_SIZES
+    """
+    rng = random.Random(seed)
+    noise_rng = np.random.default_rng(seed)
+    urls = make_urls(count, seed)
+    photos = []
+    for i in range(count):
+        width, height = PHOTO_SIZES[i % len(PHOTO_SIZES)]
+        payload = urls[i][1]
+        gradient = np.linspace(90, 200, width, dtype=np.float32)[None, :] + np.linspace(-30, 30, height, dtype=np.float32)[:, None]
+        gradient += noise_rng.normal(0, noise, (height, width)).astype(np.float32)
+        gray = gradient.clip(0, 255).astype(np.uint8)
+        del gradient
+        qr = render_qr(payload, int(min(width, height) * rng.choice(PHOTO_QR_FRACTIONS)))
+        top = rng.randrange(0, height - qr.shape[0])
+        left = rng.randrange(0, width - qr.shape[1])
+        gray[top:top + qr.shape[0], left:left + qr.shape[1]] = qr
+        ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        photos.append((payload, encoded.tobytes()))
+    return photos
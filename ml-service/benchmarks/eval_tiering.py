@@ -0,0 +1,70 @@
+"""
+Offline evaluation of tiered decisions against the always-run-model baseline.
+
+For each uncertainty band it reports the fraction of model calls avoided, how
+often the tiered verdict (is_fraudulent) agrees with the baseline, and the
+agreement per deciding tier. The model runs once per URL for the baseline;
+bands are then evaluated without further inference.
+
+Usage (from ml-service/):
+    python -m benchmarks.eval_tiering --input urls.txt --bands 10:60 20:50 0:100
+    python -m benchmarks.eval_tiering --count 5000     # synthetic corpus
+"""
+import argparse
+from collections import Counter
+
+import app
+from benchmarks.bench_heuristics import make_corpus
+
+
+def load_urls(path):
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def parse_band(text):
+    low, high = text.split(':')
+    return int(low), int(high)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="file with one URL per line (default: synthetic corpus)")
+    parser.add_argument("--count", type=int, default=5000, help="synthetic corpus size")
+    parser.add_argument("--bands", type=parse_band, nargs="+",
+                        default=[(app.TIER_SAFE_BELOW, app.TIER_MALICIOUS_AT)],
+                        help="uncertainty bands as safe_below:malicious_at")
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    unavailable = app.model_unavailable()
+    if unavailable:
+        raise SystemExit(unavailable[0]["error"])
+
+    urls = load_urls(args.input) if args.input else make_corpus(args.count)
+    heuristics = [app.check_url_heuristics(url) for url in urls]
+    predictions = app.classify_urls(urls, args.batch_size)
+    baseline = [app.build_url_result(url, h, *p)["is_fraudulent"] for url, h, p in zip(urls, heuristics, predictions)]
+
+    print(f"{len(urls)} URLs, baseline flags {sum(baseline)} as fraudulent; "
+          f"allowlist {len(app.url_allowlist)} / blocklist {len(app.url_blocklist)} domains\n")
+    print(f"{'band':<10}{'model calls avoided':>21}{'agreement':>11}  per tier (agreement, count)")
+    for safe_below, malicious_at in args.bands:
+        tiers = Counter()
+        agreed = Counter()
+        for url, expected in zip(urls, baseline):
+            result, _ = app.tiered_verdict(url, safe_below, malicious_at)
+            tier = result["decided_by"] if result else "model"
+            # Model-decided URLs get exactly the baseline verdict
+            verdict = result["is_fraudulent"] if result else expected
+            tiers[tier] += 1
+            agreed[tier] += verdict == expected
+        avoided = 1 - tiers["model"] / len(urls)
+        agreement = sum(agreed.values()) / len(urls)
+        per_tier = ", ".join(f"{tier} {agreed[tier] / count:.1%} ({count})" for tier, count in tiers.most_common())
+        band = f"{safe_below}:{malicious_at}"
+        print(f"{band:<10}{avoided:>21.1%}{agreement:>11.2%}  {per_tier}")
+
+
+if __name__ == "__main__":
+    main()
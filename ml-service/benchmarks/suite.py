@@ -0,0 +1,261 @@
+"""
+Reproducible benchmark suite for the ml-service hot paths.
+
+Runs every case on deterministic corpora (benchmarks.corpus), takes the
+median of several timed rounds after a warmup, and writes the results as
+JSON. With --compare, results are checked against a stored baseline and the
+run exits non-zero if any case got slower than the threshold allows.
+
+Cases marked [model] need the URL model and are skipped (and reported as
+skipped) when it is not available.
+
+Usage (from ml-service/):
+    python -m benchmarks.suite -o baseline.json
+    python -m benchmarks.suite -o current.json --compare baseline.json --threshold 0.15
+    python -m benchmarks.suite --only url_heuristics payment_heuristics --quick
+    python -m benchmarks.suite --list
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+import app
+import qr_decode
+from benchmarks.corpus import make_emv_payloads, make_qr_images, make_upi_payloads, make_urls
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_VERSION = 1
+BATCH_SIZES = (1, 8, 32, 128)
+
+
+class Case:
+    def __init__(self, name, setup, unit, requires_model=False):
+        self.name = name
+        # setup(sizes) -> (run, item count); run() processes every item once
+        self.setup = setup
+        self.unit = unit
+        self.requires_model = requires_model
+
+
+def url_heuristics(sizes):
+    urls = [url for _, url in make_urls(sizes['urls'])]
+    return lambda: [app.check_url_heuristics(url) for url in urls], len(urls)
+
+
+def payment_heuristics(sizes):
+    payloads = [payload for _, payload in make_upi_payloads(sizes['payments'])]
+    return lambda: [app.check_payment_qr_heuristics(payload) for payload in payloads], len(payloads)
+
+
+def payment_heuristics_emv(sizes):
+    payloads = [payload for _, payload in make_emv_payloads(sizes['payments'])]
+    return lambda: [app.check_payment_qr_heuristics(payload) for payload in payloads], len(payloads)
+
+
+def qr_decode_classify(sizes):
+    # Upload decoding is not part of this case; /api/detect_qr covers it end to end
+    images = [qr_decode.decode_image(data)[0] for _, data in make_qr_images(sizes['images'])]
+    return lambda: [app.first_qr_payload(qr_decode.decode_qr_symbols(image)[0]) for image in images], len(images)
+
+
+def predict_url_case(batch_size):
+    def setup(sizes):
+        urls = [url for _, url in make_urls(sizes['model_urls'], seed=batch_size)]
+        if batch_size == 1:
+            return lambda: [app.predict_url(url) for url in urls], len(urls)
+        return lambda: app.predict_urls(urls, batch_size=batch_size), len(urls)
+    return setup
+
+
+def flask_detect_link(sizes):
+    client = app.app.test_client()
+    urls = [url for _, url in make_urls(sizes['requests'], seed=7)]
+    return lambda: [client.post('/api/detect_link', json={"url": url}) for url in urls], len(urls)
+
+
+def flask_detect_links(sizes):
+    client = app.app.test_client()
+    urls = [url for _, url in make_urls(sizes['model_urls'], seed=8)]
+    chunks = [urls[i:i + 32] for i in range(0, len(urls), 32)]
+    return lambda: [client.post('/api/detect_links', json={"urls": chunk}) for chunk in chunks], len(urls)
+
+
+def flask_detect_qr(sizes):
+    client = app.app.test_client()
+    uploads = [(data, 'qr.png' if data.startswith(b'\x89PNG') else 'qr.jpg')
+               for _, data in make_qr_images(sizes['images'], seed=11)]
+    return lambda: [client.post('/api/detect_qr', data={'image': (io.BytesIO(data), name)},
+                                content_type='multipart/form-data') for data, name in uploads], len(uploads)
+
+
+CASES = [
+    Case('url_heuristics', url_heuristics, 'urls'),
+    Case('payment_heuristics', payment_heuristics, 'payloads'),
+    Case('payment_heuristics_emv', payment_heuristics_emv, 'payloads'),
+    Case('qr_decode_classify', qr_decode_classify, 'images'),
+] + [
+    Case(f'predict_url_batch_{size}', predict_url_case(size), 'urls', requires_model=True) for size in BATCH_SIZES
+] + [
+    Case('flask_detect_link', flask_detect_link, 'requests', requires_model=True),
+    Case('flask_detect_links', flask_detect_links, 'urls', requires_model=True),
+    Case('flask_detect_qr', flask_detect_qr, 'requests', requires_model=True),
+]
+
+SIZES = {'urls': 20000, 'payments': 20000, 'images': 200, 'model_urls': 512, 'requests': 256}
+QUICK_SIZES = {'urls': 2000, 'payments': 2000, 'images': 24, 'model_urls': 64, 'requests': 32}
+
+
+def measure(case, sizes, repeats):
+    run, items = case.setup(sizes)
+    rounds = []
+    # The service logs every QR scan with print(); keep that out of the report
+    with redirect_stdout(io.StringIO()):
+        run()  # warmup: imports, regex/trie compilation, allocator, model kernels
+        for _ in range(repeats):
+            start = time.perf_counter()
+            run()
+            rounds.append(time.perf_counter() - start)
+    median = statistics.median(rounds)
+    return {
+        "unit": case.unit,
+        "items": items,
+        "rounds": repeats,
+        "median_seconds": round(median, 6),
+        "min_seconds": round(min(rounds), 6),
+        "max_seconds": round(max(rounds), 6),
+        "per_second": round(items / median, 2),
+        "ms_per_item": round(median * 1000 / items, 4),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "inference_backend": app.INFERENCE_BACKEND,
+        "decision_mode": app.DECISION_MODE,
+        "micro_batching": app.MICRO_BATCHING,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns: (rows, regressions); a case regresses when its throughput drops by more than threshold
+    """
+    rows = []
+    regressions = []
+    for name in sorted(set(results) | set(baseline)):
+        current = results.get(name, {}).get("per_second")
+        previous = baseline.get(name, {}).get("per_second")
+        if current is None or previous is None:
+            status = "new" if previous is None else "missing"
+            change = None
+        else:
+            change = current / previous - 1
+            if change < -threshold:
+                status = "REGRESSION"
+                regressions.append(name)
+            elif change > threshold:
+                status = "faster"
+            else:
+                status = "ok"
+        rows.append((name, previous, current, change, status))
+    return rows, regressions
+
+
+def print_comparison(rows):
+    print(f"\n{'case':<26}{'baseline/s':>14}{'current/s':>14}{'change':>9}  status")
+    for name, previous, current, change, status in rows:
+        prev_text = f"{previous:,.1f}" if previous is not None else "-"
+        curr_text = f"{current:,.1f}" if current is not None else "-"
+        change_text = f"{change:+.1%}" if change is not None else "-"
+        print(f"{name:<26}{prev_text:>14}{curr_text:>14}{change_text:>9}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-o", "--output", help="write results JSON here")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed fractional throughput drop before a case counts as a regression")
+    parser.add_argument("--only", nargs="+", metavar="CASE", help="run only these cases")
+    parser.add_argument("--repeats", type=int, default=5, help="timed rounds per case (median is reported)")
+    parser.add_argument("--quick", action="store_true", help="small corpora for a smoke run")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for case in CASES:
+            print(f"{case.name}{'  [model]' if case.requires_model else ''}")
+        return
+
+    unknown = set(args.only or ()) - {case.name for case in CASES}
+    if unknown:
+        raise SystemExit(f"Unknown cases: {', '.join(sorted(unknown))}")
+
+    # Measure the code paths, not the verdict and QR result caches (timed rounds repeat the same inputs)
+    app.verdict_cache.max_size = 0
+    app.qr_result_cache.max_size = 0
+    model_ready = app.model_unavailable() is None
+    sizes = QUICK_SIZES if args.quick else SIZES
+
+    results = {}
+    skipped = []
+    for case in CASES:
+        if args.only and case.name not in args.only:
+            continue
+        if case.requires_model and not model_ready:
+            skipped.append(case.name)
+            continue
+        result = measure(case, sizes, args.repeats)
+        results[case.name] = result
+        print(f"{case.name:<26}{result['per_second']:>12,.1f} {case.unit}/s  "
+              f"{result['ms_per_item']:>9.3f} ms/{case.unit.rstrip('s')}", flush=True)
+    if skipped:
+        print(f"skipped (model not loaded): {', '.join(skipped)}")
+
+    report = {
+        "schema": SCHEMA_VERSION,
+        "environment": environment(),
+        "sizes": sizes,
+        "results": results,
+        "skipped": skipped,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("sizes") != sizes:
+            print("warning: baseline was recorded with different corpus sizes", file=sys.stderr)
+        rows, regressions = compare(results, baseline.get("results", {}), args.threshold)
+        print_comparison(rows)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Streaming bulk URL scanner (NDJSON or plain URL lines in, NDJSON verdicts out).
+
+Input lines are either a bare URL or a JSON object with a "url" key (any "id"
+is echoed back). Each output record carries the 0-based input line "offset",
+so an interrupted job can continue from the last offset written.
+
+Usage (from ml-service/):
+    python bulk_scan.py urls.txt -o verdicts.ndjson
+    python bulk_scan.py urls.txt -o verdicts.ndjson --resume
+    cat urls.ndjson | python bulk_scan.py - > verdicts.ndjson
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+DEFAULT_BATCH_SIZE = 64
+# Batches parsed ahead of the model; bounds memory regardless of input size
+PREFETCH_BATCHES = 4
+
+
+def parse_line(line):
+    """
+    Returns: (url, record_id, error); all None for a blank line
+    """
+    if isinstance(line, bytes):
+        line = line.decode('utf-8', errors='replace')
+    line = line.strip()
+    if not line:
+        return None, None, None
+    if line.startswith('{'):
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            return None, None, f"Invalid JSON: {e}"
+        url = data.get('url') if isinstance(data, dict) else None
+        if not isinstance(url, str) or not url:
+            return None, data.get('id') if isinstance(data, dict) else None, "URL is required"
+        return url, data.get('id'), None
+    return line, None, None
+
+
+class BulkScanner:
+    """
+    Pipelined scanner: a reader thread parses lines and runs the pre-model tiers
+    (domain lists, heuristics) while the caller's thread runs batched model
+    inference on the previous batch.
+    screen(url) returns (result, heuristics); result is None when the model must decide.
+    """
+
+    def __init__(self, screen, classify_urls, build_result, batch_size=DEFAULT_BATCH_SIZE):
+        self.screen = screen
+        self.classify_urls = classify_urls
+        self.build_result = build_result
+        self.batch_size = max(1, batch_size)
+        self.processed = 0
+        self.errors = 0
+        self.last_offset = None
+        self.started = None
+
+    def _read_batches(self, lines, start_offset, batches, stop):
+        try:
+            batch = []
+            for offset, line in enumerate(lines):
+                if stop.is_set():
+                    return
+                if offset < start_offset:
+                    continue
+                url, record_id, error = parse_line(line)
+                if url is None and error is None:
+                    # Blank lines keep their offset but produce no record
+                    continue
+                decided, heuristics = self.screen(url) if error is None else (None, None)
+                batch.append((offset, url, record_id, error, decided, heuristics))
+                if len(batch) >= self.batch_size:
+                    batches.put(batch)
+                    batch = []
+            if batch:
+                batches.put(batch)
+            batches.put(None)
+        except Exception as e:
+            batches.put(e)
+
+    def scan(self, lines, start_offset=0):
+        """
+        Yield one verdict record per input line at or after start_offset, in input order
+        """
+        self.started = time.perf_counter()
+        batches = queue.Queue(maxsize=PREFETCH_BATCHES)
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read_batches, args=(lines, start_offset, batches, stop),
+                                  name="bulk-scan-reader", daemon=True)
+        reader.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                if isinstance(batch, Exception):
+                    raise batch
+                yield from self._scan_batch(batch)
+        finally:
+            # Unblock the reader if the consumer stopped early (client disconnect)
+            stop.set()
+            while reader.is_alive():
+                try:
+                    batches.get_nowait()
+                except queue.Empty:
+                    reader.join(0.1)
+
+    def _scan_batch(self, batch):
+        valid = [entry for entry in batch if entry[3] is None and entry[4] is None]
+        try:
+            predictions = iter(self.classify_urls([entry[1] for entry in valid])) if valid else iter(())
+            batch_error = None
+        except Exception as e:
+            predictions = iter(())
+            batch_error = f"Prediction failed: {str(e)}"
+
+        for offset, url, record_id, error, decided, heuristics in batch:
+            if decided is not None:
+                record = decided
+            elif error is None and batch_error is None:
+                prediction, ml_confidence = next(predictions)
+                record = self.build_result(url, heuristics, prediction, ml_confidence)
+            else:
+                record = {"url": url, "error": error or batch_error}
+                self.errors += 1
+            record["offset"] = offset
+            if record_id is not None:
+                record["id"] = record_id
+            self.processed += 1
+            self.last_offset = offset
+            yield record
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started if self.started else 0
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "last_offset": self.last_offset,
+            "elapsed_seconds": round(elapsed, 3),
+            "urls_per_second": round(self.processed / elapsed, 1) if elapsed else 0.0
+        }
+
+
+def last_offset_in(path, tail_bytes=1 << 20):
+    """
+    Returns: offset of the last complete record in an existing output file, or None
+    Records are written in offset order, so only the tail of the file is read.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - tail_bytes))
+        lines = f.read().splitlines()
+    for line in reversed(lines):
+        try:
+            offset = json.loads(line).get('offset')
+        except (ValueError, AttributeError):
+            # A partially written final line from an interrupted run
+            continue
+        if isinstance(offset, int):
+            return offset
+    return None
+
+
+def ensure_trailing_newline(path):
+    # Keep a truncated final line from an interrupted run from merging with new output
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+
+def resume_offset(path, start_offset=0):
+    """
+    Returns: the input offset to continue from after the records already in the output file at path
+    """
+    ensure_trailing_newline(path)
+    last = last_offset_in(path)
+    return start_offset if last is None else max(start_offset, last + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="input file of URLs or NDJSON ('-' for stdin)")
+    parser.add_argument('-o', '--output', help="output NDJSON file (default stdout)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--offset', type=int, default=0, help="skip input lines before this offset")
+    parser.add_argument('--resume', action='store_true', help="continue after the last offset in --output")
+    parser.add_argument('--progress-every', type=float, default=5.0, help="seconds between progress reports")
+    args = parser.parse_args()
+
+    import app
+
+    unavailable = app.model_unavailable()
+    if unavailable:
+        raise SystemExit(unavailable[0]["error"])
+
+    start_offset = args.offset
+    if args.resume:
+        if not args.output:
+            raise SystemExit("--resume requires --output")
+        start_offset = resume_offset(args.output, start_offset)
+        print(f"Resuming at offset {start_offset}", file=sys.stderr)
+
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    sink = open(args.output, 'a' if args.resume else 'w') if args.output else sys.stdout
+    scanner = BulkScanner(app.screen_url, app.classify_urls, app.build_url_result, args.batch_size)
+    last_report = time.perf_counter()
+
+    try:
+        for record in scanner.scan(source, start_offset):
+            sink.write(json.dumps(record) + '\n')
+            if time.perf_counter() - last_report >= args.progress_every:
+                sink.flush()
+                print(json.dumps({"progress": scanner.progress()}), file=sys.stderr)
+                last_report = time.perf_counter()
+    finally:
+        sink.flush()
+        print(json.dumps({"summary": scanner.progress()}), file=sys.stderr)
+        if source is not sys.stdin.buffer:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+
+
+if __name__ == '__main__':
+    main()
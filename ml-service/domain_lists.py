@@ -0,0 +1,66 @@
+import ipaddress
+import os
+
+# Second-level public suffixes common in the traffic we see; a small stand-in for the
+# Public Suffix List so that shop.example.co.in groups under example.co.in, not co.in
+MULTI_LABEL_SUFFIXES = frozenset({
+    'co.in', 'net.in', 'org.in', 'firm.in', 'gen.in', 'ind.in', 'gov.in', 'ac.in', 'edu.in', 'nic.in',
+    'co.uk', 'org.uk', 'me.uk', 'ac.uk', 'gov.uk', 'com.au', 'net.au', 'org.au', 'co.nz', 'co.za',
+    'co.jp', 'com.br', 'com.cn', 'com.sg', 'com.my', 'com.pk', 'com.bd', 'com.np', 'com.lk', 'com.mx',
+    'com.tr', 'com.hk', 'com.tw',
+})
+
+
+def registered_domain(host):
+    """
+    Returns: the registrable domain of host (example.co.in for a.b.example.co.in),
+    the host itself for IP addresses, or None
+    """
+    if not host:
+        return None
+    host = host.lower().rstrip('.')
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    labels = host.split('.')
+    if len(labels) > 2 and '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+class DomainList:
+    """
+    Set of registered domains loaded from a text file (one domain per line, # comments)
+    A host matches if it or any parent domain is listed, so example.com covers www.example.com.
+    """
+
+    def __init__(self, domains=()):
+        self.domains = frozenset(self._normalize(domain) for domain in domains if self._normalize(domain))
+
+    @staticmethod
+    def _normalize(domain):
+        return domain.split('#', 1)[0].strip().lower().rstrip('.')
+
+    @classmethod
+    def from_file(cls, path):
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, encoding='utf-8') as f:
+            return cls(f)
+
+    def __len__(self):
+        return len(self.domains)
+
+    def __contains__(self, host):
+        if not self.domains or not host:
+            return False
+        host = host.lower().rstrip('.')
+        while True:
+            if host in self.domains:
+                return True
+            dot = host.find('.')
+            if dot < 0:
+                return False
+            host = host[dot + 1:]
@@ -0,0 +1,167 @@
+"""
+Bounded execution layer for CPU-heavy work (EXECUTION_MODE=pool).
+
+QR decoding runs in a process pool so pyzbar/OpenCV never hold the request
+process's GIL, and model calls run on a separately sized thread pool. Each
+executor admits at most workers + queue_size jobs; beyond that run() fails
+fast with ExecutorBusy so the API can answer 503 instead of queueing without
+bound. Callers wait at most `timeout` seconds for a result. A process pool
+job that overruns it is killed together with its pool, so hung decodes cannot
+pin workers and slots for good.
+"""
+import asyncio
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+
+class ExecutorBusy(Exception):
+    """
+    Raised when an executor's queue is full
+    """
+
+
+class JobTimeout(Exception):
+    """
+    Raised when a job does not finish within the executor's timeout
+    """
+
+
+class BoundedExecutor:
+    def __init__(self, name, max_workers, queue_size, timeout, processes=False):
+        self.name = name
+        self.max_workers = max(1, int(max_workers))
+        self.capacity = self.max_workers + max(0, int(queue_size))
+        self.timeout = timeout
+        self.processes = processes
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._executor = None
+        # Pool each job was submitted to, and pools killed after a timeout
+        self._pools = weakref.WeakKeyDictionary()
+        self._killed = weakref.WeakSet()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.recycled = 0
+
+    def _get_executor(self):
+        # Created on first use so each forked server worker gets its own pool
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.processes:
+                        # spawn: pool processes must not inherit the model or the server's threads
+                        self._executor = ProcessPoolExecutor(
+                            self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+                    else:
+                        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def submit(self, func, *args):
+        """
+        Admit and start func(*args) without waiting for it
+        Returns: concurrent.futures.Future
+        Raises: ExecutorBusy if the queue is full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorBusy(f"Server busy ({self.name} queue full), retry shortly")
+        try:
+            executor = self._get_executor()
+            future = executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.pending += 1
+            self._pools[future] = executor
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, func, *args):
+        """
+        Run func(*args) on the executor and wait for its result
+        Raises: ExecutorBusy if the queue is full, JobTimeout if the result takes longer than timeout
+        A timed-out thread pool job keeps its slot until it actually finishes, so a backlog of
+        slow jobs keeps rejecting new ones; a timed-out process pool job is killed (see timed_out).
+        """
+        future = self.submit(func, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out(future)
+        except BrokenProcessPool:
+            self.reset_broken(future)
+            raise
+
+    async def run_async(self, func, *args):
+        """
+        Coroutine version of run() for the ASGI server
+        """
+        future = self.submit(func, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out(future)
+        except BrokenProcessPool:
+            self.reset_broken(future)
+            raise
+
+    def timed_out(self, future):
+        with self._lock:
+            self.timeouts += 1
+        if not future.cancel() and not future.done() and self.processes:
+            # A running job cannot be cancelled and would hold its worker and slot until it
+            # returns, possibly never. Kill its pool instead; the pool's other jobs fail with
+            # BrokenProcessPool, which frees their slots, and the next job starts a fresh pool.
+            self.recycle(self._pools.get(future), kill=True)
+        raise JobTimeout(f"{self.name} job timed out after {self.timeout}s")
+
+    def reset_broken(self, future):
+        pool = self._pools.get(future)
+        if pool in self._killed:
+            # Lost to another job's timeout rather than its own fault
+            raise ExecutorBusy(f"Server busy ({self.name} pool restarted), retry shortly")
+        # A pool process died (e.g. crashed in a native decoder); start a fresh pool next time
+        self.recycle(pool)
+
+    def recycle(self, pool, kill=False):
+        """
+        Stop using pool (if it is still the current one); kill=True also kills its processes
+        """
+        with self._lock:
+            if pool is None or pool is not self._executor:
+                return
+            self._executor = None
+            self.recycled += 1
+            if kill:
+                self._killed.add(pool)
+        # ProcessPoolExecutor has no public way to stop running jobs before Python 3.14
+        processes = list((getattr(pool, '_processes', None) or {}).values()) if kill else []
+        for process in processes:
+            process.kill()
+        pool.shutdown(wait=False, cancel_futures=kill)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "capacity": self.capacity,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "recycled": self.recycled,
+            }
@@ -0,0 +1,303 @@
+"""
+Columnar store of decomposed rule features and raw model logits, for re-scoring
+historic scans under new weights, limits or thresholds without re-parsing a
+URL or re-running the model.
+
+A feature file is a NumPy .npz archive with one array per feature column
+(URL_COLUMNS or PAYMENT_COLUMNS), the model logits (NaN rows where the model
+did not run), and the URLs or QR payloads as UTF-8 bytes plus offsets, so no
+pickled objects are involved. Re-scoring a column set is a few vectorized
+comparisons and multiply-adds per rule.
+
+Features depend on the keyword, TLD, shortener, provider and app lists of the
+rule file used for extraction (its version is kept in the file's metadata).
+Changing a weight, limit, amount tier or threshold only needs `rescore`;
+changing a list needs a new `extract`.
+
+Usage (from ml-service/):
+    python feature_store.py extract urls.txt -o features.npz
+    python feature_store.py extract payloads.txt -o payments.npz --kind payment
+    python feature_store.py rescore features.npz --rules rules/heuristics.new.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from heuristic_rules import DEFAULT_RULES_FILE, CompiledRules
+
+# Keys of app.url_features / app.payment_features
+URL_COLUMNS = (
+    'keywords', 'ip_address', 'subdomains', 'domain_length', 'suspicious_tld', 'url_shortener', 'hyphens',
+    'no_https', 'at_symbol', 'homoglyph', 'nonstandard_port'
+)
+PAYMENT_COLUMNS = (
+    'keywords', 'personal_provider', 'phone_vpa', 'amount', 'urgent_note', 'missing_merchant_code',
+    'payment_apps', 'checksum_mismatch'
+)
+COLUMNS = {'url': URL_COLUMNS, 'payment': PAYMENT_COLUMNS}
+FLOAT_COLUMNS = frozenset({'amount'})
+
+
+class FeatureWriter:
+    """
+    Accumulates feature rows column by column in typed arrays (4-8 bytes per value)
+    num_labels: logits per row; 0 when features are extracted without the model
+    """
+
+    def __init__(self, kind='url', num_labels=0):
+        self.kind = kind
+        self.num_labels = num_labels
+        self.columns = {name: array('d' if name in FLOAT_COLUMNS else 'i') for name in COLUMNS[kind]}
+        self.logits = array('f')
+        self.keys = bytearray()
+        self.key_offsets = array('q', [0])
+
+    def __len__(self):
+        return len(self.key_offsets) - 1
+
+    def add(self, key, features, logits=None):
+        for name, column in self.columns.items():
+            value = features[name]
+            column.append(float('nan') if value is None else value)
+        if self.num_labels:
+            self.logits.extend([float('nan')] * self.num_labels if logits is None else logits)
+        self.keys += key.encode('utf-8', errors='replace')
+        self.key_offsets.append(len(self.keys))
+
+    def save(self, path, **meta):
+        # The typed arrays expose their buffers, so these are views rather than per-value conversions
+        arrays = {name: np.asarray(column) for name, column in self.columns.items()}
+        meta = dict(meta, kind=self.kind, rows=len(self))
+        np.savez(
+            path,
+            logits=np.asarray(self.logits).reshape(len(self), self.num_labels),
+            keys=np.asarray(self.keys),
+            key_offsets=np.asarray(self.key_offsets),
+            meta=np.array(json.dumps(meta)),
+            **arrays
+        )
+
+
+class FeatureTable:
+    """
+    A feature file loaded into memory
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.meta = json.loads(str(data['meta']))
+            self.kind = self.meta['kind']
+            self.columns = {name: data[name] for name in COLUMNS[self.kind]}
+            self.logits = data['logits']
+            self._keys = data['keys']
+            self._key_offsets = data['key_offsets']
+
+    def __len__(self):
+        return len(self._key_offsets) - 1
+
+    def key(self, i):
+        """
+        Returns: the URL or payload of row i
+        """
+        return self._keys[self._key_offsets[i]:self._key_offsets[i + 1]].tobytes().decode('utf-8')
+
+
+def score_urls(columns, rules):
+    """
+    Vectorized app.score_url_features
+    Returns: int (or float, with fractional weights) array of risk scores
+    """
+    weights = rules.url_weights
+    limits = rules.url_limits
+    return (
+        weights['keyword'] * columns['keywords']
+        + weights['ip_address'] * columns['ip_address']
+        + weights['excessive_subdomains'] * (columns['subdomains'] > limits['max_subdomains'])
+        + weights['long_domain'] * (columns['domain_length'] > limits['max_domain_length'])
+        + weights['suspicious_tld'] * columns['suspicious_tld']
+        + weights['url_shortener'] * columns['url_shortener']
+        + weights['excessive_hyphens'] * (columns['hyphens'] > limits['max_hyphens'])
+        + weights['no_https'] * columns['no_https']
+        + weights['at_symbol'] * columns['at_symbol']
+        + weights['homoglyph'] * columns['homoglyph']
+        + weights['nonstandard_port'] * columns['nonstandard_port']
+    )
+
+
+def score_payments(columns, rules):
+    """
+    Vectorized app.score_payment_features
+    Returns: int (or float, with fractional weights) array of risk scores
+    """
+    weights = rules.payment_weights
+    amount = columns['amount']
+    tier_score = np.zeros(len(amount), dtype=np.int32)
+    # Lowest tier first, so a higher tier the amount also exceeds overwrites it (NaN exceeds none)
+    for threshold, score, _ in reversed(rules.amount_tiers):
+        tier_score = np.where(amount > threshold, score, tier_score)
+    return (
+        weights['keyword'] * columns['keywords']
+        + weights['personal_provider'] * columns['personal_provider']
+        + weights['phone_vpa'] * columns['phone_vpa']
+        + tier_score
+        + weights['urgent_note'] * columns['urgent_note']
+        + weights['missing_merchant_code'] * columns['missing_merchant_code']
+        + weights['multiple_apps'] * (columns['payment_apps'] > 1)
+        + weights['checksum_mismatch'] * columns['checksum_mismatch']
+    )
+
+
+def rescore(table, rules, decision_mode='always', safe_below=10, malicious_at=60):
+    """
+    Recompute verdicts for every row of a FeatureTable under rules
+    URL rows combine the score with the stored logits the way build_url_result and
+    tiered_verdict do; domain lists and the verdict store are not part of the features.
+    Returns: {"risk_score", "flagged", "is_fraudulent"} arrays
+    """
+    if table.kind == 'payment':
+        risk_score = score_payments(table.columns, rules)
+        flagged = risk_score >= rules.fraudulent_at
+        return {"risk_score": risk_score, "flagged": flagged, "is_fraudulent": flagged}
+
+    risk_score = score_urls(table.columns, rules)
+    flagged = risk_score >= rules.suspicious_at
+    logits = table.logits
+    if logits.shape[1]:
+        # Rows without logits (NaN) count as benign for the model
+        model_malicious = ~np.isnan(logits[:, 0]) & (np.argmax(np.nan_to_num(logits, nan=-np.inf), axis=1) != 0)
+    else:
+        model_malicious = np.zeros(len(table), dtype=bool)
+    is_fraudulent = flagged | model_malicious
+    if decision_mode == 'tiered':
+        decided = (risk_score < safe_below) | (risk_score >= malicious_at)
+        is_fraudulent = np.where(decided, risk_score >= malicious_at, is_fraudulent)
+    return {"risk_score": risk_score, "flagged": flagged, "is_fraudulent": is_fraudulent}
+
+
+def extract(source, output, kind='url', batch_size=64, with_model=True):
+    """
+    Decompose every URL (one per line, or NDJSON with a "url" key) or payment payload
+    (one per line) into rule features, with batched model logits for URLs
+    Returns: metadata written to the file
+    """
+    import app
+    from bulk_scan import parse_line
+
+    with_model = with_model and kind == 'url'
+    if with_model:
+        unavailable = app.model_unavailable()
+        if unavailable:
+            raise SystemExit(unavailable[0]["error"] + " (use --no-model for features only)")
+    rules = app.heuristic_rules.get()
+    writer = FeatureWriter(kind, num_labels=len(app.LABEL_MAP) if with_model else 0)
+    started = time.perf_counter()
+    skipped = 0
+    batch = []
+
+    def flush():
+        logits = app.run_model_logits([key for key, _ in batch])[1] if with_model else [None] * len(batch)
+        for (key, features), row in zip(batch, logits):
+            writer.add(key, features, row)
+        batch.clear()
+
+    for line in source:
+        if kind == 'url':
+            key, _, error = parse_line(line)
+            if key is None:
+                skipped += error is not None
+                continue
+        else:
+            key = line.decode('utf-8', errors='replace').rstrip('\r\n') if isinstance(line, bytes) else line.rstrip('\r\n')
+            if not key.strip():
+                continue
+        try:
+            features = (app.url_features if kind == 'url' else app.payment_features)(key, rules)[0]
+        except Exception:
+            skipped += 1
+            continue
+        batch.append((key, features))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    meta = {
+        "rules_version": rules.version,
+        "labels": [app.LABEL_MAP[i] for i in range(writer.num_labels)],
+        "skipped": skipped,
+        "created": round(time.time(), 3),
+        "extract_seconds": round(time.perf_counter() - started, 3)
+    }
+    writer.save(output, **meta)
+    return dict(meta, kind=kind, rows=len(writer))
+
+
+def summarize(verdicts):
+    return {
+        "flagged": int(verdicts["flagged"].sum()),
+        "fraudulent": int(verdicts["is_fraudulent"].sum()),
+        "mean_risk_score": round(float(verdicts["risk_score"].mean()), 3) if len(verdicts["risk_score"]) else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    extractor = subparsers.add_parser('extract', help="Decompose URLs or payment payloads into a feature file")
+    extractor.add_argument('input', help="input file ('-' for stdin)")
+    extractor.add_argument('-o', '--output', required=True, help="feature file (.npz)")
+    extractor.add_argument('--kind', choices=sorted(COLUMNS), default='url')
+    extractor.add_argument('--batch-size', type=int, default=64)
+    extractor.add_argument('--no-model', action='store_true', help="features only, without logits")
+    rescorer = subparsers.add_parser('rescore', help="Recompute verdicts from a feature file under a rule file")
+    rescorer.add_argument('features', help="feature file from extract")
+    rescorer.add_argument('--rules', default=os.environ.get('RULES_FILE') or DEFAULT_RULES_FILE)
+    rescorer.add_argument('--baseline', help="rule file to compare against (default: none)")
+    rescorer.add_argument('--decision-mode', choices=('always', 'tiered'),
+                          default=os.environ.get('DECISION_MODE', 'always').lower())
+    rescorer.add_argument('--safe-below', type=float, default=float(os.environ.get('TIER_SAFE_BELOW', 10)))
+    rescorer.add_argument('--malicious-at', type=float, default=float(os.environ.get('TIER_MALICIOUS_AT', 60)))
+    rescorer.add_argument('-o', '--output', help="write risk_score/flagged/is_fraudulent arrays to this .npz")
+    args = parser.parse_args()
+
+    if args.command == 'extract':
+        source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+        try:
+            meta = extract(source, args.output, args.kind, args.batch_size, not args.no_model)
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+        print(json.dumps(meta, indent=2))
+        return
+
+    table = FeatureTable(args.features)
+    tiers = dict(decision_mode=args.decision_mode, safe_below=args.safe_below, malicious_at=args.malicious_at)
+    rules = CompiledRules.from_file(args.rules)
+    start = time.perf_counter()
+    verdicts = rescore(table, rules, **tiers)
+    summary = {
+        "rows": len(table),
+        "kind": table.kind,
+        "extracted_with": table.meta.get("rules_version"),
+        "rules_version": rules.version,
+        "rescore_seconds": round(time.perf_counter() - start, 4),
+        **summarize(verdicts)
+    }
+    if args.baseline:
+        baseline_rules = CompiledRules.from_file(args.baseline)
+        baseline = rescore(table, baseline_rules, **tiers)
+        summary["baseline"] = dict(summarize(baseline), rules_version=baseline_rules.version)
+        summary["newly_fraudulent"] = int((verdicts["is_fraudulent"] & ~baseline["is_fraudulent"]).sum())
+        summary["no_longer_fraudulent"] = int((baseline["is_fraudulent"] & ~verdicts["is_fraudulent"]).sum())
+    if args.output:
+        np.savez(args.output, **verdicts)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
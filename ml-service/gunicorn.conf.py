@@ -0,0 +1,32 @@
+# Gunicorn settings for the ML service: gunicorn -c gunicorn.conf.py app:app
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5001)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# TORCH_THREADS=auto divides the CPUs by this
+os.environ['WEB_CONCURRENCY'] = str(workers)
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+# Load the model once in the master so forked workers share its pages copy-on-write.
+# Threads don't survive fork, so preloading always uses eager loading.
+preload_app = os.environ.get('PRELOAD_MODEL', 'True').lower() == 'true'
+if preload_app:
+    os.environ['MODEL_LOAD_MODE'] = 'eager'
+    # Warmup would start torch's intra-op thread pool in the master, which forked children
+    # can't use; run it in each worker instead
+    if os.environ.get('MODEL_WARMUP', 'True').lower() == 'true':
+        os.environ['MODEL_WARMUP'] = 'post_fork'
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach; otherwise collections in
+    # the workers touch every object header and un-share the pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app and os.environ.get('MODEL_WARMUP') == 'post_fork':
+        import app
+        app.warmup_model()
@@ -0,0 +1,257 @@
+"""
+Heuristic rule sets: keyword lists, TLDs, shorteners, UPI providers and scoring
+weights, loaded from a versioned JSON file (rules/heuristics.json by default).
+
+The file is compiled once into KeywordMatchers and frozen tables (CompiledRules).
+A background thread polls the file's mtime and, when it changes, compiles the
+new version off the request path and swaps it in with a single reference
+assignment. Requests read `ruleset.get()` once and use that snapshot
+throughout, so a reload never blocks a request and a request never sees half
+of two versions. A file that fails to parse or validate is reported in
+stats() and the previous version stays active.
+
+Validate a rule file before shipping it (from ml-service/):
+    python heuristic_rules.py rules/heuristics.json
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+from matchers import KeywordMatcher
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rules', 'heuristics.json')
+
+URL_LIMITS = ('max_subdomains', 'max_domain_length', 'max_hyphens')
+URL_WEIGHTS = (
+    'keyword', 'ip_address', 'excessive_subdomains', 'long_domain', 'suspicious_tld', 'url_shortener',
+    'excessive_hyphens', 'no_https', 'at_symbol', 'homoglyph', 'nonstandard_port'
+)
+PAYMENT_WEIGHTS = (
+    'keyword', 'personal_provider', 'phone_vpa', 'urgent_note', 'missing_merchant_code', 'multiple_apps',
+    'checksum_mismatch'
+)
+TLD_PATTERN = re.compile(r'\.[^.\s]+')
+
+
+class RuleError(ValueError):
+    pass
+
+
+def _section(spec, name):
+    section = spec.get(name)
+    if not isinstance(section, dict):
+        raise RuleError(f"missing '{name}' section")
+    return section
+
+
+def _words(section, name, prefix):
+    words = section.get(name)
+    if not isinstance(words, list) or not all(isinstance(word, str) and word for word in words):
+        raise RuleError(f"{prefix}.{name} must be a list of non-empty strings")
+    return [word.lower() for word in words]
+
+
+def _tlds(section, name, prefix):
+    tlds = _words(section, name, prefix)
+    # url_features compares the last label of the host, dot included
+    invalid = [tld for tld in tlds if not TLD_PATTERN.fullmatch(tld)]
+    if invalid:
+        raise RuleError(f"{prefix}.{name} entries must be one label with a leading dot (e.g. '.tk'): "
+                        f"{', '.join(map(repr, invalid))}")
+    return tlds
+
+
+def _numbers(section, name, keys, prefix):
+    values = section.get(name)
+    if not isinstance(values, dict):
+        raise RuleError(f"missing {prefix}.{name}")
+    missing = [key for key in keys if not isinstance(values.get(key), (int, float))]
+    if missing:
+        raise RuleError(f"{prefix}.{name} needs numbers for: {', '.join(missing)}")
+    return {key: values[key] for key in keys}
+
+
+def _number(section, name, prefix):
+    value = section.get(name)
+    if not isinstance(value, (int, float)):
+        raise RuleError(f"{prefix}.{name} must be a number")
+    return value
+
+
+class CompiledRules:
+    """
+    One immutable, compiled version of the rule file
+    Built from the parsed JSON; raises RuleError if a section, list or weight is missing.
+    """
+
+    def __init__(self, spec, path=None, digest=None):
+        if not isinstance(spec, dict) or not isinstance(spec.get('version'), str) or not spec['version']:
+            raise RuleError("rule file needs a non-empty 'version' string")
+        self.version = spec['version']
+        self.path = path
+        self.digest = digest
+
+        url = _section(spec, 'url')
+        self.url_weights = _numbers(url, 'weights', URL_WEIGHTS, 'url')
+        self.url_limits = _numbers(url, 'limits', URL_LIMITS, 'url')
+        self.suspicious_at = _number(url, 'suspicious_at', 'url')
+        self.keyword_matcher = KeywordMatcher(_words(url, 'suspicious_keywords', 'url'))
+        self.suspicious_tlds = frozenset(_tlds(url, 'suspicious_tlds', 'url'))
+        self.shortener_matcher = KeywordMatcher(_words(url, 'url_shorteners', 'url'))
+        homoglyphs = _words(url, 'homoglyph_chars', 'url')
+        self.homoglyph_pattern = re.compile('[' + ''.join(map(re.escape, homoglyphs)) + ']') if homoglyphs else None
+
+        payment = _section(spec, 'payment')
+        self.payment_weights = _numbers(payment, 'weights', PAYMENT_WEIGHTS, 'payment')
+        self.fraudulent_at = _number(payment, 'fraudulent_at', 'payment')
+        self.payment_pattern_matcher = KeywordMatcher(_words(payment, 'patterns', 'payment'))
+        self.payment_keyword_matcher = KeywordMatcher(_words(payment, 'keywords', 'payment'))
+        self.personal_provider_matcher = KeywordMatcher(_words(payment, 'personal_providers', 'payment'))
+        self.urgent_word_matcher = KeywordMatcher(_words(payment, 'urgent_words', 'payment'))
+        self.payment_app_matcher = KeywordMatcher(_words(payment, 'payment_apps', 'payment'))
+        tiers = payment.get('amount_tiers')
+        if not isinstance(tiers, list) or not all(
+            isinstance(tier, list) and len(tier) == 3 and isinstance(tier[0], (int, float))
+            and isinstance(tier[1], (int, float)) and isinstance(tier[2], str) for tier in tiers
+        ):
+            raise RuleError("payment.amount_tiers must be a list of [threshold, score, label]")
+        # (exclusive lower bound in rupees, score, label), highest tier first
+        self.amount_tiers = tuple(sorted((tuple(tier) for tier in tiers), key=lambda tier: -tier[0]))
+
+    @property
+    def tag(self):
+        """
+        Identifies the exact rules a verdict was scored with; the digest also catches edits without a version bump
+        """
+        return f"{self.version}+{self.digest}" if self.digest else self.version
+
+    def amount_tier(self, amount):
+        """
+        Returns: (score, label) for the highest tier the amount exceeds, or None
+        """
+        for threshold, score, label in self.amount_tiers:
+            if amount > threshold:
+                return score, label
+        return None
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            spec = json.loads(data)
+        except ValueError as e:
+            raise RuleError(f"invalid JSON: {e}") from None
+        return cls(spec, path, hashlib.sha256(data).hexdigest()[:12])
+
+
+class RuleSet:
+    """
+    Current CompiledRules for a rule file, reloaded in the background when the file changes
+    The watcher thread starts on first use in each process, so forked server workers each
+    get their own. reload_interval=0 disables it (reload() can still be called directly).
+    """
+
+    def __init__(self, path=DEFAULT_RULES_FILE, reload_interval=5.0, on_reload=None):
+        self.path = path
+        self.reload_interval = max(0.0, float(reload_interval))
+        self.on_reload = on_reload
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+        # Fail fast at startup: the service should not run without its rules
+        self._signature = self._stat()
+        self.current, self.compile_ms = self._compile()
+        self.loaded_at = time.time()
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _compile(self):
+        start = time.perf_counter()
+        rules = CompiledRules.from_file(self.path)
+        return rules, round((time.perf_counter() - start) * 1000, 2)
+
+    def get(self):
+        """
+        Returns: the current CompiledRules; read it once per check and use that snapshot
+        """
+        if self._watcher_pid != os.getpid() and self.reload_interval:
+            self._ensure_watcher()
+        return self.current
+
+    def _ensure_watcher(self):
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            threading.Thread(target=self._watch, name="rule-reloader", daemon=True).start()
+            self._watcher_pid = os.getpid()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_interval)
+            self.reload()
+
+    def reload(self, force=False):
+        """
+        Recompile the rule file if it changed since the last check (or always, with force)
+        Returns: True if a new version was swapped in
+        """
+        with self._lock:
+            try:
+                signature = self._stat()
+                if signature == self._signature and not force:
+                    return False
+                # Remember the signature even on failure so a broken file is reported once, not every poll
+                self._signature = signature
+                rules, compile_ms = self._compile()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"Rule reload failed, keeping version {self.current.version}: {e}")
+                return False
+            if rules.digest == self.current.digest and not force:
+                return False
+            previous = self.current.version
+            self.current, self.compile_ms = rules, compile_ms
+            self.loaded_at = time.time()
+            self.reloads += 1
+            self.last_error = None
+        print(f"Rules reloaded: version {previous} -> {rules.version} ({compile_ms} ms)")
+        if self.on_reload is not None:
+            self.on_reload(rules)
+        return True
+
+    def stats(self):
+        rules = self.current
+        return {
+            "version": rules.version,
+            "path": self.path,
+            "digest": rules.digest,
+            "compile_ms": self.compile_ms,
+            "loaded_at": round(self.loaded_at, 3),
+            "reload_interval": self.reload_interval,
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error
+        }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_RULES_FILE
+    try:
+        ruleset = RuleSet(path, reload_interval=0)
+    except (OSError, RuleError) as e:
+        raise SystemExit(f"{path}: {e}")
+    print(json.dumps(ruleset.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+import struct
+
+# JPEG start-of-frame markers carrying the image dimensions (excludes DHT, JPG and DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def probe_image(data):
+    """
+    Read format and dimensions from an image header without decoding pixels
+    Returns: (format, width, height) or None if the header isn't recognized
+    format: 'png', 'jpeg' or 'gif'
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        # IHDR is always the first chunk: length(4) type(4) width(4) height(4)
+        if len(data) >= 24 and data[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', data[16:24])
+            return 'png', width, height
+        return None
+
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        if len(data) >= 10:
+            width, height = struct.unpack('<HH', data[6:10])
+            return 'gif', width, height
+        return None
+
+    if data[:2] == b'\xff\xd8':
+        return _probe_jpeg(data)
+
+    return None
+
+
+def _probe_jpeg(data):
+    # Walk the marker segments until a start-of-frame header
+    i = 2
+    size = len(data)
+    while i + 4 <= size:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:
+            # Markers without a length field
+            i += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image / start of scan before any frame header
+            return None
+        segment_length = struct.unpack('>H', data[i + 2:i + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > size:
+                return None
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return 'jpeg', width, height
+        i += 2 + segment_length
+    return None
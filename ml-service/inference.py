@@ -0,0 +1,258 @@
+"""
+Inference backends for the malicious-URL model.
+
+Backends (selected with INFERENCE_BACKEND):
+    torch       - fp32 PyTorch model (default)
+    torch-int8  - PyTorch with dynamic int8 quantization of Linear layers
+    onnx        - ONNX Runtime session over an exported model
+
+Export the ONNX model once before using the onnx backend:
+    python inference.py export --output models/url-model.onnx
+
+Thread settings (TORCH_THREADS, TORCH_INTEROP_THREADS, MODEL_CONCURRENCY) apply
+to every backend; see thread_settings().
+"""
+import argparse
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from metrics import timed
+
+MODEL_NAME = "r3ddkahili/final-complete-malicious-url-model"
+MAX_LENGTH = 128
+DEFAULT_ONNX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'url-model.onnx')
+# URLs of different lengths so warmup covers several padded sequence lengths
+WARMUP_URLS = [
+    "https://example.com",
+    "http://192.168.4.20/banking/update.php?session=8f3a2c",
+    "https://accounts.example.org/signin/v2/identifier?continue=https%3A%2F%2Fmail.example.org%2Fmail%2F&flowName=GlifWebSignIn",
+]
+
+
+def available_cpus():
+    """
+    CPUs this process may use: the affinity mask, capped by a cgroup v2 CPU quota (containers)
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def thread_settings():
+    """
+    Resolve the inference thread configuration from the environment
+    TORCH_THREADS: intra-op threads per forward pass, or 'auto' to split the CPUs evenly
+    across WEB_CONCURRENCY server workers x MODEL_CONCURRENCY concurrent forward passes
+    TORCH_INTEROP_THREADS: inter-op threads ('auto' = 1; eager BERT-style models don't use them)
+    Returns: {"intra_op", "inter_op", "concurrency", "mode", "cpus", "workers"}
+    """
+    cpus = available_cpus()
+    workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    concurrency = max(1, int(os.environ.get('MODEL_CONCURRENCY', 1)))
+    intra = os.environ.get('TORCH_THREADS', 'auto').lower()
+    inter = os.environ.get('TORCH_INTEROP_THREADS', 'auto').lower()
+    return {
+        "intra_op": max(1, cpus // (workers * concurrency)) if intra == 'auto' else int(intra),
+        "inter_op": 1 if inter == 'auto' else int(inter),
+        "concurrency": concurrency,
+        "mode": 'auto' if intra == 'auto' else 'fixed',
+        "cpus": cpus,
+        "workers": workers,
+    }
+
+
+def configure_torch_threads(settings):
+    torch.set_num_threads(settings["intra_op"])
+    try:
+        torch.set_num_interop_threads(settings["inter_op"])
+    except RuntimeError:
+        # Only settable before the first inter-op parallel work in this process
+        pass
+
+
+def predictions_from_logits(logits):
+    """
+    Softmax/argmax over a logits tensor
+    Returns: list of (prediction, confidence) tuples
+    """
+    probabilities = torch.softmax(logits, dim=1)
+    predictions = torch.argmax(probabilities, dim=1)
+    confidences = probabilities.gather(1, predictions.unsqueeze(1)).squeeze(1)
+    return list(zip(predictions.tolist(), confidences.tolist()))
+
+
+class TorchBackend:
+    """
+    fp32 PyTorch inference
+    """
+    name = 'torch'
+
+    def __init__(self, model_name, threads=None):
+        self.threads = threads or thread_settings()
+        configure_torch_threads(self.threads)
+        # Each concurrent forward pass brings its own team of intra-op threads; cap how many run at once
+        self.forward_slots = threading.BoundedSemaphore(self.threads["concurrency"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+
+    def tokenize(self, urls, return_tensors='pt'):
+        with timed('tokenize'):
+            return self.tokenizer(urls, return_tensors=return_tensors, truncation=True, padding=True, max_length=MAX_LENGTH)
+
+    def logits(self, urls):
+        """
+        Returns: float32 numpy array of shape (len(urls), num_labels)
+        """
+        inputs = self.tokenize(urls)
+        with self.forward_slots, torch.inference_mode(), timed('model_forward'):
+            return self.model(**inputs).logits.numpy()
+
+    def predict(self, urls):
+        """
+        Returns: list of (prediction, confidence) tuples in input order
+        """
+        inputs = self.tokenize(urls)
+        with self.forward_slots, torch.inference_mode():
+            with timed('model_forward'):
+                logits = self.model(**inputs).logits
+            return predictions_from_logits(logits)
+
+    def predict_with_logits(self, urls):
+        """
+        predict() that also keeps the raw scores, for audits
+        Returns: (list of (prediction, confidence) tuples, float32 logits array) in input order
+        """
+        logits = self.logits(urls)
+        return predictions_from_logits(torch.from_numpy(logits)), logits
+
+    def warmup(self, batch_sizes=(1, 8, 32)):
+        """
+        Run throwaway forward passes so the first real request doesn't pay for lazy
+        initialization (thread pools, allocator growth, kernel selection)
+        Returns: seconds spent
+        """
+        start = time.perf_counter()
+        for batch_size in batch_sizes:
+            self.predict([WARMUP_URLS[i % len(WARMUP_URLS)] for i in range(batch_size)])
+        return time.perf_counter() - start
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    PyTorch inference with Linear layers dynamically quantized to int8
+    """
+    name = 'torch-int8'
+
+    def __init__(self, model_name, threads=None):
+        super().__init__(model_name, threads)
+        self.model = torch.ao.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(TorchBackend):
+    """
+    ONNX Runtime inference over a model exported with `python inference.py export`
+    """
+    name = 'onnx'
+
+    def __init__(self, model_name, onnx_path=None, threads=None):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("onnx backend requires onnxruntime (pip install onnxruntime)")
+
+        onnx_path = onnx_path or os.environ.get('ONNX_MODEL_PATH', DEFAULT_ONNX_PATH)
+        if not os.path.exists(onnx_path):
+            raise RuntimeError(f"ONNX model not found at {onnx_path}; run `python inference.py export` first")
+
+        self.threads = threads or thread_settings()
+        self.forward_slots = threading.BoundedSemaphore(self.threads["concurrency"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = self.threads["intra_op"]
+        options.inter_op_num_threads = self.threads["inter_op"]
+        self.model = onnxruntime.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [i.name for i in self.model.get_inputs()]
+
+    def logits(self, urls):
+        inputs = self.tokenize(urls, return_tensors='np')
+        feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+        with self.forward_slots, timed('model_forward'):
+            return self.model.run(['logits'], feed)[0]
+
+    def predict(self, urls):
+        # Same float32 softmax/argmax as the torch path
+        return predictions_from_logits(torch.from_numpy(self.logits(urls)))
+
+
+BACKENDS = {
+    TorchBackend.name: TorchBackend,
+    QuantizedTorchBackend.name: QuantizedTorchBackend,
+    OnnxBackend.name: OnnxBackend,
+}
+
+
+def load_backend(name, model_name):
+    """
+    Instantiate the named inference backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](model_name)
+
+
+def export_onnx(model_name, output_path, opset=17):
+    """
+    Export the Hugging Face model to ONNX with dynamic batch and sequence axes
+    """
+    backend = TorchBackend(model_name)
+    sample = backend.tokenize(["https://example.com/login", "http://192.168.0.1/verify-account"])
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    torch.onnx.export(
+        backend.model,
+        tuple(sample[name] for name in input_names),
+        output_path,
+        input_names=input_names,
+        output_names=['logits'],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset
+    )
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend utilities")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    export = subparsers.add_parser('export', help="Export the model to ONNX")
+    export.add_argument('--model', default=MODEL_NAME)
+    export.add_argument('--output', default=os.environ.get('ONNX_MODEL_PATH', DEFAULT_ONNX_PATH))
+    export.add_argument('--opset', type=int, default=17)
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        path = export_onnx(args.model, args.output, args.opset)
+        print(f"Exported ONNX model to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import re
+
+# Up to this many keywords, find_all's repeated regex scans lose to plain
+# substring checks on the short strings the heuristics see
+SUBSTRING_LIMIT = 8
+
+
+def _trie_pattern(words):
+    # Factor common prefixes so the regex engine walks one branch per character
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            body = '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+
+class KeywordMatcher:
+    """
+    Precompiled substring matcher for a fixed keyword list
+    find_all(text) returns the same keywords, in the same order, as
+    [k for k in keywords if k in text], using one compiled regex scan
+    (or exactly that loop for lists of up to SUBSTRING_LIMIT keywords).
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._order = {keyword: i for i, keyword in enumerate(self.keywords)}
+        # The regex reports the longest keyword at each start position;
+        # shorter keywords that are prefixes of it match there too
+        self._prefixes = {}
+        for keyword in self.keywords:
+            prefixes = [other for other in self.keywords if other != keyword and keyword.startswith(other)]
+            if prefixes:
+                self._prefixes[keyword] = prefixes
+        self._search = re.compile(_trie_pattern(self.keywords)).search if self.keywords else None
+        self._substrings = len(self.keywords) <= SUBSTRING_LIMIT
+
+    def find_all(self, text):
+        if self._substrings:
+            return [keyword for keyword in self.keywords if keyword in text]
+        search = self._search
+        match = search(text)
+        if match is None:
+            return []
+
+        found = set()
+        prefixes = self._prefixes
+        while match:
+            keyword = match.group()
+            found.add(keyword)
+            if keyword in prefixes:
+                found.update(prefixes[keyword])
+            match = search(text, match.start() + 1)
+
+        if len(found) > 1:
+            return sorted(found, key=self._order.__getitem__)
+        return list(found)
+
+    def search(self, text):
+        """
+        Returns: True if any keyword occurs in text
+        """
+        return self._search is not None and self._search(text) is not None
@@ -0,0 +1,198 @@
+"""
+Lightweight stage timing and Prometheus text exposition.
+
+    with timed('pyzbar_decode'):
+        ...
+
+records the elapsed time into a per-stage histogram (when METRICS_ENABLED) and
+into the current request's timings (when that request asked for them). When
+both are off, timed() returns a shared no-op context manager.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+PREFIX = 'securescan'
+
+# Seconds; spans sub-millisecond heuristics up to slow image decodes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+_local = threading.local()
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Labelled histograms and counters, rendered in Prometheus text format
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._collectors = []
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, collect):
+        """
+        collect() returns [(name, type, help, {label tuple: value})] evaluated at scrape time
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        seen = set()
+        for (name, labels), histogram in histograms:
+            full = f"{PREFIX}_{name}"
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{full}_bucket{_labels(labels, le=repr(bound))} {cumulative}")
+            lines.append(f"{full}_bucket{_labels(labels, le='+Inf')} {histogram.count}")
+            lines.append(f"{full}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{full}_count{_labels(labels)} {histogram.count}")
+
+        for (name, labels), value in counters:
+            full = f"{PREFIX}_{name}"
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {full} {self._help.get(name, name)}")
+                lines.append(f"# TYPE {full} counter")
+            lines.append(f"{full}{_labels(labels)} {value}")
+
+        for collect in self._collectors:
+            for name, metric_type, help_text, samples in collect():
+                full = f"{PREFIX}_{name}"
+                lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {metric_type}")
+                for labels, value in samples.items():
+                    lines.append(f"{full}{_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+registry = Registry()
+registry.describe('stage_seconds', 'Time spent in each processing stage')
+registry.describe('request_seconds', 'HTTP request latency by endpoint')
+registry.describe('requests_total', 'HTTP requests by endpoint and status code')
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'timings', 'start')
+
+    def __init__(self, stage, timings):
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if METRICS_ENABLED:
+            registry.observe('stage_seconds', elapsed, stage=self.stage)
+        if self.timings is not None:
+            # Stages can run more than once per request (e.g. several decode attempts)
+            self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed * 1000
+        return False
+
+
+def timed(stage):
+    """
+    Context manager timing one stage; a no-op when metrics and request timings are both off
+    """
+    timings = getattr(_local, 'timings', None)
+    if not METRICS_ENABLED and timings is None:
+        return _NOOP
+    return _StageTimer(stage, timings)
+
+
+def start_request_timings():
+    """
+    Collect stage timings for the current thread's request
+    """
+    _local.timings = {}
+
+
+def collect_timings(func, *args):
+    """
+    Run func(*args) collecting its stage timings on this thread, for work done on behalf of
+    requests waiting on other threads (see add_timings)
+    Returns: (result, {stage: ms})
+    """
+    previous = getattr(_local, 'timings', None)
+    timings = _local.timings = {}
+    try:
+        return func(*args), timings
+    finally:
+        _local.timings = previous
+
+
+def add_timings(timings):
+    """
+    Merge stage timings (ms) collected on another thread into the current request's, if collecting
+    """
+    current = getattr(_local, 'timings', None)
+    if current is not None:
+        for stage, ms in timings.items():
+            current[stage] = current.get(stage, 0.0) + ms
+
+
+def finish_request_timings():
+    """
+    Stop collecting and return the collected timings (ms), or None if not collecting
+    """
+    timings = getattr(_local, 'timings', None)
+    _local.timings = None
+    if timings is None:
+        return None
+    return {stage: round(ms, 3) for stage, ms in timings.items()}
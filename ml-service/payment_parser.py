@@ -0,0 +1,111 @@
+import binascii
+from urllib.parse import unquote_plus
+
+# EMVCo merchant-presented QR (used by Bharat QR): ID(2) LEN(2) VALUE, starting with payload format "01"
+EMV_PREFIX = '000201'
+EMV_NAME = '59'
+EMV_AMOUNT = '54'
+EMV_MERCHANT_CODE = '52'
+EMV_CURRENCY = '53'
+EMV_ADDITIONAL_DATA = '62'
+EMV_PURPOSE = '08'
+EMV_CRC = '63'
+# Templates 26-51 carry payment network accounts; Bharat QR puts the UPI VPA in one of them
+EMV_ACCOUNT_TEMPLATES = {str(tag) for tag in range(26, 52)}
+
+# UPI query keys, mapped to payment_info fields
+UPI_FIELDS = {'pa': 'payee_address', 'pn': 'payee_name', 'am': 'amount', 'tn': 'note',
+              'mc': 'merchant_code', 'cu': 'currency'}
+
+
+def parse_tlv(data):
+    """
+    Returns: {tag: value} for a well-formed EMV TLV string, or None
+    """
+    fields = {}
+    i = 0
+    end = len(data)
+    while i < end:
+        tag, length = data[i:i + 2], data[i + 2:i + 4]
+        if len(length) != 2 or not (tag.isdigit() and length.isdigit()):
+            return None
+        start = i + 4
+        i = start + int(length)
+        if i > end:
+            return None
+        fields[tag] = data[start:i]
+    return fields
+
+
+def is_emv_qr(qr_data):
+    return qr_data.startswith(EMV_PREFIX) and parse_tlv(qr_data) is not None
+
+
+def emv_crc_valid(qr_data):
+    """
+    CRC-16/CCITT-FALSE over everything up to and including the CRC tag and length
+    """
+    position = qr_data.rfind(EMV_CRC + '04')
+    if position < 0 or position + 8 != len(qr_data):
+        return False
+    expected = binascii.crc_hqx(qr_data[:position + 4].encode('utf-8'), 0xFFFF)
+    return qr_data[position + 4:].upper() == f"{expected:04X}"
+
+
+def _parse_emv(qr_data, fields):
+    info = {}
+    for tag in sorted(EMV_ACCOUNT_TEMPLATES & fields.keys()):
+        template = parse_tlv(fields[tag]) or {}
+        address = next((value for value in template.values() if '@' in value), None)
+        if address:
+            info['payee_address'] = address
+            break
+    for tag, key in ((EMV_NAME, 'payee_name'), (EMV_AMOUNT, 'amount'),
+                     (EMV_MERCHANT_CODE, 'merchant_code'), (EMV_CURRENCY, 'currency')):
+        if tag in fields:
+            info[key] = fields[tag]
+    additional = parse_tlv(fields.get(EMV_ADDITIONAL_DATA, '')) or {}
+    if EMV_PURPOSE in additional:
+        info['note'] = additional[EMV_PURPOSE]
+    info['crc_valid'] = emv_crc_valid(qr_data)
+    return info
+
+
+def _parse_upi(qr_data):
+    # upi://pay?pa=...; bare "pa=...&pn=..." strings are parsed whole
+    _, separator, query = qr_data.partition('?')
+    if not separator:
+        query = qr_data
+    info = {}
+    # Same splitting and decoding as parse_qs, minus its per-pair overhead: unknown keys
+    # are skipped and plain values skip unquoting. Keys match case-insensitively and the
+    # first non-empty value of a key wins; a key given only empty values is kept as ''
+    # because the rules look at which keys are present (e.g. am= without mc=)
+    for pair in query.split('&'):
+        key, equals, value = pair.partition('=')
+        if not equals:
+            continue
+        field = UPI_FIELDS.get(key) or UPI_FIELDS.get(key.strip().lower())
+        if field is None or info.get(field):
+            continue
+        if '%' in value:
+            value = unquote_plus(value)
+        elif '+' in value:
+            value = value.replace('+', ' ')
+        info[field] = value.strip()
+    return info
+
+
+def parse_payment_qr(qr_data):
+    """
+    Single-pass parser for UPI deep links and EMVCo/Bharat QR payloads
+    Values are percent-decoded ('+' and %20 become spaces).
+    Returns: (format, info); format is 'emv' or 'upi', info holds payee_address,
+    payee_name, amount, note, merchant_code and currency when present, '' when
+    present but empty (plus crc_valid for EMV)
+    """
+    if qr_data.startswith(EMV_PREFIX):
+        fields = parse_tlv(qr_data)
+        if fields is not None:
+            return 'emv', _parse_emv(qr_data, fields)
+    return 'upi', _parse_upi(qr_data)
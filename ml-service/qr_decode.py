@@ -0,0 +1,234 @@
+"""
+Image decoding and the staged QR decode pipeline.
+
+Kept free of the model and Flask so it can run in the QR process pool
+(EXECUTION_MODE=pool) without loading anything else.
+"""
+import io
+import os
+import threading
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+from PIL import Image
+from pyzbar import pyzbar
+
+from image_utils import probe_image
+from metrics import timed
+
+# Uploads are decoded in memory; images above this many pixels are rejected before decoding
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 50_000_000))
+# Staged QR decode: scan a downscaled grayscale copy first, fall back to costlier stages only on a miss
+QR_TARGET_SIZE = int(os.environ.get('QR_TARGET_SIZE', 1024))
+QR_UPSCALE_BELOW = int(os.environ.get('QR_UPSCALE_BELOW', 400))
+# Uploads are decoded to grayscale at 1/2, 1/4 or 1/8 scale while the longest side stays at least
+# this big (JPEG scales inside the DCT, so the full-size bitmap is never allocated). A miss retries
+# at native resolution
+QR_REDUCED_MIN_SIDE = int(os.environ.get('QR_REDUCED_MIN_SIDE', QR_TARGET_SIZE))
+# Animated GIFs: scan at most this many evenly spaced frames, stopping at the first frame past the budget
+QR_GIF_MAX_FRAMES = int(os.environ.get('QR_GIF_MAX_FRAMES', 16))
+QR_GIF_BUDGET_MS = float(os.environ.get('QR_GIF_BUDGET_MS', 2000))
+
+REDUCED_READ_FLAGS = {
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    1: cv2.IMREAD_GRAYSCALE,
+}
+
+
+def check_image_header(data):
+    """
+    Format and size from the header, rejecting decompression bombs before any pixel is decoded
+    Returns: (header, error); header is (format, width, height)
+    """
+    header = probe_image(data)
+    if header is None:
+        return None, "Failed to read image"
+
+    _, width, height = header
+    if width * height > MAX_IMAGE_PIXELS:
+        return None, f"Image too large ({width}x{height} pixels)"
+    return header, None
+
+
+def decode_image(data, flags=cv2.IMREAD_COLOR):
+    """
+    Decode uploaded image bytes in memory after checking the header
+    Returns: (image, error)
+    """
+    _, error = check_image_header(data)
+    if error:
+        return None, error
+
+    with timed('image_decode'):
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+    if image is None:
+        return None, "Failed to read image"
+
+    return image, None
+
+
+def reduction_factor(width, height, min_side=None):
+    """
+    Returns: the largest of 8, 4, 2 that keeps the longest side >= min_side, else 1
+    """
+    min_side = QR_REDUCED_MIN_SIDE if min_side is None else min_side
+    longest = max(width, height)
+    return next((factor for factor in (8, 4, 2) if longest // factor >= min_side), 1)
+
+
+# A decoded symbol; rect is (left, top, width, height) in original image coordinates
+QRSymbol = namedtuple('QRSymbol', ['data', 'rect'])
+
+# QRCodeDetector keeps per-call state, so each thread gets its own
+_detectors = threading.local()
+
+
+def _zbar_symbols(image, scale=1.0):
+    # pyzbar rects are in the coordinates of the (possibly resized) image it was given
+    with timed('pyzbar_decode'):
+        decoded = pyzbar.decode(image)
+    return [QRSymbol(obj.data, tuple(int(round(v / scale)) for v in obj.rect)) for obj in decoded]
+
+
+def _opencv_symbols(gray, scale=1.0):
+    with timed('opencv_qr_detect'):
+        detector = getattr(_detectors, 'detector', None)
+        if detector is None:
+            detector = _detectors.detector = cv2.QRCodeDetector()
+        found, texts, points, _ = detector.detectAndDecodeMulti(gray)
+    if not found:
+        return []
+    symbols = []
+    for text, corners in zip(texts, points):
+        if text:
+            rect = cv2.boundingRect(corners.astype(np.float32))
+            symbols.append(QRSymbol(text.encode('utf-8'), tuple(int(round(v / scale)) for v in rect)))
+    return symbols
+
+
+def decode_qr_symbols(image, base_scale=1.0):
+    """
+    Staged QR decode that stops at the first stage that finds something
+    Stages: downscaled grayscale -> upscaled/full resolution -> adaptive threshold -> OpenCV QRCodeDetector
+    base_scale: size of image relative to the original upload, so rects come back in upload coordinates
+    Returns: (symbols, decode_info) where decode_info has the winning stage and per-stage timings in ms
+    """
+    timings = {}
+
+    def run(stage, func, *args):
+        start = time.perf_counter()
+        symbols = func(*args)
+        timings[stage] = round((time.perf_counter() - start) * 1000, 3)
+        return symbols
+
+    start = time.perf_counter()
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    height, width = gray.shape[:2]
+    scale = min(1.0, QR_TARGET_SIZE / max(height, width))
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+    timings['preprocess'] = round((time.perf_counter() - start) * 1000, 3)
+
+    small_scale = scale * base_scale
+    stages = [('downscaled', lambda: _zbar_symbols(small, small_scale))]
+    if scale < 1.0:
+        # Large photo: retry at native resolution in case the code is tiny
+        stages.append(('full_resolution', lambda: _zbar_symbols(gray, base_scale)))
+    elif min(height, width) < QR_UPSCALE_BELOW:
+        # Small image: give zbar more pixels per module
+        stages.append(('upscaled', lambda: _zbar_symbols(
+            cv2.resize(gray, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_CUBIC), 2.0 * base_scale)))
+    stages.append(('adaptive_threshold', lambda: _zbar_symbols(
+        cv2.adaptiveThreshold(small, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 5), small_scale)))
+    stages.append(('opencv_detector', lambda: _opencv_symbols(small, small_scale)))
+
+    for stage, func in stages:
+        symbols = run(stage, func)
+        if symbols:
+            return symbols, {"stage": stage, "timings_ms": timings}
+
+    return [], {"stage": None, "timings_ms": timings}
+
+
+def _gif_frames(count):
+    # Evenly spaced frame indices, first and last included
+    if count <= QR_GIF_MAX_FRAMES:
+        return range(count)
+    step = (count - 1) / max(1, QR_GIF_MAX_FRAMES - 1)
+    return sorted({round(i * step) for i in range(QR_GIF_MAX_FRAMES)})
+
+
+def _decode_gif(data):
+    """
+    Scan the frames of a (possibly animated) GIF within QR_GIF_MAX_FRAMES and QR_GIF_BUDGET_MS
+    Returns: (symbols, decode_info, error)
+    """
+    start = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as gif:
+        count = getattr(gif, 'n_frames', 1)
+        scanned = 0
+        previous = None
+        decode_info = {"stage": None, "timings_ms": {}}
+        sampled = set(_gif_frames(count))
+        # Walk the frames in order, checking the budget on every one: a GIF frame is composed
+        # on top of the previous ones, so seeking straight to a late frame decodes all before it
+        for index in range(max(sampled) + 1):
+            if scanned and (time.perf_counter() - start) * 1000 > QR_GIF_BUDGET_MS:
+                break
+            with timed('image_decode'):
+                gif.seek(index)
+                frame = np.asarray(gif.convert('L')) if index in sampled else None
+            if frame is None:
+                continue
+            # Animations often repeat a frame; an identical frame can't decode differently
+            if previous is not None and np.array_equal(frame, previous):
+                continue
+            previous = frame
+            symbols, decode_info = decode_qr_symbols(frame)
+            scanned += 1
+            if symbols:
+                decode_info.update(frame=index, frames=count, frames_scanned=scanned)
+                return symbols, decode_info, None
+    decode_info.update(frame=None, frames=count, frames_scanned=scanned)
+    return [], decode_info, None
+
+
+def decode_upload(data):
+    """
+    Decode upload bytes and every QR code in them; the unit of work for the QR process pool
+    Large photos are decoded at reduced resolution first, GIFs frame by frame.
+    Returns: (symbols, decode_info, error); decode_info is None if the image itself failed
+    """
+    header, error = check_image_header(data)
+    if error:
+        return [], None, error
+
+    image_format, width, height = header
+    try:
+        if image_format == 'gif':
+            return _decode_gif(data)
+    except Exception:
+        return [], None, "Failed to read image"
+
+    factor = reduction_factor(width, height)
+    image, error = decode_image(data, REDUCED_READ_FLAGS[factor])
+    if error:
+        return [], None, error
+    try:
+        symbols, decode_info = decode_qr_symbols(image, 1.0 / factor)
+        if not symbols and factor > 1:
+            # The code may be too small to survive the reduction; scan every pixel once
+            image = None
+            start = time.perf_counter()
+            image, error = decode_image(data, cv2.IMREAD_GRAYSCALE)
+            symbols = _zbar_symbols(image) if image is not None else []
+            decode_info["timings_ms"]["native_resolution"] = round((time.perf_counter() - start) * 1000, 3)
+            if symbols:
+                decode_info["stage"] = "native_resolution"
+    except Exception as e:
+        return [], None, f"QR extraction failed: {str(e)}"
+    decode_info["decode_scale"] = 1.0 / factor
+    return symbols, decode_info, None
@@ -0,0 +1,101 @@
+"""
+Single-flight request coalescing.
+
+When many clients submit the same URL or QR image at once (a scam link going
+viral), only the first caller for a key runs the computation; callers that
+arrive while it is in flight wait for it and share its result, or its
+exception. The key is released as soon as the computation finishes, so later
+requests are served by the verdict cache rather than by a stale flight.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key into one call (threads)
+    Results are shared between callers as-is; copy them before mutating.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, func, *args):
+        """
+        Returns: func(*args), run once for all concurrent callers with this key
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = Future()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            return call.result()
+
+        try:
+            result = func(*args)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            calls = self.leaders + self.coalesced
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "coalesced_ratio": round(self.coalesced / calls, 4) if calls else 0.0
+            }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    asyncio counterpart of SingleFlight for the ASGI server; func is a coroutine function
+    Only used from the event loop thread, so the lock is uncontended.
+    """
+
+    async def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = asyncio.get_running_loop().create_future()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+        if not leader:
+            # A follower giving up must not cancel the leader's computation
+            return await asyncio.shield(future)
+
+        try:
+            result = await func(*args)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark it retrieved, so a flight without followers doesn't log "never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
@@ -0,0 +1,151 @@
+"""
+Streaming bulk scanner: record ids, input offsets and resuming an interrupted job. Usage (from ml-service/):
+    python -m pytest -q
+"""
+import json
+
+import pytest
+
+from bulk_scan import BulkScanner, last_offset_in, parse_line, resume_offset
+
+INPUT = [
+    b"https://example.com/a\n",
+    b"\n",
+    b'{"url": "https://allowed.org/", "id": "row-2"}\n',
+    b'{"url": "https://phish.net/login", "id": 3}\n',
+    b"{not json\n",
+    b'{"id": "no-url"}\n',
+    b"  https://example.com/b  \n",
+]
+
+
+def screen(url):
+    # The pre-model tiers decide allowed.org; everything else goes to the model
+    if 'allowed.org' in url:
+        return {"url": url, "prediction": "safe", "decided_by": "allowlist"}, None
+    return None, {"score": 0}
+
+
+def classify_urls(urls):
+    return [("Phishing" if 'phish' in url else "Benign", 0.9) for url in urls]
+
+
+def build_result(url, heuristics, prediction, ml_confidence):
+    return {"url": url, "prediction": prediction, "confidence": ml_confidence, "decided_by": "model"}
+
+
+def scan(lines, start_offset=0, batch_size=2, classify=classify_urls):
+    scanner = BulkScanner(screen, classify, build_result, batch_size)
+    return list(scanner.scan(iter(lines), start_offset)), scanner
+
+
+@pytest.mark.parametrize('line, expected', [
+    (b"https://example.com/\n", ("https://example.com/", None, None)),
+    ('{"url": "https://example.com/", "id": 7}', ("https://example.com/", 7, None)),
+    ("   \n", (None, None, None)),
+    ('{"id": "x", "url": ""}', (None, "x", "URL is required")),
+    ('{"url": ["https://example.com/"]}', (None, None, "URL is required")),
+])
+def test_parse_line(line, expected):
+    assert parse_line(line) == expected
+
+
+def test_parse_line_reports_invalid_json():
+    url, record_id, error = parse_line("{not json")
+    assert (url, record_id) == (None, None) and error.startswith("Invalid JSON")
+
+
+def test_records_keep_input_order_offsets_and_ids():
+    records, scanner = scan(INPUT)
+    fields = [(record["offset"], record.get("id"), record.get("prediction"), record.get("error")) for record in records]
+    assert fields == [
+        (0, None, "Benign", None),
+        (2, "row-2", "safe", None),
+        (3, 3, "Phishing", None),
+        (4, None, None, records[3]["error"]),
+        (5, "no-url", None, "URL is required"),
+        (6, None, "Benign", None),
+    ]
+    assert records[3]["error"].startswith("Invalid JSON")
+    assert records[5]["url"] == "https://example.com/b"
+    progress = scanner.progress()
+    assert (progress["processed"], progress["errors"], progress["last_offset"]) == (6, 2, 6)
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 64])
+def test_batch_size_does_not_change_records(batch_size):
+    assert scan(INPUT, batch_size=batch_size)[0] == scan(INPUT)[0]
+
+
+def test_start_offset_skips_earlier_lines():
+    records, _ = scan(INPUT, start_offset=3)
+    assert [record["offset"] for record in records] == [3, 4, 5, 6]
+
+
+def test_model_failure_fails_only_its_batch():
+    calls = []
+
+    def classify(urls):
+        calls.append(urls)
+        if len(calls) == 1:
+            raise RuntimeError("CUDA error")
+        return classify_urls(urls)
+
+    records, scanner = scan(INPUT[:4] + [b"https://example.com/c\n"], batch_size=2, classify=classify)
+    assert [(record["offset"], record.get("error")) for record in records] == [
+        (0, "Prediction failed: CUDA error"), (2, None), (3, None), (4, None)
+    ]
+    assert scanner.errors == 1
+
+
+def test_stopping_early_releases_the_reader():
+    scanner = BulkScanner(screen, classify_urls, build_result, batch_size=1)
+    lines = (f"https://example.com/{i}\n" for i in range(1000))
+    records = scanner.scan(lines)
+    assert next(records)["offset"] == 0
+    records.close()
+    assert scanner.processed == 1
+
+
+def write_records(path, records, truncate_last=0):
+    data = ''.join(json.dumps(record) + '\n' for record in records)
+    path.write_text(data[:len(data) - truncate_last])
+
+
+def test_resume_continues_after_the_last_complete_record(tmp_path):
+    full, _ = scan(INPUT)
+    output = tmp_path / 'verdicts.ndjson'
+    # Interrupted while writing the record for offset 4
+    write_records(output, full[:4], truncate_last=10)
+    assert last_offset_in(str(output)) == 3
+
+    start = resume_offset(str(output))
+    assert start == 4
+    resumed, _ = scan(INPUT, start_offset=start)
+    with open(output, 'a') as sink:
+        sink.writelines(json.dumps(record) + '\n' for record in resumed)
+
+    lines = output.read_text().splitlines()
+    complete = []
+    for line in lines:
+        try:
+            complete.append(json.loads(line))
+        except ValueError:
+            continue
+    # The truncated line stays behind on its own line; every record appears once, in order
+    assert len(lines) == len(full) + 1
+    assert complete == full
+
+
+def test_resume_without_previous_output(tmp_path):
+    assert resume_offset(str(tmp_path / 'missing.ndjson'), 5) == 5
+    empty = tmp_path / 'empty.ndjson'
+    empty.write_text('')
+    assert resume_offset(str(empty)) == 0
+
+
+def test_resume_never_goes_back_before_an_explicit_offset(tmp_path):
+    output = tmp_path / 'verdicts.ndjson'
+    write_records(output, [{"offset": 2}])
+    assert resume_offset(str(output), 1) == 3
+    assert resume_offset(str(output), 10) == 10
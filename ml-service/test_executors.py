@@ -0,0 +1,75 @@
+"""
+BoundedExecutor admission, timeouts and pool recovery. Usage (from ml-service/):
+    python -m pytest -q
+"""
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from executors import BoundedExecutor, ExecutorBusy, JobTimeout
+
+
+def wait_idle(executor, timeout=5):
+    deadline = time.monotonic() + timeout
+    while executor.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_full_executor_rejects_instead_of_queueing():
+    executor = BoundedExecutor('test', max_workers=1, queue_size=1, timeout=5)
+    release = threading.Event()
+    executor.submit(release.wait)
+    executor.submit(release.wait)
+    with pytest.raises(ExecutorBusy):
+        executor.run(abs, -1)
+    release.set()
+    wait_idle(executor)
+    assert executor.run(abs, -1) == 1
+    stats = executor.stats()
+    assert (stats["rejected"], stats["pending"]) == (1, 0)
+
+
+def test_slow_thread_job_times_out_and_keeps_its_slot():
+    executor = BoundedExecutor('test', max_workers=1, queue_size=0, timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(JobTimeout):
+        executor.run(release.wait)
+    # A thread can't be stopped: the slot stays taken until the job returns
+    with pytest.raises(ExecutorBusy):
+        executor.run(abs, -1)
+    release.set()
+    wait_idle(executor)
+    assert executor.run(abs, -2) == 2
+    assert executor.stats()["timeouts"] == 1
+
+
+def test_hung_process_job_is_killed_and_the_pool_recovers():
+    executor = BoundedExecutor('test', max_workers=1, queue_size=0, timeout=0.5, processes=True)
+    first_pid = executor.run(os.getpid)
+    try:
+        with pytest.raises(JobTimeout):
+            executor.run(time.sleep, 60)
+        # The killed pool fails its jobs from its manager thread, which frees the hung job's slot
+        # within moments; a fresh pool serves the next job
+        wait_idle(executor)
+        second_pid = executor.run(os.getpid)
+        assert second_pid != first_pid
+        stats = executor.stats()
+        assert (stats["timeouts"], stats["recycled"], stats["pending"]) == (1, 1, 0)
+    finally:
+        executor.recycle(executor._executor, kill=True)
+
+
+def test_run_async_times_out():
+    executor = BoundedExecutor('test', max_workers=1, queue_size=0, timeout=0.05)
+    release = threading.Event()
+
+    async def main():
+        with pytest.raises(JobTimeout):
+            await executor.run_async(release.wait)
+
+    asyncio.run(main())
+    release.set()
@@ -0,0 +1,38 @@
+"""
+Rule file validation. Usage (from ml-service/):
+    python -m pytest -q
+"""
+import copy
+import json
+
+import pytest
+
+import heuristic_rules
+from heuristic_rules import CompiledRules, RuleError
+
+
+@pytest.fixture(scope='module')
+def spec():
+    with open(heuristic_rules.DEFAULT_RULES_FILE) as f:
+        return json.load(f)
+
+
+def with_tlds(spec, tlds):
+    spec = copy.deepcopy(spec)
+    spec['url']['suspicious_tlds'] = tlds
+    return spec
+
+
+def test_default_rules_compile(spec):
+    rules = CompiledRules(spec)
+    assert all(tld.startswith('.') and tld.count('.') == 1 for tld in rules.suspicious_tlds)
+
+
+@pytest.mark.parametrize('tld', ['tk', '.co.uk', '.', '. tk', ''])
+def test_suspicious_tld_must_be_one_dotted_label(spec, tld):
+    with pytest.raises(RuleError, match='suspicious_tlds'):
+        CompiledRules(with_tlds(spec, ['.xyz', tld]))
+
+
+def test_suspicious_tlds_are_lowercased(spec):
+    assert '.top' in CompiledRules(with_tlds(spec, ['.TOP', '.xn--p1ai'])).suspicious_tlds
@@ -0,0 +1,111 @@
+"""
+Payment QR parsing and rule checks. These need neither the model nor a camera image.
+
+Usage (from ml-service/):
+    python -m pytest -q
+"""
+import binascii
+
+import pytest
+
+import heuristic_rules
+from matchers import KeywordMatcher
+from payment_parser import emv_crc_valid, is_emv_qr, parse_payment_qr
+
+
+def emv_field(tag, value):
+    return f"{tag}{len(value):02d}{value}"
+
+
+def emv_payload(fields, valid_crc=True):
+    body = emv_field('00', '01') + ''.join(emv_field(tag, value) for tag, value in fields) + '6304'
+    crc = binascii.crc_hqx(body.encode('utf-8'), 0xFFFF)
+    return body + f"{crc if valid_crc else crc ^ 0x1:04X}"
+
+
+@pytest.fixture(scope='module')
+def rules():
+    return heuristic_rules.CompiledRules.from_file(heuristic_rules.DEFAULT_RULES_FILE)
+
+
+# (amount, expected tier score or None); tiers are strict lower bounds
+AMOUNT_TIER_CASES = [
+    (0, None), (9999.99, None), (10000, None), (10000.01, 20),
+    (50000, 20), (50000.01, 35), (1e7, 35),
+]
+
+
+@pytest.mark.parametrize('amount, expected', AMOUNT_TIER_CASES)
+def test_amount_tier(rules, amount, expected):
+    tier = rules.amount_tier(amount)
+    assert (tier[0] if tier else None) == expected
+
+
+# (payload, expected format, expected subset of payment_info)
+PARSER_CASES = [
+    ("upi://pay?pa=shop%40okaxis&pn=Chai%20Point+Cafe&am=120.50&tn=Order%2042", 'upi',
+     {'payee_address': 'shop@okaxis', 'payee_name': 'Chai Point Cafe', 'amount': '120.50', 'note': 'Order 42'}),
+    ("UPI://PAY?PA=merchant@icici&PN=Store&MC=5411", 'upi', {'payee_address': 'merchant@icici', 'merchant_code': '5411'}),
+    ("pa=9876543210@ybl&pn=Ravi", 'upi', {'payee_address': '9876543210@ybl', 'payee_name': 'Ravi'}),
+    (emv_payload([('26', emv_field('00', 'A000000524') + emv_field('01', 'store@sbi')),
+                  ('52', '5411'), ('54', '99.00'), ('59', 'Corner Store')]), 'emv',
+     {'payee_address': 'store@sbi', 'merchant_code': '5411', 'amount': '99.00',
+      'payee_name': 'Corner Store', 'crc_valid': True}),
+    (emv_payload([('59', 'Corner Store')], valid_crc=False), 'emv', {'payee_name': 'Corner Store', 'crc_valid': False}),
+]
+
+
+@pytest.mark.parametrize('payload, expected_format, expected', PARSER_CASES)
+def test_parse_payment_qr(payload, expected_format, expected):
+    payment_format, info = parse_payment_qr(payload)
+    assert payment_format == expected_format
+    assert {key: info.get(key) for key in expected} == expected
+
+
+def test_upi_first_key_wins_and_unknown_keys_are_skipped():
+    _, info = parse_payment_qr("upi://pay?tr=TXN1&pa=first@ybl& PA =second@ybl&note&am=5")
+    assert info == {'payee_address': 'first@ybl', 'amount': '5'}
+
+
+@pytest.mark.parametrize('payload, expected', [
+    ("upi://pay?PA=shop@ybl&Am=20000&MC=5411&TN=urgent", {'payee_address': 'shop@ybl', 'amount': '20000',
+                                                           'merchant_code': '5411', 'note': 'urgent'}),
+    ("upi://pay?pa=shop@ybl&tn=pay now&Cu=INR", {'payee_address': 'shop@ybl', 'note': 'pay now', 'currency': 'INR'}),
+], ids=['uppercase', 'raw-space'])
+def test_upi_keys_match_case_insensitively(payload, expected):
+    assert parse_payment_qr(payload)[1] == expected
+
+
+# Empty keys stay present: "am= without mc=" is the missing merchant code rule
+@pytest.mark.parametrize('payload, expected', [
+    ("upi://pay?am=&pa=9876543210@okaxis", {'amount': '', 'payee_address': '9876543210@okaxis'}),
+    ("upi://pay?pa=shop@ybl&am=500&mc=", {'payee_address': 'shop@ybl', 'amount': '500', 'merchant_code': ''}),
+    ("upi://pay?pa=shop@ybl&am=&AM=%20&am=15000", {'payee_address': 'shop@ybl', 'amount': '15000'}),
+    ("upi://pay?pa=shop@ybl&pn=&pn=Ravi&pn=Other", {'payee_address': 'shop@ybl', 'payee_name': 'Ravi'}),
+], ids=['empty-amount', 'empty-merchant-code', 'first-non-empty-amount', 'first-non-empty-name'])
+def test_upi_empty_values(payload, expected):
+    assert parse_payment_qr(payload)[1] == expected
+
+
+def test_malformed_emv_falls_back_to_upi():
+    payload = '000201' + '5999Too short'
+    assert not is_emv_qr(payload)
+    assert parse_payment_qr(payload)[0] == 'upi'
+
+
+def test_emv_crc_rejects_edited_payload():
+    payload = emv_payload([('54', '99.00'), ('59', 'Corner Store')])
+    assert emv_crc_valid(payload)
+    assert not emv_crc_valid(payload.replace('99.00', '99999'))
+
+
+# One list short enough for the substring loop, one long enough for the regex scan with overlapping keywords
+@pytest.mark.parametrize('keywords', [
+    ['paytm', 'phonepe', 'gpay', 'amazonpay'],
+    ['pay', 'paytm', 'payment', 'tm', 'secure', 'security', 'cure', 'verify', 'ify', 'fy'],
+], ids=['substring', 'regex'])
+def test_keyword_matcher_matches_substring_loop(keywords):
+    matcher = KeywordMatcher(keywords)
+    for text in ['', 'upi://pay?pa=x@paytm&pn=gpay phonepe', 'securitymtverify', 'paymentify', 'nothing here']:
+        assert matcher.find_all(text) == [keyword for keyword in keywords if keyword in text]
+        assert matcher.search(text) == any(keyword in text for keyword in keywords)
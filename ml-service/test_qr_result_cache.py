@@ -0,0 +1,70 @@
+"""
+QR result cache and which /api/detect_qr results may go in it. Usage (from ml-service/):
+    python -m pytest -q
+"""
+import pytest
+
+import verdict_cache
+from verdict_cache import QRResultCache, cacheable_scan
+
+VERDICT = {"qr_data": "https://example.com/", "prediction": "safe", "is_fraudulent": False}
+SYMBOL = dict(VERDICT, bounding_box={"left": 0, "top": 0, "width": 10, "height": 10})
+FAILED_SYMBOL = dict(SYMBOL, error="Inference queue is full", prediction="unknown")
+
+
+@pytest.mark.parametrize('result, status_code, expected', [
+    (VERDICT, 200, True),
+    ({"error": "No QR code found in image"}, 400, True),
+    ({"symbols": [SYMBOL, SYMBOL], "count": 2}, 200, True),
+    ({"error": "Model is still loading"}, 503, False),
+    ({"error": "Inference queue is full"}, 503, False),
+    ({"error": "Job timed out after 30s"}, 504, False),
+    ({"error": "Prediction failed: CUDA error"}, 500, False),
+    ({"error": "Server error: boom"}, 500, False),
+    # mode=all answers 200 even when some codes could not be scored
+    ({"symbols": [SYMBOL, FAILED_SYMBOL], "count": 2}, 200, False),
+], ids=['verdict', 'decode-failure', 'all-verdicts', 'model-loading', 'busy', 'timeout', 'prediction-failed',
+        'server-error', 'all-with-error'])
+def test_cacheable_scan(result, status_code, expected):
+    assert cacheable_scan(result, status_code) == expected
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verdict_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_results_are_keyed_by_digest_and_mode(clock):
+    cache = QRResultCache(max_size=10, ttl=60)
+    single = (VERDICT, 200)
+    cache.set(('digest', False), single)
+    assert cache.get(('digest', False)) is single
+    assert cache.get(('digest', True)) is None
+    assert cache.get(('other', False)) is None
+
+
+def test_results_expire_after_ttl(clock):
+    cache = QRResultCache(max_size=10, ttl=60)
+    cache.set(('digest', False), (VERDICT, 200))
+    clock[0] += 59
+    assert cache.get(('digest', False)) is not None
+    clock[0] += 2
+    assert cache.get(('digest', False)) is None
+
+
+def test_least_recently_used_result_is_evicted(clock):
+    cache = QRResultCache(max_size=2, ttl=60)
+    for key in ('a', 'b'):
+        cache.set((key, False), (VERDICT, 200))
+    cache.get(('a', False))
+    cache.set(('c', False), (VERDICT, 200))
+    assert [cache.get((key, False)) is not None for key in ('a', 'b', 'c')] == [True, False, True]
+
+
+def test_zero_size_disables_the_cache(clock):
+    cache = QRResultCache(max_size=0)
+    assert not cache.enabled
+    cache.set(('digest', False), (VERDICT, 200))
+    assert cache.get(('digest', False)) is None
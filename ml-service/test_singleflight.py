@@ -0,0 +1,132 @@
+"""
+Single-flight coalescing for threads and asyncio. Usage (from ml-service/):
+    python -m pytest -q
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+FOLLOWERS = 4
+
+
+def wait_for(condition, timeout=5):
+    # Followers block inside do(), so poll the stats until they have all joined the flight
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def run_flight(flight, func):
+    """
+    Start a leader that blocks in func until released, then FOLLOWERS callers with the same key
+    Returns: (release event, futures of every caller's do())
+    """
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+
+    def blocking():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return func()
+
+    pool = ThreadPoolExecutor(FOLLOWERS + 1)
+    futures = [pool.submit(flight.do, 'key', blocking)]
+    assert started.wait(5)
+    futures += [pool.submit(flight.do, 'key', blocking) for _ in range(FOLLOWERS)]
+    wait_for(lambda: flight.stats()["coalesced"] == FOLLOWERS)
+    pool.shutdown(wait=False)
+    return release, futures, calls
+
+
+def test_concurrent_callers_share_one_result():
+    flight = SingleFlight()
+    result = {"prediction": "safe"}
+    release, futures, calls = run_flight(flight, lambda: result)
+    release.set()
+    assert all(future.result(5) is result for future in futures)
+    assert len(calls) == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "coalesced": FOLLOWERS, "coalesced_ratio": 0.8}
+
+
+def test_concurrent_callers_share_the_exception():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("model failed")
+
+    release, futures, calls = run_flight(flight, fail)
+    release.set()
+    errors = []
+    for future in futures:
+        with pytest.raises(ValueError, match="model failed"):
+            future.result(5)
+        errors.append(future.exception())
+    assert len(calls) == 1
+    assert all(error is errors[0] for error in errors)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_key_is_released_after_each_flight():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == 1
+    with pytest.raises(KeyError):
+        flight.do('key', lambda: {}['missing'])
+    assert flight.do('key', lambda: 2) == 2
+    assert flight.stats() == {"in_flight": 0, "leaders": 3, "coalesced": 0, "coalesced_ratio": 0.0}
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert [flight.do(key, str.upper, key) for key in ('a', 'b')] == ['A', 'B']
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_async_callers_share_result_and_exception():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def scan(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == 'bad':
+            raise ValueError(value)
+        return {"url": value}
+
+    async def main():
+        results = await asyncio.gather(*(flight.do('ok', scan, 'ok') for _ in range(3)))
+        errors = await asyncio.gather(*(flight.do('bad', scan, 'bad') for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(main())
+    assert calls == ['ok', 'bad']
+    assert all(result is results[0] for result in results)
+    assert all(isinstance(error, ValueError) for error in errors)
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "coalesced": 4, "coalesced_ratio": 0.6667}
+
+
+def test_async_follower_cancel_does_not_cancel_leader():
+    flight = AsyncSingleFlight()
+
+    async def scan():
+        await asyncio.sleep(0.05)
+        return 'done'
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do('key', scan))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do('key', scan))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader, follower
+
+    result, follower = asyncio.run(main())
+    assert result == 'done'
+    assert follower.cancelled()
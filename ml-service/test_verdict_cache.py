@@ -0,0 +1,77 @@
+"""
+URL canonicalization and the in-process verdict cache. Usage (from ml-service/):
+    python -m pytest -q
+"""
+import pytest
+
+import verdict_cache
+from verdict_cache import VerdictCache, canonicalize_url
+
+
+@pytest.mark.parametrize('url, expected', [
+    ("HTTPS://Example.COM", "https://example.com/"),
+    ("https://example.com:443/a/", "https://example.com/a"),
+    ("http://example.com:80/", "http://example.com/"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("  https://example.com./login?next=/A#Top ", "https://example.com/login?next=/A#Top"),
+    ("https://User:Pw@Example.com/", "https://User:Pw@example.com/"),
+    ("http://[::1]:8000/x/", "http://[::1]:8000/x"),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize('url', ["example.com/login", "not a url", "http://example.com:99999/"])
+def test_canonicalize_url_keeps_unparsable_input(url):
+    assert canonicalize_url(url) == url
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(verdict_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_equivalent_urls_share_an_entry(clock):
+    cache = VerdictCache(max_size=10, ttl=60)
+    cache.set("https://Example.com:443/a/", {"prediction": "safe"})
+    assert cache.get("https://example.com/a") == {"prediction": "safe"}
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = VerdictCache(max_size=10, ttl=60)
+    cache.set("https://a.com", "verdict")
+    clock[0] += 59
+    assert cache.get("https://a.com") == "verdict"
+    clock[0] += 2
+    assert cache.get("https://a.com") is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["misses"], stats["size"]) == (1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = VerdictCache(max_size=2, ttl=60)
+    cache.set("https://a.com", "a")
+    cache.set("https://b.com", "b")
+    assert cache.get("https://a.com") == "a"
+    cache.set("https://c.com", "c")
+    assert cache.get("https://b.com") is None
+    assert cache.get("https://a.com") == "a" and cache.get("https://c.com") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.parametrize('max_size, ttl', [(0, 60), (10, 0)])
+def test_disabled_cache_stores_nothing(max_size, ttl):
+    cache = VerdictCache(max_size=max_size, ttl=ttl)
+    cache.set("https://a.com", "a")
+    assert not cache.enabled and cache.get("https://a.com") is None
+
+
+def test_sqlite_backing_is_shared_between_instances(clock, tmp_path):
+    path = str(tmp_path / "verdicts.db")
+    VerdictCache(max_size=10, ttl=60, db_path=path).set("https://a.com", {"prediction": "phishing"})
+    other = VerdictCache(max_size=10, ttl=60, db_path=path)
+    assert other.get("https://A.com/") == {"prediction": "phishing"}
+    assert other.stats()["shared_hits"] == 1
@@ -0,0 +1,118 @@
+"""
+Persistent verdict store: rules tags, decayed domain reputation and blocklist imports. Usage (from ml-service/):
+    python -m pytest -q
+"""
+import pytest
+
+from verdict_store import DAY, VerdictStore, confirmed_malicious, parse_list_entry
+
+NOW = 1_700_000_000.0
+PHISH = {"prediction": "malicious", "decided_by": "model", "ml_prediction": "Phishing"}
+SAFE = {"prediction": "safe", "decided_by": "model", "ml_prediction": "Benign"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return VerdictStore(str(tmp_path / 'verdicts.db'), max_age=30 * DAY, half_life=7 * DAY)
+
+
+def test_lookup_by_canonical_url_until_max_age(store):
+    store.record("https://Example.com:443/login/", PHISH, now=NOW)
+    assert store.lookup("https://example.com/login", now=NOW + DAY) == PHISH
+    assert store.lookup("https://example.com/login", now=NOW + 31 * DAY) is None
+    assert store.lookup("https://example.com/other", now=NOW) is None
+
+
+def test_lookup_only_accepts_the_same_rules_tag(store):
+    store.record("https://example.com/a", PHISH, now=NOW, rules='v1')
+    store.record("https://example.com/b", SAFE, now=NOW)
+    assert store.lookup("https://example.com/a", now=NOW, rules='v1') == PHISH
+    assert store.lookup("https://example.com/a", now=NOW, rules='v2') is None
+    assert store.lookup("https://example.com/b", now=NOW, rules='v1') is None
+    # Without a tag any stored verdict is accepted
+    assert store.lookup("https://example.com/a", now=NOW) == PHISH
+    store.record("https://example.com/a", SAFE, now=NOW, rules='v2')
+    assert store.lookup("https://example.com/a", now=NOW, rules='v1') is None
+    assert store.lookup("https://example.com/a", now=NOW, rules='v2') == SAFE
+
+
+@pytest.mark.parametrize('result, expected', [
+    (PHISH, True), (SAFE, False), ({"decided_by": "blocklist"}, True),
+    ({"decided_by": "heuristic", "prediction": "suspicious"}, False), ({}, False),
+])
+def test_confirmed_malicious(result, expected):
+    assert confirmed_malicious(result) == expected
+
+
+def test_reputation_counts_the_registered_domain(store):
+    store.record_many([("https://a.example.com/1", PHISH), ("https://b.example.com/2", SAFE),
+                       ("https://example.com/3", {"decided_by": "heuristic"})], now=NOW)
+    assert store.reputation("https://c.d.example.com/", now=NOW) == {
+        "domain": "example.com", "scans": 3, "malicious": 1, "malicious_ratio": 0.3333,
+        "last_seen": NOW, "listed": None
+    }
+    assert store.reputation("https://unseen.org/", now=NOW) is None
+
+
+def test_reputation_decays_with_half_life(store):
+    store.record_many([("https://example.com/1", PHISH), ("https://example.com/2", PHISH)], now=NOW)
+    reputation = store.reputation("https://example.com/", now=NOW + 7 * DAY)
+    assert (reputation["scans"], reputation["malicious"], reputation["malicious_ratio"]) == (1.0, 1.0, 1.0)
+    assert store.reputation("https://example.com/", now=NOW + 14 * DAY)["scans"] == 0.5
+    # New scans add to the decayed counts, not the stored ones
+    store.record("https://example.com/3", SAFE, now=NOW + 7 * DAY)
+    reputation = store.reputation("https://example.com/", now=NOW + 7 * DAY)
+    assert (reputation["scans"], reputation["malicious"], reputation["malicious_ratio"]) == (2.0, 1.0, 0.5)
+
+
+def test_zero_half_life_disables_decay(tmp_path):
+    store = VerdictStore(str(tmp_path / 'verdicts.db'), half_life=0)
+    store.record("https://example.com/1", PHISH, now=NOW)
+    assert store.reputation("https://example.com/", now=NOW + 365 * DAY)["scans"] == 1
+
+
+@pytest.mark.parametrize('line, expected', [
+    ("evil.com", "evil.com"), ("0.0.0.0 Evil.COM.", "evil.com"), ("https://evil.com/path", "evil.com"),
+    ("  # comment", None), ("", None), ("localhost", None), ("phish.net  # seen 2024", "phish.net"),
+])
+def test_parse_list_entry(line, expected):
+    assert parse_list_entry(line) == expected
+
+
+def test_import_list_marks_hosts_and_parents(store):
+    lines = ["# urlhaus", "evil.example.com", "0.0.0.0 bad.org", "", "http://phish.net/login"]
+    assert store.import_list(lines, 'urlhaus', chunk_size=2) == 3
+    assert store.reputation("https://x.evil.example.com/", now=NOW)["listed"] == 'urlhaus'
+    assert store.reputation("https://bad.org/", now=NOW)["listed"] == 'urlhaus'
+    # Listing a subdomain does not list its siblings or the registered domain
+    assert store.reputation("https://example.com/", now=NOW) is None
+    assert store.counts() == {"verdicts": 0, "domains": 0, "listed": 3}
+
+
+def test_import_list_keeps_scan_counts(store):
+    store.record("https://bad.org/1", PHISH, now=NOW)
+    store.import_list(["bad.org"], 'urlhaus')
+    reputation = store.reputation("https://bad.org/", now=NOW)
+    assert (reputation["scans"], reputation["malicious"], reputation["listed"]) == (1, 1, 'urlhaus')
+
+
+def test_import_list_replace_only_unlists_the_same_source(store):
+    store.import_list(["old.com", "kept.com"], 'urlhaus')
+    store.import_list(["other.com"], 'openphish')
+    assert store.import_list(["kept.com", "new.com"], 'urlhaus', replace=True) == 2
+    listed = {host: (store.reputation(f"https://{host}/", now=NOW) or {}).get("listed")
+              for host in ("old.com", "kept.com", "new.com", "other.com")}
+    assert listed == {"old.com": None, "kept.com": 'urlhaus', "new.com": 'urlhaus', "other.com": 'openphish'}
+
+
+def test_import_list_rolls_back_on_error(store):
+    store.import_list(["old.com"], 'urlhaus')
+
+    def lines():
+        yield "new.com"
+        raise OSError("read failed")
+
+    with pytest.raises(OSError):
+        store.import_list(lines(), 'urlhaus', replace=True)
+    assert store.reputation("https://old.com/", now=NOW)["listed"] == 'urlhaus'
+    assert store.reputation("https://new.com/", now=NOW) is None
@@ -0,0 +1,277 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL for use as a cache key
+    Lowercases scheme and host, strips the default port and normalizes
+    the trailing slash. Falls back to the stripped input if it can't be parsed.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').rstrip('.')
+        port = parts.port
+    except ValueError:
+        return url
+
+    if not scheme or not host:
+        return url
+
+    netloc = f'[{host}]' if ':' in host else host
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo += ':' + parts.password
+        netloc = userinfo + '@' + netloc
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc += f':{port}'
+
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    return urlunsplit((scheme, netloc, path, parts.query, parts.fragment))
+
+
+class SQLiteBacking:
+    """
+    Shared verdict store so several server worker processes reuse each other's results
+    """
+
+    def __init__(self, path, max_size, prune_every=1000):
+        self.path = path
+        self.max_size = max_size
+        self.prune_every = prune_every
+        self._writes = 0
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        # One connection per thread, reopened after fork so workers never share a handle
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, now):
+        row = self._connect().execute(
+            "SELECT value, expires FROM verdicts WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, expires):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO verdicts (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires)
+        )
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self.prune(time.time())
+
+    def prune(self, now):
+        # Drop expired rows, then the soonest-to-expire rows beyond max_size
+        conn = self._connect()
+        conn.execute("DELETE FROM verdicts WHERE expires <= ?", (now,))
+        conn.execute(
+            "DELETE FROM verdicts WHERE key IN ("
+            "SELECT key FROM verdicts ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,)
+        )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM verdicts")
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with a TTL
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def get(self, key):
+        """
+        Returns: cached value or None
+        """
+        if not self.enabled:
+            return None
+
+        value = self._lookup(key, time.time())
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._store(key, value, time.time() + self.ttl)
+
+    def _lookup(self, key, now):
+        # Counts hits and expirations; misses are counted by the caller, which may look elsewhere first
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+    def _store(self, key, value, expires):
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class VerdictCache(LRUCache):
+    """
+    LRU cache of URL verdicts with a TTL, keyed by canonical URL
+    Optionally backed by a SQLite file shared across worker processes.
+    """
+
+    def __init__(self, max_size=10000, ttl=3600, db_path=None):
+        super().__init__(max_size, ttl)
+        self.shared_hits = 0
+        self.backing = SQLiteBacking(db_path, max_size) if db_path and self.enabled else None
+
+    def get(self, url):
+        """
+        Look up a cached verdict
+        Returns: cached result dict or None
+        """
+        if not self.enabled:
+            return None
+
+        key = canonicalize_url(url)
+        now = time.time()
+        value = self._lookup(key, now)
+        if value is not None:
+            return value
+
+        if self.backing is not None:
+            try:
+                value, expires = self.backing.get(key, now)
+            except sqlite3.Error:
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._store(key, value, expires)
+                    self.hits += 1
+                    self.shared_hits += 1
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, url, value):
+        """
+        Cache a verdict for url
+        """
+        if not self.enabled:
+            return
+
+        key = canonicalize_url(url)
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires)
+
+        if self.backing is not None:
+            try:
+                self.backing.set(key, value, expires)
+            except sqlite3.Error:
+                pass
+
+    def clear(self):
+        super().clear()
+        if self.backing is not None:
+            self.backing.clear()
+
+    def stats(self):
+        stats = super().stats()
+        stats["shared_hits"] = self.shared_hits
+        stats["shared_backing"] = self.backing.path if self.backing is not None else None
+        return stats
+
+
+class QRResultCache(LRUCache):
+    """
+    LRU cache of /api/detect_qr results keyed by upload content hash
+    Byte-identical re-uploads (the same poster photo, a forwarded image) skip
+    decoding and analysis. Values are (response_dict, status_code) and are
+    shared between requests as-is; copy them before mutating.
+    """
+
+    def __init__(self, max_size=1000, ttl=3600):
+        super().__init__(max_size, ttl)
+
+
+def cacheable_scan(result, status_code):
+    """
+    Whether a /api/detect_qr result holds for every later upload of the same bytes
+    Verdicts and decode failures (400) do; model loading, backpressure and prediction
+    errors are transient, including per-code errors in mode=all results.
+    """
+    if status_code == 400:
+        return True
+    return status_code == 200 and not any('error' in symbol for symbol in result.get('symbols', ()))
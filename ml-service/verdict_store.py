@@ -0,0 +1,354 @@
+"""
+Persistent verdict store and domain reputation index (SQLite).
+
+Unlike the verdict cache, this survives restarts and keeps growing: every
+verdict the service computes is stored under its canonical URL, and counted
+in a per-registered-domain aggregate (scans, confirmed malicious verdicts,
+last seen). The counts decay with a half-life, so a domain's reputation
+follows its recent verdicts. External blocklists are imported into the same
+domain table.
+
+Lookups are single primary-key probes. Verdicts are keyed by a 64-bit hash of
+the canonical URL (SQLite's rowid B-tree), so the index stays compact and
+lookup cost grows only with the tree depth, which is 4-5 levels at tens of
+millions of rows.
+
+Maintenance (from ml-service/):
+    python verdict_store.py import blocklist.txt --source urlhaus --replace
+    python verdict_store.py compact --max-age-days 30 --vacuum
+    python verdict_store.py stats
+    python verdict_store.py reputation example.com
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from domain_lists import registered_domain
+from verdict_cache import canonicalize_url
+
+DAY = 86400
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS verdicts ("
+    "id INTEGER PRIMARY KEY, url TEXT NOT NULL, domain TEXT, result TEXT NOT NULL, scanned REAL NOT NULL, rules TEXT)",
+    "CREATE INDEX IF NOT EXISTS verdicts_scanned ON verdicts (scanned)",
+    # A row is either a registered domain with scan counts, a listed host, or both
+    "CREATE TABLE IF NOT EXISTS domains ("
+    "domain TEXT PRIMARY KEY, scans INTEGER NOT NULL DEFAULT 0, malicious INTEGER NOT NULL DEFAULT 0, "
+    "last_seen REAL, listed TEXT) WITHOUT ROWID",
+]
+# decay() is registered on each connection (VerdictStore.decay); the right-hand sides see the old row
+UPSERT_SCANS = (
+    "INSERT INTO domains (domain, scans, malicious, last_seen) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(domain) DO UPDATE SET scans = scans * decay(excluded.last_seen - last_seen) + excluded.scans, "
+    "malicious = malicious * decay(excluded.last_seen - last_seen) + excluded.malicious, "
+    "last_seen = excluded.last_seen"
+)
+UPSERT_LISTED = (
+    "INSERT INTO domains (domain, listed) VALUES (?, ?) "
+    "ON CONFLICT(domain) DO UPDATE SET listed = excluded.listed"
+)
+
+
+def url_key(canonical_url):
+    # Signed 64-bit so it fits SQLite's INTEGER PRIMARY KEY; the url column resolves collisions
+    digest = hashlib.blake2b(canonical_url.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+def host_of(canonical_url):
+    try:
+        return urlsplit(canonical_url).hostname
+    except ValueError:
+        return None
+
+
+def parent_domains(host, domain):
+    """
+    Returns: host and each parent down to its registered domain (a.b.example.com, b.example.com, example.com)
+    """
+    names = [host]
+    while host != domain and '.' in host:
+        host = host.split('.', 1)[1]
+        names.append(host)
+    return names
+
+
+def confirmed_malicious(result):
+    """
+    Whether a verdict counts as malicious toward its domain's reputation: the model or a blocklist
+    flagged it. Heuristic-only flags fire on the login pages of popular sites and would give the
+    whole domain a bad reputation.
+    """
+    decided_by = result.get('decided_by')
+    if decided_by == 'blocklist':
+        return True
+    return decided_by == 'model' and result.get('ml_prediction') != 'Benign'
+
+
+def parse_list_entry(line):
+    """
+    Blocklist line -> host; accepts bare domains, URLs and hosts-file lines ("0.0.0.0 evil.com")
+    Returns: lowercase host or None for blanks and comments
+    """
+    line = line.split('#', 1)[0].strip()
+    if not line:
+        return None
+    parts = line.split()
+    entry = parts[-1] if len(parts) > 1 else parts[0]
+    if '://' in entry:
+        entry = host_of(entry) or ''
+    entry = entry.lower().rstrip('.')
+    return entry if '.' in entry else None
+
+
+class VerdictStore:
+    """
+    On-disk verdicts by canonical URL plus per-domain reputation
+    Safe to share between threads and forked worker processes (one connection per thread and pid).
+    """
+
+    def __init__(self, path, max_age=30 * DAY, half_life=7 * DAY):
+        self.path = path
+        self.max_age = max_age
+        self.half_life = half_life
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.url_hits = 0
+        self.domain_lookups = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        conn = self._connect()
+        for statement in SCHEMA:
+            conn.execute(statement)
+        if 'rules' not in {row[1] for row in conn.execute("PRAGMA table_info(verdicts)")}:
+            # Stores created before verdicts were tagged with their rules; untagged rows never match
+            conn.execute("ALTER TABLE verdicts ADD COLUMN rules TEXT")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Keep the upper B-tree levels in memory; lookups then touch one or two pages on disk
+            conn.execute("PRAGMA cache_size=-65536")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.create_function('decay', 1, self.decay, deterministic=True)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def decay(self, age):
+        """
+        Returns: weight of domain counts last updated age seconds ago (halved every half_life; 0 disables decay)
+        """
+        if not self.half_life or age is None or age <= 0:
+            return 1.0
+        return 0.5 ** (age / self.half_life)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def note_error(self):
+        # Callers treat a failing store as a miss and count it here
+        self._count('errors')
+
+    def lookup(self, url, now=None, rules=None):
+        """
+        rules: only accept a verdict recorded with this rules tag (see record_many)
+        Returns: the stored result for url if it is younger than max_age, else None
+        """
+        key = canonicalize_url(url)
+        now = time.time() if now is None else now
+        row = self._connect().execute(
+            "SELECT url, result, scanned, rules FROM verdicts WHERE id = ?", (url_key(key),)
+        ).fetchone()
+        if row is None or row[0] != key or row[2] < now - self.max_age or (rules is not None and row[3] != rules):
+            self._count('misses')
+            return None
+        self._count('url_hits')
+        return json.loads(row[1])
+
+    def reputation(self, url, now=None):
+        """
+        Returns: {domain, scans, malicious, malicious_ratio, last_seen, listed} for the URL's
+        registered domain (listed names the blocklist covering the host, if any), or None
+        scans and malicious are decayed to now.
+        """
+        host = host_of(canonicalize_url(url))
+        domain = registered_domain(host)
+        if not domain:
+            return None
+        self._count('domain_lookups')
+        names = parent_domains(host.rstrip('.'), domain)
+        rows = self._connect().execute(
+            f"SELECT domain, scans, malicious, last_seen, listed FROM domains "
+            f"WHERE domain IN ({', '.join('?' * len(names))})", names
+        ).fetchall()
+        if not rows:
+            return None
+        scans, malicious, last_seen = next(((row[1], row[2], row[3]) for row in rows if row[0] == domain), (0, 0, None))
+        if last_seen is not None:
+            weight = self.decay((time.time() if now is None else now) - last_seen)
+            scans *= weight
+            malicious *= weight
+        return {
+            "domain": domain,
+            "scans": round(scans, 2),
+            "malicious": round(malicious, 2),
+            "malicious_ratio": round(malicious / scans, 4) if scans else 0.0,
+            "last_seen": last_seen,
+            "listed": next((row[4] for row in rows if row[4]), None)
+        }
+
+    def record(self, url, result, now=None, rules=None):
+        self.record_many([(url, result)], now, rules)
+
+    def record_many(self, items, now=None, rules=None):
+        """
+        Store (url, result) verdicts and add them to their domains' counts in one transaction
+        rules: tag of the heuristic rules the verdicts were scored with
+        """
+        now = time.time() if now is None else now
+        rows = []
+        counts = {}
+        for url, result in items:
+            key = canonicalize_url(url)
+            domain = registered_domain(host_of(key))
+            rows.append((url_key(key), key, domain, json.dumps(result), now, rules))
+            if domain:
+                scans, malicious = counts.get(domain, (0, 0))
+                counts[domain] = (scans + 1, malicious + confirmed_malicious(result))
+        if not rows:
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO verdicts (id, url, domain, result, scanned, rules) VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.executemany(UPSERT_SCANS, [(domain, scans, malicious, now)
+                                            for domain, (scans, malicious) in counts.items()])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._count('writes', len(rows))
+
+    def import_list(self, lines, source, replace=False, chunk_size=50000):
+        """
+        Mark every host in a blocklist as listed by source; replace=True first unlists
+        hosts a previous import of the same source added
+        Returns: number of entries imported
+        """
+        conn = self._connect()
+        imported = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                conn.execute("UPDATE domains SET listed = NULL WHERE listed = ?", (source,))
+            chunk = []
+            for line in lines:
+                host = parse_list_entry(line)
+                if host:
+                    chunk.append((host, source))
+                if len(chunk) >= chunk_size:
+                    conn.executemany(UPSERT_LISTED, chunk)
+                    imported += len(chunk)
+                    chunk = []
+            conn.executemany(UPSERT_LISTED, chunk)
+            imported += len(chunk)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return imported
+
+    def compact(self, max_age=None, vacuum=False, now=None):
+        """
+        Drop verdicts older than max_age and unlisted domains not seen since then
+        Returns: (verdicts removed, domains removed)
+        """
+        max_age = self.max_age if max_age is None else max_age
+        cutoff = (time.time() if now is None else now) - max_age
+        conn = self._connect()
+        verdicts = conn.execute("DELETE FROM verdicts WHERE scanned < ?", (cutoff,)).rowcount
+        domains = conn.execute(
+            "DELETE FROM domains WHERE listed IS NULL AND (last_seen IS NULL OR last_seen < ?)", (cutoff,)
+        ).rowcount
+        if vacuum:
+            conn.execute("VACUUM")
+        conn.execute("PRAGMA optimize")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return verdicts, domains
+
+    def counts(self):
+        # Full scans; for maintenance, not for request paths
+        conn = self._connect()
+        return {
+            "verdicts": conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0],
+            "domains": conn.execute("SELECT COUNT(*) FROM domains WHERE scans > 0").fetchone()[0],
+            "listed": conn.execute("SELECT COUNT(*) FROM domains WHERE listed IS NOT NULL").fetchone()[0],
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "max_age_days": round(self.max_age / DAY, 2),
+                "url_hits": self.url_hits,
+                "domain_lookups": self.domain_lookups,
+                "misses": self.misses,
+                "writes": self.writes,
+                "errors": self.errors
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verdict store maintenance")
+    parser.add_argument('--db', default=os.environ.get('VERDICT_STORE_DB'), help="store file (default $VERDICT_STORE_DB)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    importer = subparsers.add_parser('import', help="Import a domain/URL/hosts-format blocklist")
+    importer.add_argument('file', help="blocklist file ('-' for stdin)")
+    importer.add_argument('--source', required=True, help="list name reported in results, e.g. urlhaus")
+    importer.add_argument('--replace', action='store_true', help="unlist entries from an earlier import of --source")
+    compact = subparsers.add_parser('compact', help="Expire old verdicts and unseen domains")
+    compact.add_argument('--max-age-days', type=float, default=float(os.environ.get('VERDICT_STORE_MAX_AGE_DAYS', 30)))
+    compact.add_argument('--vacuum', action='store_true', help="rewrite the file to return freed pages to the OS")
+    subparsers.add_parser('stats', help="Row counts")
+    reputation = subparsers.add_parser('reputation', help="Show the reputation of a domain or URL")
+    reputation.add_argument('target')
+    args = parser.parse_args()
+
+    if not args.db:
+        raise SystemExit("Set --db or VERDICT_STORE_DB")
+    store = VerdictStore(args.db, half_life=float(os.environ.get('REPUTATION_HALF_LIFE_DAYS', 7)) * DAY)
+
+    if args.command == 'import':
+        start = time.perf_counter()
+        if args.file == '-':
+            count = store.import_list(sys.stdin, args.source, args.replace)
+        else:
+            with open(args.file, encoding='utf-8', errors='replace') as f:
+                count = store.import_list(f, args.source, args.replace)
+        print(f"Imported {count} entries from {args.source} in {time.perf_counter() - start:.1f}s")
+    elif args.command == 'compact':
+        verdicts, domains = store.compact(args.max_age_days * DAY, args.vacuum)
+        print(f"Removed {verdicts} verdicts and {domains} domains")
+    elif args.command == 'stats':
+        print(json.dumps(store.counts(), indent=2))
+    elif args.command == 'reputation':
+        target = args.target if '://' in args.target else f'http://{args.target}/'
+        print(json.dumps(store.reputation(target), indent=2))
+
+
+if __name__ == '__main__':
+    main()